@@ -469,6 +469,30 @@ class CourseAdmin(admin.ModelAdmin):
         }
 
 
+# ============================
+# SKILL ADMIN
+# ============================
+from django.db.models import Count
+from .models import Skill
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'icon', 'course_count']
+    list_filter = ['kind']
+    search_fields = ['name', 'key']
+    # Course pages resolve icons from the static maps in lms/utils/skills.py,
+    # so editing one here would never show up
+    readonly_fields = ['key', 'icon']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(course_count=Count('course_links'))
+
+    @admin.display(description='Courses', ordering='course_count')
+    def course_count(self, obj):
+        return obj.course_count
+
+
 
 
 
@@ -1186,7 +1210,7 @@ class CourseProgressAdmin(admin.ModelAdmin):
     list_display = ('user', 'course', 'progress_percentage', 'quiz_passed', 'is_completed', 'completed_at', 'has_valid_quiz_attempt')
     list_filter = ('quiz_passed', 'is_completed', 'course')
     search_fields = ('user__email', 'course__title')
-    readonly_fields = ('progress_percentage', 'completed_at', 'last_quiz_attempt_id', 'completion_details')
+    readonly_fields = ('progress_percentage', 'completed_count', 'total_count', 'completed_at', 'last_quiz_attempt_id', 'completion_details')
     actions = ['reset_quiz_status', 'recalculate_progress']
     
     def has_valid_quiz_attempt(self, obj):
@@ -1222,7 +1246,7 @@ class CourseProgressAdmin(admin.ModelAdmin):
     def recalculate_progress(self, request, queryset):
         updated = 0
         for progress in queryset:
-            progress.update_progress()
+            progress.rebuild_counters()
             progress.check_completion()
             updated += 1
         self.message_user(request, f"Recalculated progress for {updated} records.")
@@ -1235,3 +1259,43 @@ class CertificateAdmin(admin.ModelAdmin):
     readonly_fields = ['certificate_id', 'issue_date', 'quiz_score']
 
 
+
+from .models import DocumentJob
+
+@admin.register(DocumentJob)
+class DocumentJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'requested_by', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['requested_by__email', 'dedupe_key']
+    readonly_fields = ['dedupe_key', 'result_file', 'error', 'attempts', 'created_at', 'started_at', 'finished_at']
+    actions = ['retry_jobs']
+
+    @admin.action(description="Retry selected failed jobs")
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status='failed'):
+            if DocumentJob.objects.filter(active_key=job.dedupe_key).exists():
+                continue
+            DocumentJob.objects.filter(pk=job.pk).update(
+                status='pending', active_key=job.dedupe_key, attempts=0, error=''
+            )
+            retried += 1
+        self.message_user(request, f"Re-queued {retried} jobs.")
+
+from .models import EmailOutbox
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['recipient', 'idempotency_key']
+    readonly_fields = ['idempotency_key', 'payload', 'attempts', 'last_error', 'created_at', 'claimed_at', 'sent_at']
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected failed emails now")
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"Re-queued {updated} emails.")
@@ -8,3 +8,4 @@ class LmsConfig(AppConfig):
     def ready(self):
         # Import signals to register them
         import lms.signals  # Replace with your actual app name
+        import lms.checks  # noqa: F401  (registers the deploy checks)
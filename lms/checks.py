@@ -0,0 +1,36 @@
+"""
+lms/checks.py
+System checks for settings the caching layer depends on.
+
+Entitlements, curriculum versions, page-cache tags, the home snapshot and
+the search index version are invalidated through the default cache, so a
+deployment whose cache lives inside each process serves stale data from
+every worker except the one that made the change.  Reported by
+`manage.py check --deploy` rather than at import time, so builds
+(collectstatic, migrate) still run without a cache server.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"The default cache ({backend}) is private to each process, so cache "
+            "invalidations don't reach the other web workers.",
+            hint="Set REDIS_URL, or CACHE_BACKEND / CACHE_LOCATION to Redis, Memcached "
+                 "or a file-based cache that every process can reach.",
+            id="lms.E001",
+        )
+    ]
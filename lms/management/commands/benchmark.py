@@ -0,0 +1,344 @@
+import json
+import random
+import re
+import statistics
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import resolve, reverse
+
+from lms.middleware import budget_for
+from lms.models import Answer, Course, Purchase, Question, Quiz, QuizAttempt, Video
+from lms.utils.payment_gateway import FakeGateway, set_gateway
+from lms.utils.synthetic import DatasetExists, DatasetSpec, delete_dataset, generate
+
+
+SCENARIOS = [
+    'course_detail',
+    'video_player',
+    'update_video_progress',
+    'mark_video_complete',
+    'quiz_submit',
+    'my_achievements',
+    'create_razorpay_order',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the student hot paths against a synthetic dataset and save a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=20)
+        parser.add_argument('--days', type=int, default=10, help='Curriculum days per course')
+        parser.add_argument('--videos', type=int, default=5, help='Videos per day')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--courses-per-user', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(SCENARIOS),
+            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}",
+        )
+        parser.add_argument('--output', default='bench_output.json', help='Where to write the JSON report')
+        parser.add_argument('--reuse', action='store_true', help='Benchmark an existing dataset with this seed')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the dataset afterwards')
+        parser.add_argument(
+            '--cold-cache',
+            action='store_true',
+            help='Clear the cache before every timed request (measures the cache-miss path)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow running with DEBUG off (writes synthetic rows to the configured database)',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG is off: this writes synthetic data to the database. Pass --force if that's intended.")
+
+        scenarios = [s.strip() for s in options['scenarios'].split(',') if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        spec = DatasetSpec(
+            courses=options['courses'],
+            days=options['days'],
+            videos=options['videos'],
+            users=options['users'],
+            courses_per_user=options['courses_per_user'],
+            seed=options['seed'],
+        )
+
+        # testserver in ALLOWED_HOSTS, locmem email backend
+        setup_test_environment()
+
+        if not options['reuse']:
+            self.stdout.write(f"Generating dataset {spec.prefix} ...")
+            started = time.perf_counter()
+            try:
+                counts = generate(spec, log=lambda message: self.stdout.write(f"    {message}"))
+            except DatasetExists as e:
+                raise CommandError(f"{e}. Use --reuse, or a different --seed.")
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s"
+            ))
+
+        fixtures = self._fixtures(spec.prefix)
+        if not fixtures['purchases']:
+            raise CommandError(f"No purchases found for dataset {spec.prefix}")
+
+        # Never call the real Razorpay from a benchmark
+        previous_gateway = set_gateway(FakeGateway())
+        rng = random.Random(spec.seed)
+        clients = {}
+        report = {
+            'meta': {
+                'commit': self._git_commit(),
+                'started_at': datetime.now(dt_timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'dataset': spec.as_dict(),
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'cold_cache': options['cold_cache'],
+            },
+            'scenarios': {},
+        }
+
+        for name in scenarios:
+            self.stdout.write(f"\n⏱  {name}")
+            make_request = getattr(self, f'_request_{name}')
+            for _ in range(options['warmup']):
+                self._send(clients, make_request(fixtures, rng))
+
+            latencies, queries, duplicates, statuses = [], [], [], Counter()
+            budget = None
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request = make_request(fixtures, rng)
+                budget = budget or self._budget(request['url'])
+                self._client(clients, request['user_id'])
+                if options['cold_cache']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    response = self._send(clients, request)
+                    latencies.append((time.perf_counter() - request_started) * 1000)
+                queries.append(len(captured))
+                if isinstance(response, Exception):
+                    statuses[type(response).__name__] += 1
+                    continue
+                statuses[response.status_code] += 1
+                duplicates.append(self._repeated(response))
+            elapsed = time.perf_counter() - started
+
+            errors = sum(n for status, n in statuses.items() if status not in request['expect'])
+            result = self._summarize(latencies, queries, errors, elapsed)
+            result['statuses'] = {str(status): n for status, n in statuses.items()}
+            result['budget'] = self._check_budget(budget, queries, duplicates)
+            report['scenarios'][name] = result
+            self.stdout.write(
+                f"    p50 {result['latency_ms']['p50']:.1f} ms · p95 {result['latency_ms']['p95']:.1f} ms · "
+                f"p99 {result['latency_ms']['p99']:.1f} ms · {result['queries']['mean']:.1f} queries · "
+                f"{result['throughput_rps']:.0f} req/s · {errors} errors"
+            )
+            if budget:
+                line = (
+                    f"    budget {budget[0]} queries (max seen {result['queries']['max']}) · "
+                    f"{result['budget']['over_budget']} over budget"
+                )
+                self.stdout.write(self.style.WARNING(line) if result['budget']['over_budget'] else line)
+
+        set_gateway(previous_gateway)
+
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Report written to {options['output']}"))
+
+        if options['cleanup']:
+            deleted = delete_dataset(spec.prefix)
+            self.stdout.write(f"🧹 Deleted {deleted} synthetic rows")
+
+    # ----------------------------------------------------------------
+    # Dataset handles
+    # ----------------------------------------------------------------
+    def _fixtures(self, prefix):
+        purchases = list(
+            Purchase.objects.filter(course__slug__startswith=prefix, payment_status='completed')
+            .values_list('user_id', 'course_id')
+        )
+        course_ids = {course_id for _, course_id in purchases}
+        videos = {}
+        for video_id, course_id in (
+            Video.objects.filter(curriculum_day__course_id__in=course_ids)
+            .order_by('curriculum_day__order', 'order', 'id')
+            .values_list('id', 'curriculum_day__course_id')
+        ):
+            videos.setdefault(course_id, []).append(video_id)
+
+        quizzes = dict(Quiz.objects.filter(course_id__in=course_ids).values_list('course_id', 'id'))
+        correct = {}
+        for question_id, quiz_id, answer_id in (
+            Answer.objects.filter(question__quiz_id__in=quizzes.values(), is_correct=True)
+            .values_list('question_id', 'question__quiz_id', 'id')
+        ):
+            correct.setdefault(quiz_id, {})[question_id] = answer_id
+        for question_id, quiz_id in Question.objects.filter(quiz_id__in=quizzes.values()).values_list('id', 'quiz_id'):
+            correct.setdefault(quiz_id, {}).setdefault(question_id, None)
+
+        owned = {}
+        for user_id, course_id in purchases:
+            owned.setdefault(user_id, set()).add(course_id)
+
+        return {
+            'purchases': purchases,
+            'owned': owned,
+            'slugs': dict(Course.objects.filter(pk__in=course_ids).values_list('id', 'slug')),
+            'videos': videos,
+            'quizzes': quizzes,
+            'correct_answers': correct,
+        }
+
+    # ----------------------------------------------------------------
+    # Scenarios: each returns one request description
+    # ----------------------------------------------------------------
+    def _pick(self, fixtures, rng):
+        return rng.choice(fixtures['purchases'])
+
+    def _request_course_detail(self, fixtures, rng):
+        user_id, course_id = self._pick(fixtures, rng)
+        url = reverse('course_detail', args=[fixtures['slugs'][course_id]])
+        return {'user_id': user_id, 'method': 'get', 'url': url, 'expect': (200,)}
+
+    def _request_video_player(self, fixtures, rng):
+        user_id, course_id = self._pick(fixtures, rng)
+        video_id = rng.choice(fixtures['videos'][course_id])
+        url = reverse('video_player', args=[video_id])
+        return {'user_id': user_id, 'method': 'get', 'url': url, 'expect': (200,)}
+
+    def _request_update_video_progress(self, fixtures, rng):
+        user_id, course_id = self._pick(fixtures, rng)
+        video_id = rng.choice(fixtures['videos'][course_id])
+        return {
+            'user_id': user_id,
+            'method': 'post',
+            'url': reverse('update_video_progress', args=[video_id]),
+            'data': {'progress': rng.randint(1, 90), 'watched_seconds': rng.randint(10, 600)},
+            'expect': (200,),
+        }
+
+    def _request_mark_video_complete(self, fixtures, rng):
+        user_id, course_id = self._pick(fixtures, rng)
+        video_id = rng.choice(fixtures['videos'][course_id])
+        url = reverse('mark_video_complete', args=[video_id])
+        return {'user_id': user_id, 'method': 'post', 'url': url, 'expect': (200,)}
+
+    def _request_quiz_submit(self, fixtures, rng):
+        user_id, course_id = self._pick(fixtures, rng)
+        quiz_id = fixtures['quizzes'][course_id]
+        # The attempt is set-up, not part of the timed request
+        attempt = QuizAttempt.objects.create(user_id=user_id, quiz_id=quiz_id)
+        data = {
+            f'question_{question_id}': [answer_id] if answer_id and rng.random() < 0.8 else []
+            for question_id, answer_id in fixtures['correct_answers'].get(quiz_id, {}).items()
+        }
+        url = reverse('quiz_submit', args=[attempt.id])
+        return {'user_id': user_id, 'method': 'post', 'url': url, 'data': data, 'expect': (302,)}
+
+    def _request_my_achievements(self, fixtures, rng):
+        user_id, _ = self._pick(fixtures, rng)
+        return {'user_id': user_id, 'method': 'get', 'url': reverse('my_achievements'), 'expect': (200,)}
+
+    def _request_create_razorpay_order(self, fixtures, rng):
+        user_id, _ = self._pick(fixtures, rng)
+        not_owned = sorted(set(fixtures['slugs']) - fixtures['owned'][user_id]) or sorted(fixtures['slugs'])
+        url = reverse('create_razorpay_order', args=[fixtures['slugs'][rng.choice(not_owned)]])
+        return {'user_id': user_id, 'method': 'post', 'url': url, 'expect': (200,)}
+
+    # ----------------------------------------------------------------
+    # Helpers
+    # ----------------------------------------------------------------
+    def _client(self, clients, user_id):
+        """Logged-in client per user; logging in is set-up, not part of the timed request."""
+        client = clients.get(user_id)
+        if client is None:
+            from lms.models import User
+            # View errors come back as 500 responses instead of raising
+            client = clients[user_id] = Client(raise_request_exception=False)
+            client.force_login(User.objects.get(pk=user_id))
+        return client
+
+    def _send(self, clients, request):
+        """The response, or the exception that escaped it: one failure mustn't end the run."""
+        client = self._client(clients, request['user_id'])
+        try:
+            return getattr(client, request['method'])(request['url'], request.get('data'))
+        except Exception as e:
+            return e
+
+    def _budget(self, url):
+        """(queries, duplicates) declared for the view at `url`, like QueryBudgetMiddleware."""
+        match = resolve(url)
+        return budget_for(match.url_name, match.func)
+
+    def _repeated(self, response):
+        """Repeated statements, from the Server-Timing header QueryBudgetMiddleware adds."""
+        found = re.search(r'dup;desc="(\d+) repeated"', response.get('Server-Timing', ''))
+        return int(found.group(1)) if found else 0
+
+    def _check_budget(self, budget, queries, duplicates):
+        if not budget:
+            return {'queries': None, 'duplicates': None, 'over_budget': 0}
+        max_queries, max_duplicates = budget
+        over = sum(1 for n in queries if n > max_queries)
+        if max_duplicates is not None:
+            over = max(over, sum(1 for n in duplicates if n > max_duplicates))
+        return {
+            'queries': max_queries,
+            'duplicates': max_duplicates,
+            'max_duplicates_seen': max(duplicates, default=0),
+            'over_budget': over,
+        }
+
+    def _summarize(self, latencies, queries, errors, elapsed):
+        def percentile(values, p):
+            if len(values) < 2:
+                return values[0] if values else 0.0
+            return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'mean': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+                'max': round(max(latencies), 2) if latencies else 0.0,
+            },
+            'queries': {
+                'mean': round(statistics.fmean(queries), 2) if queries else 0.0,
+                'max': max(queries) if queries else 0,
+            },
+        }
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.utils.synthetic import BATCH_SIZE, PASSWORD, DatasetExists, DatasetSpec, delete_dataset, generate
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (courses, curriculum, learners, progress, quizzes) for scale testing'
+
+    def add_arguments(self, parser):
+        defaults = DatasetSpec()
+        parser.add_argument('--courses', type=int, default=defaults.courses)
+        parser.add_argument('--days', type=int, default=defaults.days, help='Curriculum days per course')
+        parser.add_argument('--videos', type=int, default=defaults.videos, help='Videos per day')
+        parser.add_argument('--users', type=int, default=defaults.users)
+        parser.add_argument('--courses-per-user', type=int, default=defaults.courses_per_user,
+                            help='Most courses one user buys')
+        parser.add_argument('--questions', type=int, default=defaults.questions, help='Questions per quiz')
+        parser.add_argument('--attempts-per-completion', type=int, default=defaults.attempts_per_completion,
+                            help='Quiz attempts by each learner who finishes a course')
+        parser.add_argument('--reviews-per-course', type=int, default=defaults.reviews_per_course)
+        parser.add_argument('--popularity-skew', type=float, default=defaults.popularity_skew,
+                            help='Zipf exponent of course popularity (0 = uniform)')
+        parser.add_argument('--completion-rate', type=float, default=defaults.completion_rate,
+                            help='Share of enrolments watched to the end')
+        parser.add_argument('--enrollment-ratio', type=float, default=defaults.enrollment_ratio,
+                            help='Share of users with an extra free enrolment')
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per INSERT')
+        parser.add_argument('--delete', action='store_true', help='Delete the dataset with this seed instead')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing dataset with this seed first')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow running with DEBUG off (writes synthetic rows to the configured database)',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG is off: this writes synthetic data to the database. Pass --force if that's intended.")
+
+        spec = DatasetSpec(
+            courses=options['courses'],
+            days=options['days'],
+            videos=options['videos'],
+            users=options['users'],
+            courses_per_user=options['courses_per_user'],
+            questions=options['questions'],
+            attempts_per_completion=options['attempts_per_completion'],
+            reviews_per_course=options['reviews_per_course'],
+            popularity_skew=options['popularity_skew'],
+            completion_rate=options['completion_rate'],
+            enrollment_ratio=options['enrollment_ratio'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+
+        if options['delete'] or options['replace']:
+            started = time.perf_counter()
+            deleted = delete_dataset(spec.prefix)
+            self.stdout.write(f"🧹 Deleted {deleted} rows of dataset {spec.prefix} in {time.perf_counter() - started:.1f}s")
+            if options['delete']:
+                return
+
+        self.stdout.write(f"Generating dataset {spec.prefix} ...")
+        started = time.perf_counter()
+        try:
+            counts = generate(spec, log=lambda message: self.stdout.write(f"    {message}"))
+        except DatasetExists as e:
+            raise CommandError(f"{e}. Use --replace, or a different --seed.")
+        elapsed = max(time.perf_counter() - started, 1e-6)
+
+        for label, count in counts.items():
+            self.stdout.write(f"    {label:<20} {count:>10,}")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s). "
+            f"Log in as {spec.prefix}user1@example.com / {PASSWORD}"
+        ))
+        self.stdout.write("Run `manage.py rebuild_search_index` to make the new courses searchable.")
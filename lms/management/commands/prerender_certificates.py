@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.models import Certificate, Course
+from lms.utils.certificate_pdf import ensure_certificate_pdf
+
+
+class Command(BaseCommand):
+    help = 'Render certificate PDFs into the content-addressed cache ahead of download'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            help='Only certificates for the course with this slug',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render even if a PDF already exists for the current content hash',
+        )
+
+    def handle(self, *args, **options):
+        certificates = Certificate.objects.select_related('user', 'course').order_by('id')
+
+        if options.get('course'):
+            try:
+                course = Course.objects.get(slug=options['course'])
+            except Course.DoesNotExist:
+                raise CommandError(f"Course '{options['course']}' not found")
+            certificates = certificates.filter(course=course)
+
+        total = certificates.count()
+        self.stdout.write(f"Checking {total} certificates...")
+
+        rendered = cached = failed = 0
+        for certificate in certificates.iterator(chunk_size=200):
+            try:
+                _, _, was_rendered = ensure_certificate_pdf(certificate, force=options['force'])
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(
+                    f"    ❌ {certificate.certificate_id}: {e}"
+                ))
+                continue
+            if was_rendered:
+                rendered += 1
+            else:
+                cached += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Rendered {rendered}, already cached {cached}, failed {failed}"
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from lms.models import Course, CourseProgress
+from lms.utils.progress import rebuild_progress_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount CourseProgress completed/total video counters and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            help='Only rebuild progress for the course with this slug',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted rows without writing',
+        )
+
+    def handle(self, *args, **options):
+        queryset = CourseProgress.objects.all()
+
+        slug = options.get('course')
+        if slug:
+            try:
+                course = Course.objects.get(slug=slug)
+            except Course.DoesNotExist:
+                raise CommandError(f"Course '{slug}' not found")
+            queryset = queryset.filter(course=course)
+
+        dry_run = options.get('dry_run', False)
+        drifted = rebuild_progress_counters(queryset, dry_run=dry_run)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"{drifted} CourseProgress rows have drifted (dry run, nothing written)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt counters on {drifted} CourseProgress rows"))
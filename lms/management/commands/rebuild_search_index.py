@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms.utils.search import INDEX_PATH, rebuild_index, search_courses
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course search index from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            help='Run this search against the fresh index and print the top results',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {count} courses into {INDEX_PATH} in {time.perf_counter() - started:.2f}s"
+        ))
+
+        if options.get('query'):
+            started = time.perf_counter()
+            results = search_courses(options['query'])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"\n🔎 '{options['query']}': {results.total} matches in {elapsed_ms:.1f} ms")
+            for course_id, score in results.hits[:10]:
+                self.stdout.write(f"    #{course_id}  {score:.3f}")
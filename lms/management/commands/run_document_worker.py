@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from lms.utils.document_jobs import (
+    STALE_CHECK_INTERVAL, claim_jobs, init_worker, release_job, requeue_stale_jobs, run_job,
+)
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF jobs (certificates, invoices, brochures) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'DOCUMENT_WORKER_PROCESSES', None) or os.cpu_count() or 2,
+            help='Number of render processes',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is drained instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        # Children are spawned fresh and open their own DB connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+
+        def new_pool():
+            return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker)
+
+        self.stdout.write(self.style.SUCCESS(f"📄 Document worker started with {workers} processes"))
+        done_count = failed_count = 0
+
+        pool = new_pool()
+        in_flight = {}
+        orphaned = set()   # futures of a pool already replaced
+        next_stale_check = 0
+        try:
+            while True:
+                if time.monotonic() >= next_stale_check:
+                    requeued = requeue_stale_jobs(exclude=in_flight.values())
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"Re-queued or failed {requeued} stale running jobs"))
+                    next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+
+                free = workers - len(in_flight)
+                if free > 0:
+                    claimed = claim_jobs(free)
+                    for position, job_id in enumerate(claimed):
+                        try:
+                            in_flight[pool.submit(run_job, job_id)] = job_id
+                        except BrokenProcessPool as e:
+                            # A render process died (OOM, crash in WeasyPrint): hand the
+                            # unsubmitted claims back; in-flight futures fail below
+                            for lost in claimed[position:]:
+                                failed_count += release_job(lost, e) == 'failed'
+                            orphaned.update(in_flight)
+                            pool = self._replace_pool(pool, new_pool)
+                            break
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                finished, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    job_id = in_flight.pop(future)
+                    from_old_pool = future in orphaned
+                    orphaned.discard(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        # The render process died: retry or fail it, and free its dedupe key
+                        broken = broken or (isinstance(e, BrokenProcessPool) and not from_old_pool)
+                        status = release_job(job_id, e)
+                        failed_count += status == 'failed'
+                        self.stdout.write(self.style.ERROR(f"    ❌ Job #{job_id}: {e} ({status or 'gone'})"))
+                        continue
+                    if status == 'done':
+                        done_count += 1
+                    else:
+                        failed_count += status == 'failed'
+                    self.stdout.write(f"    Job #{job_id}: {status}")
+                if broken:
+                    pool = self._replace_pool(pool, new_pool)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nStopping; in-flight jobs will finish first'))
+        finally:
+            pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Rendered {done_count}, failed {failed_count}"))
+
+    def _replace_pool(self, pool, new_pool):
+        self.stdout.write(self.style.WARNING("Render process pool broke; starting a new one"))
+        pool.shutdown(wait=False, cancel_futures=True)
+        return new_pool()
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from lms.utils.outbox import STALE_CHECK_INTERVAL, claim_due, deliver, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Drain the transactional email outbox (purchase confirmations) with retry and backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Emails sent concurrently',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Rows claimed per poll',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when nothing is due',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send what is due now and exit',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"📧 Outbox worker started with {options['workers']} senders"))
+        totals = {'sent': 0, 'pending': 0, 'failed': 0, 'skipped': 0}
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            next_stale_check = 0
+            try:
+                while True:
+                    # Batches are awaited below, so none of our own rows are 'sending' here
+                    if time.monotonic() >= next_stale_check:
+                        requeued = requeue_stale()
+                        if requeued:
+                            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale emails"))
+                        next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+
+                    ids = claim_due(options['batch_size'])
+                    if not ids:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    for message_id, status in zip(ids, pool.map(deliver, ids)):
+                        totals[status] += 1
+                        if status == 'failed':
+                            self.stdout.write(self.style.ERROR(f"    ❌ Email #{message_id} gave up"))
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('\nStopping outbox worker'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Sent {totals['sent']}, retrying {totals['pending']}, failed {totals['failed']}"
+        ))
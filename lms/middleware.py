@@ -0,0 +1,203 @@
+"""
+lms/middleware.py
+Per-request SQL instrumentation and query budgets.
+
+QueryBudgetMiddleware wraps every database connection with
+`connection.execute_wrapper` for the duration of a request and records the
+number of queries, total SQL time and repeated statements (the same SQL
+text run again and again is the signature of an N+1 loop).  Every response
+gets a `Server-Timing` header, so the numbers show up in the browser's
+network panel.
+
+Views declare a budget with @query_budget(n); QUERY_BUDGETS in settings can
+override it by URL name.  Going over budget logs the worst repeated
+statements, and raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is on
+(lms/tests.py turns it on) so a regression fails CI instead of MySQL in
+production.
+
+Both middlewares here run natively under ASGI as well as WSGI, so the async
+views (create_razorpay_order) are awaited on the event loop instead of
+being pinned to a thread for the whole request.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Requests spending longer than this in SQL are logged even within budget
+SLOW_SQL_MS = getattr(settings, "QUERY_BUDGET_SLOW_SQL_MS", 200)
+WORST_SHOWN = 3
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries, duplicates=None):
+    """
+    Declare the most queries (and optionally repeated statements) one
+    request to this view may run.  Put it outermost so other decorators
+    can't hide it.
+    """
+    def decorator(view):
+        view.query_budget = (queries, duplicates)
+        return view
+    return decorator
+
+
+def budget_for(url_name, view_func):
+    """
+    (queries, duplicates) for a view, QUERY_BUDGETS first, or None.
+
+    Settings are read per call so tests can switch them with override_settings.
+    """
+    budget = getattr(settings, "QUERY_BUDGETS", {}).get(url_name) or getattr(view_func, "query_budget", None)
+    if isinstance(budget, int):
+        budget = (budget, None)
+    return budget
+
+
+class QueryStats:
+    """execute_wrapper callable that tallies what a request runs."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self) -> int:
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def worst(self, limit=WORST_SHOWN) -> list:
+        return [(n, sql) for sql, n in self.statements.most_common(limit) if n > 1]
+
+
+def _wrap_connections(stack, stats):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats))
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        request._query_budget = None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        request._query_budget = None
+        started = time.perf_counter()
+        # Async ORM calls run in the request's sync thread, whose connections
+        # differ from the event loop's: wrap (and unwrap) them over there
+        stack = ExitStack()
+        await sync_to_async(_wrap_connections)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    def _finish(self, request, response, stats, total):
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f'dup;desc="{stats.duplicates} repeated"',
+            f"app;dur={total * 1000:.1f}",
+        ])
+        self._check(request, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        budget = budget_for(url_name, view_func)
+        request._query_budget = (url_name or view_func.__name__, budget) if budget else None
+        return None
+
+    def _check(self, request, stats):
+        declared = request._query_budget
+        over = []
+        if declared:
+            name, (max_queries, max_duplicates) = declared
+            if stats.count > max_queries:
+                over.append(f"{stats.count} queries (budget {max_queries})")
+            if max_duplicates is not None and stats.duplicates > max_duplicates:
+                over.append(f"{stats.duplicates} repeated (budget {max_duplicates})")
+        else:
+            name = request.path
+
+        if not over and stats.duration * 1000 < SLOW_SQL_MS:
+            return
+
+        worst = "\n".join(f"    {n}x {sql[:300]}" for n, sql in stats.worst())
+        message = (
+            f"{name}: {', '.join(over) or 'slow SQL'} — {stats.count} queries, "
+            f"{stats.duration * 1000:.0f} ms SQL, {request.method} {request.get_full_path()}"
+            + (f"\n  Most repeated:\n{worst}" if worst else "")
+        )
+        if over and getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that doesn't force the rest of the stack into sync mode.
+
+    Stock WhiteNoiseMiddleware is sync-only, so under ASGI Django would run
+    every request below it in a thread.  Static hits are served the same
+    way (file lookups are in-memory unless autorefresh is on); everything
+    else is awaited directly.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
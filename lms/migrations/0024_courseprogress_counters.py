@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    CourseProgress = apps.get_model('lms', 'CourseProgress')
+    Video = apps.get_model('lms', 'Video')
+
+    totals = dict(
+        Video.objects.order_by()
+        .values_list('curriculum_day__course_id')
+        .annotate(n=Count('id'))
+    )
+    rows = CourseProgress.objects.order_by().annotate(actual_completed=Count('completed_videos'))
+    updated = []
+    for progress in rows.iterator():
+        progress.completed_count = progress.actual_completed
+        progress.total_count = totals.get(progress.course_id, 0)
+        updated.append(progress)
+    CourseProgress.objects.bulk_update(updated, ['completed_count', 'total_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0023_coursetool_is_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseprogress',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, help_text='Videos in completed_videos'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, help_text='Videos in the course'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
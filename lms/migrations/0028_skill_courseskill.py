@@ -0,0 +1,133 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copies of lms.utils.skills / Course.*_ICON_MAP as of this migration,
+# so later edits to the app code can't change what it does.
+SKILL = 'skill'
+TOOL = 'tool'
+DEFAULT_ICONS = {SKILL: 'fas fa-code', TOOL: 'fas fa-toolbox'}
+ICONS = {
+    SKILL: {
+        'python': 'fab fa-python',
+        'django': 'fab fa-python',
+        'flask': 'fas fa-flask',
+        'react': 'fab fa-react',
+        'javascript': 'fab fa-js-square',
+        'html': 'fab fa-html5',
+        'css': 'fab fa-css3-alt',
+        'git': 'fab fa-git-alt',
+        'github': 'fab fa-github',
+        'docker': 'fab fa-docker',
+        'aws': 'fab fa-aws',
+        'database': 'fas fa-database',
+        'sql': 'fas fa-database',
+        'mongodb': 'fas fa-database',
+        'rest api': 'fas fa-code',
+        'testing': 'fas fa-vial',
+        'security': 'fas fa-shield-alt',
+        'devops': 'fas fa-server',
+        'ui': 'fas fa-paint-brush',
+        'ux': 'fas fa-user-friends',
+        'figma': 'fab fa-figma',
+    },
+    TOOL: {
+        'vscode': 'fas fa-code',
+        'visual studio code': 'fas fa-code',
+        'github': 'fab fa-github',
+        'git': 'fab fa-git-alt',
+        'postman': 'fas fa-code',
+        'docker': 'fab fa-docker',
+        'jenkins': 'fas fa-cog',
+        'aws': 'fab fa-aws',
+        'figma': 'fab fa-figma',
+        'notion': 'fas fa-sticky-note',
+        'jira': 'fab fa-jira',
+        'slack': 'fab fa-slack',
+    },
+}
+
+
+def skill_key(name):
+    return ' '.join(name.lower().split())[:100]
+
+
+def parse_names(text):
+    names, seen = [], set()
+    for name in (text or '').split(','):
+        name = name.strip()
+        if name and skill_key(name) not in seen:
+            seen.add(skill_key(name))
+            names.append(name)
+    return names
+
+
+def forwards(apps, schema_editor):
+    """Split every course's comma-separated skills / tools_learned into Skill rows."""
+    Course = apps.get_model('lms', 'Course')
+    Skill = apps.get_model('lms', 'Skill')
+    CourseSkill = apps.get_model('lms', 'CourseSkill')
+
+    skills = {}
+    links = []
+    for course in Course.objects.only('id', 'skills', 'tools_learned').iterator(chunk_size=500):
+        for kind, text in ((SKILL, course.skills), (TOOL, course.tools_learned)):
+            for position, name in enumerate(parse_names(text)):
+                key = (kind, skill_key(name))
+                if key not in skills:
+                    icon = ICONS[kind].get(key[1], DEFAULT_ICONS[kind])
+                    skills[key] = Skill(kind=kind, key=key[1], name=name[:100], icon=icon)
+                links.append((course.pk, key, position))
+
+    Skill.objects.bulk_create(skills.values(), batch_size=500)
+    ids = {(s.kind, s.key): s.pk for s in Skill.objects.all()}
+    CourseSkill.objects.bulk_create(
+        [CourseSkill(course_id=course_id, skill_id=ids[key], position=position)
+         for course_id, key, position in links],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0027_course_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('skill', 'Skill'), ('tool', 'Tool')], default='skill', max_length=10)),
+                ('key', models.CharField(help_text='Lower-cased name used for lookups', max_length=100)),
+                ('name', models.CharField(max_length=100)),
+                ('icon', models.CharField(help_text='Font Awesome class, resolved once on creation', max_length=100)),
+            ],
+            options={
+                'ordering': ['kind', 'name'],
+                'unique_together': {('kind', 'key')},
+                'indexes': [models.Index(fields=['key'], name='lms_skill_key_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='lms.course')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_links', to='lms.skill')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('course', 'skill')},
+                'indexes': [models.Index(fields=['skill', 'course'], name='lms_courseskill_skill_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='skill_tags',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='lms.CourseSkill', to='lms.skill'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -240,6 +240,29 @@ class Tool(models.Model):
     def __str__(self):
         return self.name
 
+
+# ============================
+# SKILL (normalized Course.skills / tools_learned)
+# ============================
+class Skill(models.Model):
+    """One distinct skill or tool name; kept in sync from the course text fields"""
+    KIND_CHOICES = [
+        ('skill', 'Skill'),
+        ('tool', 'Tool'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='skill')
+    key = models.CharField(max_length=100, help_text="Lower-cased name used for lookups")
+    name = models.CharField(max_length=100)
+    icon = models.CharField(max_length=100, help_text="Font Awesome class, resolved once on creation")
+
+    class Meta:
+        ordering = ['kind', 'name']
+        unique_together = ['kind', 'key']
+        indexes = [models.Index(fields=['key'], name='lms_skill_key_idx')]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
+
 # ============================
 # COURSE
 # ============================
@@ -357,6 +380,14 @@ class Course(models.Model):
 
     certification_details = models.TextField(blank=True)
 
+    # Normalized copy of `skills` / `tools_learned`, synced on save
+    skill_tags = models.ManyToManyField(
+        Skill,
+        through='CourseSkill',
+        blank=True,
+        related_name='courses'
+    )
+
     # =========================
     # MEDIA
     # =========================
@@ -433,6 +464,11 @@ class Course(models.Model):
         ordering = ['-created_at']
         verbose_name = "Course"
         verbose_name_plural = "Courses"
+        # Catalog keyset pagination seeks on (created_at, id) — see lms/utils/catalog.py
+        indexes = [
+            models.Index(fields=['is_active', 'created_at', 'id'], name='lms_course_catalog_idx'),
+            models.Index(fields=['category', 'is_active', 'created_at', 'id'], name='lms_course_cat_catalog_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -451,49 +487,63 @@ class Course(models.Model):
             )
         return 0
 
+    def _parsed(self, kind):
+        """
+        [{'name', 'icon'}] for the skill / tool text, parsed once per
+        instance (re-parsed only if the text itself changes).
+        """
+        from .utils.skills import SKILL, icon_for, parse_names
+
+        text = self.skills if kind == SKILL else self.tools_learned
+        memo = self.__dict__.setdefault('_parsed_skills', {})
+        if kind not in memo or memo[kind][0] != text:
+            memo[kind] = (text, [{'name': name, 'icon': icon_for(kind, name)} for name in parse_names(text)])
+        return memo[kind][1]
+
     def get_skills_list(self):
-        return [s.strip() for s in self.skills.split(',') if s.strip()]
+        return [skill['name'] for skill in self._parsed('skill')]
 
     def get_tools_list(self):
-        return [t.strip() for t in self.tools_learned.split(',') if t.strip()]
+        return [tool['name'] for tool in self._parsed('tool')]
 
     # =========================
     # NEW ICON METHODS
     # =========================
     def get_skill_icon(self, skill_name):
         """Get icon for a specific skill"""
-        skill_lower = skill_name.lower().strip()
-        return self.SKILL_ICON_MAP.get(skill_lower, 'fas fa-code')
+        from .utils.skills import icon_for
+        return icon_for('skill', skill_name)
 
     def get_tool_icon(self, tool_name):
         """Get icon for a specific tool"""
-        tool_lower = tool_name.lower().strip()
-        return self.TOOL_ICON_MAP.get(tool_lower, 'fas fa-toolbox')
+        from .utils.skills import icon_for
+        return icon_for('tool', tool_name)
 
     def get_skills_with_icons(self):
         """Return list of skills with their icons"""
-        skills_list = self.get_skills_list()
-        return [
-            {
-                'name': skill,
-                'icon': self.get_skill_icon(skill)
-            }
-            for skill in skills_list
-        ]
+        return self._parsed('skill')
 
     def get_tools_with_icons(self):
         """Return list of tools with their icons"""
-        tools_list = self.get_tools_list()
-        return [
-            {
-                'name': tool,
-                'icon': self.get_tool_icon(tool)
-            }
-            for tool in tools_list
-        ]
+        return self._parsed('tool')
 
 
 
+class CourseSkill(models.Model):
+    """Course -> Skill link; (skill, course) is indexed for "courses teaching X" lookups"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='course_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        unique_together = ['course', 'skill']
+        indexes = [models.Index(fields=['skill', 'course'], name='lms_courseskill_skill_idx')]
+
+    def __str__(self):
+        return f"{self.course} - {self.skill}"
+
+
 # ============================
 # COURSE TOOL (Legacy - for backward compatibility)
 # ============================
@@ -826,25 +876,15 @@ class Video(models.Model):
     # ACCESS CONTROL
     # ==================================================
     def is_accessible_by(self, user):
-        from .models import Purchase
-
-        # Free video or free day
-        if self.is_free or self.curriculum_day.is_free:
-            return True
-
-        # Day 1 is free
-        if self.curriculum_day.day_number == 1:
-            return True
+        """
+        Free video / free day / Day 1 are open to all, the rest needs a purchase.
 
-        # Purchased users
-        if user.is_authenticated:
-            return Purchase.objects.filter(
-                user=user,
-                course=self.curriculum_day.course,
-                payment_status="completed"
-            ).exists()
+        Views should prefer lms.utils.entitlements.get_entitlements(request),
+        which resolves the user's purchases once per request.
+        """
+        from .utils.entitlements import Entitlements
 
-        return False
+        return Entitlements.for_user(user).can_access_video(self)
 
     class Meta:
         verbose_name = "Video"
@@ -1154,6 +1194,9 @@ class Payment(models.Model):
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
         ordering = ['-created_at']
+        # finalize_payment() locks the row by order id: index it so InnoDB
+        # locks that one row, not every row a table scan passes
+        indexes = [models.Index(fields=['razorpay_order_id'], name='lms_payment_order_idx')]
     
 
 
@@ -1245,6 +1288,11 @@ class CourseProgress(models.Model):
     quiz_passed = models.BooleanField(default=False)
     last_quiz_attempt_id = models.CharField(max_length=100, blank=True, null=True, help_text="ID of the quiz attempt that passed")
     
+    # Denormalized counters — kept in step by mark_video_completed() and the
+    # Video signals; `manage.py rebuild_course_progress` repairs any drift.
+    completed_count = models.PositiveIntegerField(default=0, help_text="Videos in completed_videos")
+    total_count = models.PositiveIntegerField(default=0, help_text="Videos in the course")
+    
     
     class Meta:
         unique_together = ['user', 'course']
@@ -1253,17 +1301,53 @@ class CourseProgress(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.course.title} ({self.progress_percentage}%)"
     
+    def _percentage(self):
+        if not self.total_count:
+            return 0
+        return round(min(self.completed_count, self.total_count) / self.total_count * 100, 2)
+    
     def update_progress(self):
-        """Calculate and update course progress"""
-        # Get total videos count through curriculum days
-        total_videos = Video.objects.filter(
-            curriculum_day__course=self.course
-        ).count()
+        """Recalculate progress_percentage from the stored counters (no counting)"""
+        if self.total_count > 0:
+            self.progress_percentage = self._percentage()
+            CourseProgress.objects.filter(pk=self.pk).update(
+                progress_percentage=self.progress_percentage
+            )
+    
+    def mark_video_completed(self, video):
+        """
+        Record `video` as completed — O(1) regardless of course size.
         
-        if total_videos > 0:
-            completed = self.completed_videos.count()
-            self.progress_percentage = (completed / total_videos) * 100
-            self.save()
+        Adds the M2M row and, only when it is new, bumps completed_count
+        with an atomic F() increment. Returns True on a first completion.
+        """
+        from django.db.models import F
+        
+        video_id = getattr(video, 'pk', video)
+        _, created = CourseProgress.completed_videos.through.objects.get_or_create(
+            courseprogress_id=self.pk,
+            video_id=video_id,
+        )
+        if created:
+            CourseProgress.objects.filter(pk=self.pk).update(
+                completed_count=F('completed_count') + 1
+            )
+            self.refresh_from_db(fields=['completed_count', 'total_count'])
+            self.update_progress()
+        return created
+    
+    def rebuild_counters(self):
+        """Recount both counters from scratch (admin / drift repair)"""
+        self.completed_count = self.completed_videos.count()
+        self.total_count = Video.objects.filter(
+            curriculum_day__course_id=self.course_id
+        ).count()
+        self.progress_percentage = self._percentage()
+        CourseProgress.objects.filter(pk=self.pk).update(
+            completed_count=self.completed_count,
+            total_count=self.total_count,
+            progress_percentage=self.progress_percentage,
+        )
     
     def has_passed_quiz_actually(self):
         """
@@ -1291,19 +1375,15 @@ class CourseProgress(models.Model):
     
     def check_completion(self):
         """Check if course is fully completed (all videos + quiz passed)"""
-        # Get total videos count through curriculum days
-        total_videos = Video.objects.filter(
-            curriculum_day__course=self.course
-        ).count()
-        
-        completed_videos = self.completed_videos.count()
+        total_videos = self.total_count
+        completed_videos = self.completed_count
         
         # Only mark as completed if:
         # 1. All videos are completed
         # 2. Quiz is actually passed (not just flagged)
         # 3. Not already marked as completed
         if total_videos > 0:
-            videos_completed = completed_videos == total_videos
+            videos_completed = completed_videos >= total_videos
             quiz_actually_passed = self.has_passed_quiz_actually()
             
             if videos_completed and quiz_actually_passed and not self.is_completed:
@@ -1373,13 +1453,11 @@ class CourseProgress(models.Model):
     
     def get_total_videos_count(self):
         """Helper to get total videos count"""
-        return Video.objects.filter(
-            curriculum_day__course=self.course
-        ).count()
+        return self.total_count
     
     def get_completed_videos_count(self):
         """Helper to get completed videos count"""
-        return self.completed_videos.count()
+        return self.completed_count
     
     def get_completion_requirements(self):
         """Get completion requirements status"""
@@ -1395,9 +1473,9 @@ class CourseProgress(models.Model):
             'quiz_actually_passed': self.has_passed_quiz_actually(),
             'is_completed': self.is_completed,
             'requirements_met': {
-                'videos': completed_videos == total_videos,
+                'videos': completed_videos >= total_videos,
                 'quiz': quiz_passed,
-                'all': completed_videos == total_videos and quiz_passed
+                'all': completed_videos >= total_videos and quiz_passed
             }
         }
     
@@ -1444,6 +1522,11 @@ class CourseProgress(models.Model):
         # Run validation
         self.clean()
         
+        # Seed the course size on first save (cached curriculum, no count query when warm)
+        if self._state.adding and not self.total_count:
+            from .utils.curriculum import get_curriculum
+            self.total_count = get_curriculum(self.course_id).video_count
+        
         # Prevent is_completed being True without actual completion
         if self.is_completed:
             requirements = self.get_completion_requirements()
@@ -1528,30 +1611,28 @@ class QuizAttempt(models.Model):
         return f"{self.user.email} - {self.quiz.title} - Score: {self.score}%"
 
     
-    def calculate_score(self):
-        """Calculate the score for this attempt"""
+    def calculate_score(self, selections=None):
+        """
+        Calculate the score for this attempt.
+        
+        `selections` ({question_id: answer ids}) skips re-reading responses
+        that the caller has just saved.
+        """
         # Ensure the attempt is actually completed
         if not self.completed_at:
             raise ValueError("Cannot calculate score for incomplete attempt")
         
-        total_points = sum(q.points for q in self.quiz.questions.all())
-        if total_points == 0:
+        from .utils.quiz_grading import grade_attempt
+        
+        graded = grade_attempt(self, selections=selections)
+        if graded.total_points == 0:
             self.score = 0
             self.passed = False
             self.save()
             return 0
         
-        earned_points = 0
-        total_responses = self.responses.count()
-        total_questions = self.quiz.questions.count()
-        
-        # Calculate earned points
-        for response in self.responses.all():
-            if response.is_correct():
-                earned_points += response.question.points
-        
         # Calculate percentage score
-        score = (earned_points / total_points) * 100
+        score = graded.percentage
         self.score = round(score, 2)
         self.passed = score >= self.quiz.passing_score
         self.save()
@@ -1581,14 +1662,13 @@ class QuizResponse(models.Model):
     
     def is_correct(self):
         """Check if the response is correct"""
-        correct_answers = set(self.question.answers.filter(is_correct=True))
-        selected_answers = set(self.selected_answers.all())
+        from .utils.quiz_grading import get_answer_key, is_correct_selection
         
-        if self.question.question_type == 'single' or self.question.question_type == 'true_false':
-            return len(selected_answers) == 1 and selected_answers == correct_answers
-        elif self.question.question_type == 'multiple':
-            return selected_answers == correct_answers
-        return False
+        question_key = get_answer_key(self.question.quiz_id).get(self.question_id)
+        if question_key is None:
+            return False
+        selected_ids = self.selected_answers.values_list('id', flat=True)
+        return is_correct_selection(question_key, selected_ids)
 
 
 class Certificate(models.Model):
@@ -1624,4 +1704,92 @@ class Certificate(models.Model):
             except:
                 pass
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+# ============================
+# BACKGROUND DOCUMENT JOBS
+# ============================
+class DocumentJob(models.Model):
+    """A PDF render (certificate / invoice / brochure) queued for the document worker"""
+    KIND_CHOICES = [
+        ('certificate', 'Certificate'),
+        ('invoice', 'Invoice'),
+        ('brochure', 'Brochure'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=64, db_index=True, help_text="Hash of kind + params")
+    # Equal to dedupe_key while pending/running, NULL once finished: the unique
+    # index lets only one identical job be in flight at a time
+    active_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='document_jobs'
+    )
+    result_file = models.CharField(max_length=255, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'], name='lms_docjob_status_created_idx')]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} job #{self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+# ============================
+# TRANSACTIONAL EMAIL OUTBOX
+# ============================
+class EmailOutbox(models.Model):
+    """Email written in the same transaction as the change it announces, sent by a worker"""
+    KIND_CHOICES = [
+        ('purchase_confirmation', 'Purchase Confirmation'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=40, choices=KIND_CHOICES)
+    # One row per logical email, e.g. "purchase_confirmation:42"
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    purchase = models.ForeignKey(
+        Purchase, on_delete=models.CASCADE, null=True, blank=True, related_name='outbox_emails'
+    )
+    recipient = models.EmailField()
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Email Outbox'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='lms_outbox_status_next_idx')]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} → {self.recipient} ({self.status})"
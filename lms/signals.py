@@ -10,3 +10,261 @@
 # @receiver(post_save, sender=Video)
 # def extract_video_duration(sender, instance, created, **kwargs):
 #     pass
+
+
+# ============================
+# ENTITLEMENT CACHE INVALIDATION
+# ============================
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from .models import (
+    Purchase, CourseEnrollment, Course, CurriculumDay, Video, CourseProgress,
+    Question, Answer, Certificate,
+    HeroSection, FeatureSection, FeatureItem, HomeAboutSection, CourseCategory,
+    HomeBanner, Instructor, Testimonial, FAQ, CourseReview, CourseTool, Tool,
+)
+from .utils.entitlements import invalidate_entitlements
+from .utils.achievements import invalidate_achievements
+from .utils.curriculum import bump_curriculum_version
+from .utils.progress import refresh_course_totals
+from .utils.quiz_grading import invalidate_answer_key
+from .utils.home_snapshot import invalidate_home_snapshot
+from .utils.page_cache import purge_page_tags
+from .utils.search import index_courses
+from .utils.skills import sync_course_skills
+
+
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def refresh_user_entitlements(sender, instance, **kwargs):
+    # After commit: dropped any earlier, a concurrent request could re-cache
+    # the pre-commit snapshot and lock a buyer out of the course just bought
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_entitlements(user_id))
+
+
+# ============================
+# ACHIEVEMENTS CACHE INVALIDATION
+# ============================
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+@receiver(post_save, sender=CourseProgress)
+@receiver(post_delete, sender=CourseProgress)
+def refresh_user_achievements(sender, instance, **kwargs):
+    invalidate_achievements(instance.user_id)
+
+
+# ============================
+# CURRICULUM TREE VERSIONING
+# ============================
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_curriculum(sender, instance, **kwargs):
+    bump_curriculum_version(instance.pk)
+
+
+@receiver(post_save, sender=CurriculumDay)
+@receiver(post_delete, sender=CurriculumDay)
+def bump_day_curriculum(sender, instance, **kwargs):
+    bump_curriculum_version(instance.course_id)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def bump_video_curriculum(sender, instance, **kwargs):
+    course_id = _video_course_id(instance)
+    bump_curriculum_version(course_id)
+
+    # Course size changed: re-seed CourseProgress.total_count
+    if kwargs.get('created', True):
+        refresh_course_totals(course_id)
+
+
+def _video_course_id(video):
+    # Use the cached day when present; on cascade deletes the day may already
+    # be gone, in which case its own post_delete has bumped the course.
+    if Video.curriculum_day.is_cached(video):
+        return video.curriculum_day.course_id
+    return CurriculumDay.objects.filter(
+        pk=video.curriculum_day_id
+    ).values_list('course_id', flat=True).first()
+
+
+# ============================
+# COURSEPROGRESS COUNTERS
+# ============================
+@receiver(pre_delete, sender=Video)
+def uncount_deleted_video(sender, instance, **kwargs):
+    # The M2M rows go with the video, so take it off completed_count first
+    from django.db.models import F
+
+    CourseProgress.objects.filter(
+        completed_videos=instance,
+        completed_count__gt=0,
+    ).update(completed_count=F('completed_count') - 1)
+
+
+@receiver(post_delete, sender=CurriculumDay)
+def refresh_totals_after_day_delete(sender, instance, **kwargs):
+    refresh_course_totals(instance.course_id)
+
+
+# ============================
+# QUIZ ANSWER KEY
+# ============================
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def refresh_question_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key(instance.quiz_id)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def refresh_answer_answer_key(sender, instance, **kwargs):
+    if Answer.question.is_cached(instance):
+        quiz_id = instance.question.quiz_id
+    else:
+        quiz_id = Question.objects.filter(
+            pk=instance.question_id
+        ).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_answer_key(quiz_id)
+
+
+# ============================
+# HOME PAGE SNAPSHOT
+# ============================
+HOME_MODELS = (
+    HeroSection, FeatureSection, FeatureItem, HomeAboutSection, CourseCategory,
+    HomeBanner, Instructor, Testimonial, FAQ, Course,
+)
+
+
+def refresh_home_snapshot(sender, **kwargs):
+    invalidate_home_snapshot()
+
+
+for _model in HOME_MODELS:
+    post_save.connect(refresh_home_snapshot, sender=_model, dispatch_uid=f'home_snapshot_save_{_model.__name__}')
+    post_delete.connect(refresh_home_snapshot, sender=_model, dispatch_uid=f'home_snapshot_delete_{_model.__name__}')
+
+
+# ============================
+# ANONYMOUS PAGE CACHE TAGS
+# ============================
+def _course_page_tags(course_id):
+    row = Course.objects.filter(pk=course_id).values_list('slug', 'category__slug').first()
+    if row is None:
+        return []
+    slug, category_slug = row
+    return [f'course:{slug}', f'category:{category_slug}' if category_slug else None]
+
+
+def _purge_course_detail(course_id):
+    slug = Course.objects.filter(pk=course_id).values_list('slug', flat=True).first()
+    if slug:
+        purge_page_tags(f'course:{slug}')
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_page_tags(sender, instance, **kwargs):
+    # Slug / category may be about to change: purge the pages under the old ones too
+    instance._old_page_tags = _course_page_tags(instance.pk) if instance.pk else []
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def purge_course_pages(sender, instance, **kwargs):
+    category_slug = (
+        CourseCategory.objects.filter(pk=instance.category_id).values_list('slug', flat=True).first()
+        if instance.category_id else None
+    )
+    purge_page_tags(
+        'courses:all',
+        f'course:{instance.slug}',
+        f'category:{category_slug}' if category_slug else None,
+        *getattr(instance, '_old_page_tags', []),
+    )
+
+
+@receiver(post_save, sender=CourseCategory)
+@receiver(post_delete, sender=CourseCategory)
+def purge_category_pages(sender, instance, **kwargs):
+    purge_page_tags('categories', f'category:{instance.slug}')
+
+
+@receiver(post_save, sender=CurriculumDay)
+@receiver(post_delete, sender=CurriculumDay)
+@receiver(post_save, sender=CourseReview)
+@receiver(post_delete, sender=CourseReview)
+@receiver(post_save, sender=CourseTool)
+@receiver(post_delete, sender=CourseTool)
+def purge_course_detail_page(sender, instance, **kwargs):
+    _purge_course_detail(instance.course_id)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def purge_video_course_page(sender, instance, **kwargs):
+    course_id = _video_course_id(instance)
+    if course_id is not None:
+        _purge_course_detail(course_id)
+
+
+@receiver(post_save, sender=Instructor)
+@receiver(post_delete, sender=Instructor)
+def purge_instructor_pages(sender, instance, **kwargs):
+    purge_page_tags('instructors')
+
+
+# ============================
+# NORMALIZED SKILLS
+# ============================
+@receiver(post_save, sender=Course)
+def sync_skill_tags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_course_skills(instance)
+
+
+# ============================
+# COURSE SEARCH INDEX
+# ============================
+def _reindex_courses(course_ids):
+    course_ids = list(course_ids)
+    if course_ids:
+        transaction.on_commit(lambda: index_courses(course_ids), robust=True)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def reindex_course(sender, instance, **kwargs):
+    _reindex_courses([instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.tools.through)
+def reindex_course_tools(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _reindex_courses([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        _reindex_courses(pk_set)
+    elif action == 'pre_clear':
+        _reindex_courses(instance.courses.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=CourseCategory)
+@receiver(pre_delete, sender=CourseCategory)
+def reindex_category_courses(sender, instance, **kwargs):
+    _reindex_courses(Course.objects.filter(category_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tool)
+@receiver(pre_delete, sender=Tool)
+def reindex_tool_courses(sender, instance, **kwargs):
+    _reindex_courses(instance.courses.values_list('pk', flat=True))
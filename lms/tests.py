@@ -1,3 +1,125 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .middleware import QueryBudgetExceeded
+from .models import Purchase, Quiz, QuizAttempt, Video
+from .utils.quiz_grading import get_graded_attempt
+from .utils.search import CourseIndex, tokenize
+from .utils.synthetic import DatasetSpec, generate
+from .views import _redirect_without_cursor
+
+
+def _doc(text, category="", level="all"):
+    terms = {}
+    for token in tokenize(text):
+        terms[token] = terms.get(token, 0.0) + 1.0
+    return {"category": category, "category_name": category, "level": level, "terms": terms}
+
+
+class CourseIndexSearchTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CourseIndex({
+            1: _doc("Data Structures and Algorithms in Python"),
+            2: _doc("Building REST APIs with Django"),
+            3: _doc("Dataset cleaning with pandas"),
+        })
+
+    def ids(self, query):
+        return [course_id for course_id, _ in self.index.search(query).hits]
+
+    def test_plural_last_word_matches_stemmed_terms(self):
+        self.assertEqual(self.ids("data structures"), [1])
+        self.assertEqual(self.ids("apis"), [2])
+
+    def test_last_word_is_a_prefix_while_typing(self):
+        self.assertEqual(self.ids("data struc"), [1])
+        self.assertEqual(sorted(self.ids("dat")), [1, 3])
+
+    def test_trailing_space_completes_the_word(self):
+        self.assertEqual(self.ids("data structures "), [1])
+        self.assertEqual(self.ids("structure"), [1])
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Budgeted views, requested by a buyer with a cold and then a warm cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate(DatasetSpec(courses=3, days=3, videos=3, users=4, courses_per_user=2, questions=3, seed=7))
+        purchase = (
+            Purchase.objects.filter(payment_status="completed")
+            .select_related("user", "course")
+            .order_by("id")
+            .first()
+        )
+        cls.user, cls.course = purchase.user, purchase.course
+        # A paid lesson, so the entitlement check runs
+        cls.video = (
+            Video.objects.filter(curriculum_day__course=cls.course, curriculum_day__day_number__gt=1)
+            .order_by("-curriculum_day__day_number", "-order")
+            .first()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertWithinBudget(self, url):
+        # QueryBudgetMiddleware raises QueryBudgetExceeded out of the client
+        for state in ("cold", "warm"):
+            with self.subTest(cache=state):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_course_detail(self):
+        self.assertWithinBudget(reverse("course_detail", args=[self.course.slug]))
+
+    def test_video_player(self):
+        self.assertWithinBudget(reverse("video_player", args=[self.video.id]))
+
+    def test_my_courses(self):
+        self.assertWithinBudget(reverse("my_courses"))
+
+    def test_my_achievements(self):
+        self.assertWithinBudget(reverse("my_achievements"))
+
+    @override_settings(QUERY_BUDGETS={"my_courses": 1})
+    def test_over_budget_fails(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("my_courses"))
+
+
+class GradedAttemptCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(DatasetSpec(courses=1, days=1, videos=1, users=1, courses_per_user=1, questions=1, seed=7))
+        cls.quiz = Quiz.objects.filter(questions__isnull=False).first()
+        cls.question = cls.quiz.questions.first()
+        cls.user = Purchase.objects.first().user
+
+    def setUp(self):
+        cache.clear()
+
+    def test_answer_key_change_regrades_cached_attempt(self):
+        correct = self.question.answers.filter(is_correct=True).first()
+        wrong = self.question.answers.filter(is_correct=False).first()
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, user=self.user)
+        attempt.responses.create(question=self.question).selected_answers.add(correct)
+        self.assertTrue(get_graded_attempt(attempt).verdicts[self.question.id])
+
+        correct.is_correct, wrong.is_correct = False, True
+        correct.save()
+        wrong.save()
+        self.assertFalse(get_graded_attempt(attempt).verdicts[self.question.id])
+
+
+class CatalogCursorTests(SimpleTestCase):
+    def test_invalid_cursor_keeps_other_params(self):
+        request = RequestFactory().get("/courses/", {"category": "data", "cursor": "garbage", "utm_source": "ad"})
+        response = _redirect_without_cursor(request)
+        self.assertEqual(response.url, "/courses/?category=data&utm_source=ad")
+
+    def test_invalid_cursor_alone(self):
+        response = _redirect_without_cursor(RequestFactory().get("/courses/", {"cursor": "garbage"}))
+        self.assertEqual(response.url, "/courses/")
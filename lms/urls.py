@@ -13,7 +13,10 @@ urlpatterns = [
     # Course pages
     path('courses/', views.all_courses, name='all_courses'),
     path('courses/category/<slug:category_slug>/', views.courses_by_category, name='courses_by_category'),
+    path('courses/search/', views.course_search, name='course_search'),
     path('courses/<slug:slug>/', views.course_detail, name='course_detail'),
+    path('api/courses/', views.catalog_api, name='catalog_api'),
+    path('api/courses/search/', views.course_search_api, name='course_search_api'),
     path('courses/<slug:slug>/initiate-purchase/', views.initiate_purchase, name='initiate_purchase'),
     path('courses/<slug:slug>/checkout/', views.checkout, name='checkout'),
 
@@ -67,12 +70,18 @@ urlpatterns = [
     path('course/<slug:slug>/download-brochure/', 
          views.download_brochure, 
          name='download_brochure'),
+    path('invoice/<int:order_id>/download/', views.download_invoice, name='download_invoice'),
+
+    # Queued PDF jobs
+    path('documents/job/<int:job_id>/', views.document_job_status, name='document_job_status'),
+    path('documents/job/<int:job_id>/download/', views.document_job_download, name='document_job_download'),
 
     path('fix-images-now/', views.fix_images, name='fix_images'),
 
 
     path('checkout/<slug:slug>/', views.checkout, name='checkout'),
 path('create-razorpay-order/<slug:slug>/', views.create_razorpay_order, name='create_razorpay_order'),
+path('api/payments/gateway/', views.payment_gateway_health, name='payment_gateway_health'),
 path('verify-payment/', views.verify_payment, name='verify_payment'),
 path('payment-success/', views.payment_success, name='payment_success'),
 path('payment-failed/', views.payment_failed, name='payment_failed'),
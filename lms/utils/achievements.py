@@ -0,0 +1,123 @@
+"""
+lms/utils/achievements.py
+Cached per-user achievements dashboard.
+
+Built from three queries — certificates, purchased courses annotated with
+their video count, and the user's CourseProgress rows — then cached per
+user.  Certificate membership is a set lookup and completed videos come
+from the denormalized CourseProgress.completed_count, so the cost does not
+grow with the number of courses.  Progress writes and Certificate /
+Purchase / CourseProgress signals drop the cached copy.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = getattr(settings, "ACHIEVEMENTS_CACHE_TIMEOUT", 300)
+
+CERTIFICATE_FIELDS = (
+    "id", "certificate_id", "issue_date", "quiz_score", "course_id",
+    "course__id", "course__title", "course__slug",
+)
+
+
+def _cache_key(user_id) -> str:
+    return f"lms:achievements:{user_id}"
+
+
+@dataclass(frozen=True)
+class Achievements:
+    certificates: tuple = ()
+    progress_data: tuple = ()
+    total_courses: int = 0
+    total_certificates: int = 0
+    completed_courses: int = 0
+    total_quiz_passed: int = 0
+
+    @property
+    def in_progress_courses(self):
+        return max(0, self.total_courses - self.completed_courses)
+
+
+def build_achievements(user_id) -> Achievements:
+    """Compute the dashboard from the database (three queries)."""
+    from django.db.models import Count
+    from lms.models import Certificate, Course, CourseProgress, Purchase
+
+    certificates = tuple(
+        Certificate.objects.filter(user_id=user_id)
+        .select_related("course")
+        .only(*CERTIFICATE_FIELDS)
+        .order_by("-issue_date")
+    )
+    certified = {certificate.course_id for certificate in certificates}
+
+    purchased_ids = Purchase.objects.filter(
+        user_id=user_id, payment_status="completed"
+    ).values("course_id")
+    courses = list(
+        Course.objects.filter(id__in=purchased_ids)
+        .annotate(video_count=Count("curriculum_days__videos"))
+        .values("id", "title", "slug", "video_count")
+    )
+    progress_by_course = {
+        row["course_id"]: row
+        for row in CourseProgress.objects.filter(
+            user_id=user_id, course_id__in=[course["id"] for course in courses]
+        ).values("course_id", "is_completed", "quiz_passed", "completed_count", "progress_percentage")
+    }
+
+    progress_data = []
+    for course in courses:
+        progress = progress_by_course.get(course["id"])
+        if not progress:
+            continue
+        total_videos = course["video_count"]
+        completed_videos = min(progress["completed_count"], total_videos) if total_videos else 0
+        if total_videos:
+            percentage = completed_videos / total_videos * 100
+        else:
+            percentage = float(progress["progress_percentage"])
+        progress_data.append({
+            "course": {"id": course["id"], "title": course["title"], "slug": course["slug"]},
+            "progress_percentage": round(percentage, 1),
+            "is_completed": progress["is_completed"],
+            "quiz_passed": progress["quiz_passed"],
+            "completed_videos_count": completed_videos,
+            "total_videos": total_videos,
+            "has_certificate": course["id"] in certified,
+        })
+
+    # Completed first, then by how far along
+    progress_data.sort(key=lambda item: (not item["is_completed"], -item["progress_percentage"]))
+
+    completed_from_progress = sum(1 for row in progress_by_course.values() if row["is_completed"])
+    return Achievements(
+        certificates=certificates,
+        progress_data=tuple(progress_data),
+        total_courses=len(courses),
+        total_certificates=len(certificates),
+        completed_courses=max(len(certified), completed_from_progress),
+        total_quiz_passed=sum(1 for row in progress_by_course.values() if row["quiz_passed"]),
+    )
+
+
+def get_achievements(user) -> Achievements:
+    """Cached dashboard for a user instance or id."""
+    user_id = getattr(user, "pk", user)
+    if not CACHE_TIMEOUT:
+        return build_achievements(user_id)
+
+    key = _cache_key(user_id)
+    achievements = cache.get(key)
+    if achievements is None:
+        achievements = build_achievements(user_id)
+        cache.set(key, achievements, CACHE_TIMEOUT)
+    return achievements
+
+
+def invalidate_achievements(user_id) -> None:
+    cache.delete(_cache_key(user_id))
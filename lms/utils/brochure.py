@@ -0,0 +1,226 @@
+"""
+lms/utils/brochure.py
+Build the downloadable course brochure PDF with ReportLab, memoized in a
+bounded on-disk LRU cache.
+
+A brochure only changes when the course does, so each PDF is stored under
+a hash of (course.id, course.updated_at, curriculum version, instructors).
+The same hash is the ETag and course.updated_at the Last-Modified of the
+download, so repeat visitors get a 304 and everyone else a file streamed
+from disk.  Hits refresh the file's mtime; when the directory grows past
+BROCHURE_CACHE_MAX_FILES the least recently used files are evicted.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from .curriculum import get_curriculum
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(getattr(settings, "BROCHURE_CACHE_DIR", Path(settings.MEDIA_ROOT) / "brochure_cache"))
+MAX_FILES = getattr(settings, "BROCHURE_CACHE_MAX_FILES", 200)
+
+
+def render_course_brochure(course) -> bytes:
+    """Return the brochure PDF bytes for `course`."""
+    # Create BytesIO buffer
+    buffer = BytesIO()
+    
+    # Create PDF document
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=26,
+        textColor=colors.HexColor('#10b981'),
+        spaceAfter=20,
+        alignment=1,  # Center
+        fontName='Helvetica-Bold'
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#065f46'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold'
+    )
+    
+    # Title
+    elements.append(Paragraph(course.title, title_style))
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Description
+    if course.description:
+        elements.append(Paragraph("Course Description", heading_style))
+        # Remove HTML tags from description
+        clean_desc = re.sub('<[^<]+?>', '', course.description)
+        elements.append(Paragraph(clean_desc[:500], styles['BodyText']))
+        elements.append(Spacer(1, 0.2*inch))
+    
+    # Course Details Table
+    elements.append(Paragraph("Course Details", heading_style))
+    details_data = [
+        ['Duration', f"{course.duration_hours} Hours"],
+        ['Original Price', f"₹{course.original_price}"],
+        ['Discounted Price', f"₹{course.discounted_price}"],
+        ['Language', course.languages or 'English'],
+        ['Access Level', course.access_level or 'All Levels'],
+        ['Total Learners', str(course.total_learners)],
+    ]
+    
+    details_table = Table(details_data, colWidths=[2*inch, 4*inch])
+    details_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#d1fae5')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('TOPPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    elements.append(details_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Instructors
+    instructors = course.instructors.all()
+    if instructors:
+        elements.append(Paragraph("Instructors", heading_style))
+        instructor_names = ", ".join([inst.name for inst in instructors])
+        elements.append(Paragraph(instructor_names, styles['BodyText']))
+        elements.append(Spacer(1, 0.2*inch))
+    
+    # Curriculum
+    elements.append(Paragraph("Course Curriculum", heading_style))
+    
+    curriculum = get_curriculum(course)
+    for day in curriculum.days:
+        # Day title
+        day_title = f"<b>Day {day.day_number}: {day.title}</b>"
+        elements.append(Paragraph(day_title, styles['Normal']))
+        elements.append(Spacer(1, 0.05*inch))
+        
+        # Videos
+        for video in day.videos:
+            video_text = f"&nbsp;&nbsp;&nbsp;&nbsp;• {video.title} ({video.duration} min)"
+            elements.append(Paragraph(video_text, styles['Normal']))
+        
+        elements.append(Spacer(1, 0.15*inch))
+    
+    # Footer
+    elements.append(Spacer(1, 0.3*inch))
+    footer_text = f"<i>For more information, visit our website or contact us.</i>"
+    elements.append(Paragraph(footer_text, styles['Normal']))
+    
+    # Build PDF
+    doc.build(elements)
+    
+    # Get PDF data
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
+# ============================
+# ON-DISK LRU CACHE
+# ============================
+def brochure_key(course) -> str:
+    """Hash of everything the brochure depends on; also used as the ETag."""
+    instructor_ids = sorted(course.instructors.values_list("id", flat=True))
+    parts = [
+        course.id,
+        course.updated_at.isoformat() if course.updated_at else "",
+        get_curriculum(course).version,
+        ",".join(map(str, instructor_ids)),
+    ]
+    return hashlib.sha256(":".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def _path(key) -> Path:
+    return CACHE_DIR / f"{key}.pdf"
+
+
+def open_cached_brochure(key):
+    """
+    Open handle on the cached PDF for `key` (touched as most recently used),
+    or None on a miss.  Callers get a handle rather than a path because
+    another request's eviction may remove the file at any moment; an open
+    handle stays readable after that.
+    """
+    path = _path(key)
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass  # Evicted just now; the handle is still good
+    return handle
+
+
+def _evict(max_files=MAX_FILES) -> None:
+    files = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(".pdf"):
+            try:
+                files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    if len(files) <= max_files:
+        return
+    files.sort()
+    for _, path in files[:len(files) - max_files]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _store(key, pdf) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so concurrent readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp:
+        tmp.write(pdf)
+    os.replace(tmp_path, _path(key))
+
+    try:
+        _evict()
+    except OSError as exc:
+        logger.warning("Brochure cache eviction failed: %s", exc)
+
+
+def open_brochure(course, key=None):
+    """Open binary handle on the brochure for `course`, rendering it on a miss."""
+    key = key or brochure_key(course)
+    handle = open_cached_brochure(key)
+    if handle is not None:
+        return handle
+
+    pdf = render_course_brochure(course)
+    _store(key, pdf)
+    # Evicted again before we could open it: serve what we just rendered
+    return open_cached_brochure(key) or BytesIO(pdf)
@@ -0,0 +1,119 @@
+"""
+lms/utils/catalog.py
+Keyset (seek) pagination for the course catalog.
+
+The catalog is ordered newest first on (created_at, id).  Instead of
+OFFSET, each page carries an opaque cursor holding the (created_at, id) of
+its last card, and the next page starts strictly after it:
+
+    created_at < c  OR  (created_at = c AND id < i)
+
+which MySQL answers from the (is_active, created_at, id) index however deep
+the visitor scrolls.  Only the columns a course card shows are loaded,
+with the category joined and instructors prefetched in one extra query.
+"""
+
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.utils.dateparse import parse_datetime
+
+
+PAGE_SIZE = getattr(settings, "CATALOG_PAGE_SIZE", 12)
+MAX_PAGE_SIZE = 48
+
+CARD_FIELDS = (
+    "id", "slug", "title", "short_description", "thumbnail", "created_at",
+    "original_price", "discounted_price", "is_free",
+    "category__id", "category__name", "category__slug",
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(course) -> str:
+    raw = f"{course.created_at.isoformat()}|{course.pk}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises InvalidCursor if it was tampered with."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, pk = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def catalog_queryset(category_slug=None, skill=None):
+    """Active courses in catalog order, trimmed to what a card renders."""
+    from lms.models import Course, Instructor
+    from .skills import course_ids_teaching
+
+    courses = (
+        Course.objects.filter(is_active=True)
+        .select_related("category")
+        .only(*CARD_FIELDS)
+        .prefetch_related(Prefetch("instructors", queryset=Instructor.objects.only("id", "name")))
+        .order_by("-created_at", "-id")
+    )
+    if category_slug:
+        courses = courses.filter(category__slug=category_slug)
+    if skill:
+        courses = courses.filter(pk__in=course_ids_teaching(skill))
+    return courses
+
+
+def get_catalog_page(category_slug=None, cursor=None, page_size=PAGE_SIZE, skill=None):
+    """
+    One page of the catalog: (courses, next_cursor).  next_cursor is None on
+    the last page.  Raises InvalidCursor for a cursor we didn't issue.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    courses = catalog_queryset(category_slug, skill)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        courses = courses.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # One extra row tells us whether there is a next page without a COUNT
+    page = list(courses[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def _thumbnail_url(course) -> str:
+    if not course.thumbnail:
+        return ""
+    try:
+        return course.thumbnail.url or ""
+    except ValueError:
+        return ""
+
+
+def course_card(course) -> dict:
+    """JSON-safe card data for the infinite-scroll endpoint."""
+    from django.urls import reverse
+
+    category = course.category
+    return {
+        "id": course.id,
+        "slug": course.slug,
+        "title": course.title,
+        "short_description": course.short_description,
+        "thumbnail_url": _thumbnail_url(course),
+        "url": reverse("course_detail", args=[course.slug]),
+        "category": {"name": category.name, "slug": category.slug} if category else None,
+        "instructors": [instructor.name for instructor in course.instructors.all()],
+        "original_price": str(course.original_price),
+        "discounted_price": str(course.discounted_price) if course.discounted_price is not None else None,
+        "is_free": course.is_free,
+    }
@@ -0,0 +1,117 @@
+"""
+lms/utils/certificate_pdf.py
+Content-addressed cache of rendered certificate PDFs.
+
+A certificate's PDF only depends on the data printed on it and on the
+template, so the file is stored under a SHA-256 of exactly that.  The
+digest doubles as the HTTP ETag: download_certificate can answer
+If-None-Match with a 304 without touching storage, and WeasyPrint only
+runs the first time a given (data, template) pair is requested — or when
+`prerender_certificates` warms the cache ahead of time.
+
+The stored name is kept in Certificate.generated_image.
+"""
+
+import hashlib
+import json
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.template.loader import get_template, render_to_string
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_NAME = "lms/certificate_pdf.html"
+
+# 'local' keeps PDFs under MEDIA_ROOT/certificates; 'default' uses the
+# project's configured storage backend
+STORAGE = getattr(settings, "CERTIFICATE_PDF_STORAGE", "local")
+
+# Bump to force a re-render when something outside the template changes
+# (fonts, WeasyPrint upgrade).  Template edits are picked up automatically.
+TEMPLATE_VERSION = getattr(settings, "CERTIFICATE_TEMPLATE_VERSION", "1")
+
+
+@lru_cache(maxsize=1)
+def pdf_storage():
+    if STORAGE == "default":
+        return default_storage
+    return FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+
+
+@lru_cache(maxsize=1)
+def template_version() -> str:
+    """Configured version + hash of the template source."""
+    source = getattr(get_template(TEMPLATE_NAME).template, "source", "")
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+    return f"{TEMPLATE_VERSION}-{digest}"
+
+
+def certificate_digest(certificate) -> str:
+    """
+    SHA-256 of everything printed on the certificate plus the template
+    version.  `certificate.user` and `.course` should be select_related.
+    """
+    user = certificate.user
+    payload = {
+        "certificate_id": certificate.certificate_id,
+        "name": user.get_full_name() or user.email,
+        "course": certificate.course.title,
+        "issue_date": certificate.issue_date.date().isoformat() if certificate.issue_date else None,
+        "template": template_version(),
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def pdf_name(digest) -> str:
+    return f"certificates/{digest[:2]}/{digest}.pdf"
+
+
+def certificate_filename(certificate) -> str:
+    """Download name, e.g. Jane_Doe_Certificate.pdf"""
+    student_name = certificate.user.get_full_name() or certificate.user.username
+    safe_name = "".join(
+        c if c.isalnum() or c == "_" else "_"
+        for c in student_name.replace(" ", "_")
+    )
+    return f"{safe_name}_Certificate.pdf"
+
+
+def render_certificate_pdf(certificate, base_url=None) -> bytes:
+    from weasyprint import HTML
+
+    html_string = render_to_string(TEMPLATE_NAME, {"certificate": certificate})
+    return HTML(string=html_string, base_url=base_url).write_pdf()
+
+
+def ensure_certificate_pdf(certificate, base_url=None, force=False):
+    """
+    Return (stored name, digest, rendered) for `certificate`, rendering and
+    storing the PDF only if no file exists for its current digest.
+    """
+    from lms.models import Certificate
+
+    storage = pdf_storage()
+    digest = certificate_digest(certificate)
+    name = pdf_name(digest)
+
+    rendered = False
+    if force or not storage.exists(name):
+        pdf_bytes = render_certificate_pdf(certificate, base_url=base_url)
+        if storage.exists(name):
+            storage.delete(name)
+        name = storage.save(name, ContentFile(pdf_bytes))
+        rendered = True
+
+    if certificate.generated_image != name:
+        certificate.generated_image = name
+        Certificate.objects.filter(pk=certificate.pk).update(generated_image=name)
+    return name, digest, rendered
+
+
+def open_certificate_pdf(name):
+    return pdf_storage().open(name, "rb")
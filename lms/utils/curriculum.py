@@ -0,0 +1,275 @@
+"""
+lms/utils/curriculum.py
+Cached, versioned CurriculumDay -> Video tree for a course.
+
+The tree is built with two queries, stored in the Django cache under a
+per-course version token and shared by course_detail, video_player,
+my_courses and download_brochure.  Saving or deleting a Course,
+CurriculumDay or Video bumps the token (see lms/signals.py), so readers
+never see a stale curriculum and a warm cache costs zero queries.
+
+Each tree also carries a per-video ordinal index of (previous id, next id,
+position), so the player's prev / next links are a dict lookup.
+"""
+
+import uuid
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = getattr(settings, "CURRICULUM_CACHE_TIMEOUT", 60 * 60 * 24)
+# Part of the cache key: bump when the cached tree's shape changes
+TREE_FORMAT = 2
+
+
+def _version_key(course_id) -> str:
+    return f"lms:curriculum:version:{course_id}"
+
+
+def _tree_key(course_id, version) -> str:
+    return f"lms:curriculum:v{TREE_FORMAT}:{course_id}:{version}"
+
+
+def format_duration(duration) -> str:
+    """Human-readable H:MM:SS / M:SS / Ss — same output as Video.duration_display."""
+    if not duration:
+        return "0:00"
+    total_seconds = int(duration.total_seconds())
+    h, remainder = divmod(total_seconds, 3600)
+    m, s = divmod(remainder, 60)
+    if h > 0:
+        return f"{h}:{m:02d}:{s:02d}"
+    if m > 0:
+        return f"{m}:{s:02d}"
+    return f"{s}s"
+
+
+# ============================
+# TREE NODES
+# ============================
+Ordinal = namedtuple("Ordinal", ["previous_id", "next_id", "position"])
+
+@dataclass(frozen=True)
+class VideoNode:
+    id: int
+    title: str
+    description: str
+    duration: timedelta
+    order: int
+    is_free: bool
+    is_open: bool          # free video, free day or Day 1 — no purchase needed
+    day_id: int
+    course_id: int
+    video_url: str
+    position: int          # 0-based index in the flat course order
+
+    @property
+    def duration_display(self):
+        return format_duration(self.duration)
+
+
+@dataclass(frozen=True)
+class DayNode:
+    id: int
+    day_number: int
+    title: str
+    description: str
+    is_free: bool
+    videos: tuple = ()
+    total_duration: timedelta = timedelta(0)
+
+    @property
+    def video_count(self):
+        return len(self.videos)
+
+
+@dataclass(frozen=True)
+class CurriculumTree:
+    course_id: int
+    version: str
+    days: tuple = ()
+    videos: tuple = ()                                 # flat, in play order
+    total_duration: timedelta = timedelta(0)
+    ordinals: dict = field(default_factory=dict)       # video_id -> Ordinal (read-only)
+
+    @property
+    def video_count(self):
+        return len(self.videos)
+
+    @property
+    def first_video(self):
+        return self.videos[0] if self.videos else None
+
+    def get(self, video_id):
+        ordinal = self.ordinals.get(video_id)
+        return None if ordinal is None else self.videos[ordinal.position]
+
+    def neighbours(self, video_id):
+        """(previous, next) nodes around `video_id`; either may be None."""
+        ordinal = self.ordinals.get(video_id)
+        if ordinal is None:
+            return None, None
+        return self.get(ordinal.previous_id), self.get(ordinal.next_id)
+
+
+# ============================
+# BUILD / CACHE
+# ============================
+def _video_url(video) -> str:
+    if video.video_file:
+        try:
+            return video.video_file.url
+        except Exception:
+            return ""
+    return ""
+
+
+def build_curriculum(course_id, version="") -> CurriculumTree:
+    """Build the tree from the database (two queries)."""
+    from lms.models import CurriculumDay, Video
+
+    days = list(
+        CurriculumDay.objects.filter(course_id=course_id)
+        .only("id", "day_number", "title", "description", "is_free", "order")
+        .order_by("order", "day_number")
+    )
+    videos_by_day = {}
+    for video in (
+        Video.objects.filter(curriculum_day__course_id=course_id)
+        .only("id", "curriculum_day", "title", "description", "duration",
+              "order", "is_free", "video_file")
+        .order_by("order", "id")
+    ):
+        videos_by_day.setdefault(video.curriculum_day_id, []).append(video)
+
+    day_nodes = []
+    flat = []
+    for day in days:
+        day_open = day.is_free or day.day_number == 1
+        nodes = []
+        day_duration = timedelta(0)
+        for video in videos_by_day.get(day.id, ()):
+            duration = video.duration or timedelta(0)
+            day_duration += duration
+            node = VideoNode(
+                id=video.id,
+                title=video.title,
+                description=video.description,
+                duration=duration,
+                order=video.order or 0,
+                is_free=video.is_free,
+                is_open=bool(video.is_free or day_open),
+                day_id=day.id,
+                course_id=course_id,
+                video_url=_video_url(video),
+                position=len(flat),
+            )
+            nodes.append(node)
+            flat.append(node)
+        day_nodes.append(DayNode(
+            id=day.id,
+            day_number=day.day_number,
+            title=day.title,
+            description=day.description,
+            is_free=day.is_free,
+            videos=tuple(nodes),
+            total_duration=day_duration,
+        ))
+
+    return CurriculumTree(
+        course_id=course_id,
+        version=version,
+        days=tuple(day_nodes),
+        videos=tuple(flat),
+        total_duration=sum((d.total_duration for d in day_nodes), timedelta(0)),
+        ordinals={
+            node.id: Ordinal(
+                previous_id=flat[i - 1].id if i > 0 else None,
+                next_id=flat[i + 1].id if i + 1 < len(flat) else None,
+                position=i,
+            )
+            for i, node in enumerate(flat)
+        },
+    )
+
+
+def curriculum_version(course_id) -> str:
+    """Current version token for a course, created on first use."""
+    key = _version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_curriculum(course) -> CurriculumTree:
+    """Cached tree for a Course instance or id."""
+    course_id = getattr(course, "pk", course)
+    version = curriculum_version(course_id)
+    key = _tree_key(course_id, version)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_curriculum(course_id, version)
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
+
+
+def bump_curriculum_version(course_id) -> None:
+    """Invalidate every cached tree for the course by issuing a new token."""
+    if course_id is not None:
+        cache.set(_version_key(course_id), uuid.uuid4().hex, None)
+
+
+def first_video_ids(course_ids) -> dict:
+    """
+    {course_id: id of the course's first video} for many courses at once.
+
+    Cached trees answer for free; the rest come from one ROW_NUMBER() query
+    in the same play order as build_curriculum.  Courses without videos are
+    left out.
+    """
+    from django.db.models import F, Window
+    from django.db.models.functions import RowNumber
+    from lms.models import Video
+
+    course_ids = list(dict.fromkeys(course_ids))
+    versions = cache.get_many([_version_key(course_id) for course_id in course_ids])
+    tree_keys = {
+        _tree_key(course_id, versions[_version_key(course_id)]): course_id
+        for course_id in course_ids
+        if _version_key(course_id) in versions
+    }
+
+    cached = cache.get_many(list(tree_keys)) if tree_keys else {}
+    first = {
+        tree.course_id: tree.first_video.id
+        for tree in cached.values()
+        if tree.first_video
+    }
+    resolved = {tree_keys[key] for key in cached}
+    missing = [course_id for course_id in course_ids if course_id not in resolved]
+    if not missing:
+        return first
+
+    rows = (
+        Video.objects.filter(curriculum_day__course_id__in=missing)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F("curriculum_day__course_id"),
+            order_by=[
+                F("curriculum_day__order").asc(),
+                F("curriculum_day__day_number").asc(),
+                F("order").asc(),
+                F("id").asc(),
+            ],
+        ))
+        .filter(rank=1)
+        .values_list("curriculum_day__course_id", "id")
+    )
+    first.update(rows)
+    return first
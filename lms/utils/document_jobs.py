@@ -0,0 +1,229 @@
+"""
+lms/utils/document_jobs.py
+Database-backed queue for PDF rendering (certificates, invoices, brochures).
+
+With DOCUMENT_RENDER_MODE = 'queue' the download views call enqueue() and
+redirect to a status page instead of running WeasyPrint / ReportLab inside
+the web worker.  `manage.py run_document_worker` claims pending rows and
+renders them in a process pool.
+
+Identical requests share one job: while a job is pending or running its
+dedupe key is held in the unique `active_key` column, so a second enqueue
+of the same (kind, params) returns the job already in flight, and a
+finished job whose file is still stored is reused as-is.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .certificate_pdf import pdf_storage
+
+logger = logging.getLogger(__name__)
+
+RENDER_MODE = getattr(settings, "DOCUMENT_RENDER_MODE", "inline")
+MAX_ATTEMPTS = getattr(settings, "DOCUMENT_JOB_MAX_ATTEMPTS", 3)
+# Running jobs older than this are assumed lost with their worker
+STALE_AFTER = getattr(settings, "DOCUMENT_JOB_STALE_AFTER", 600)
+# How often a running worker sweeps for such jobs
+STALE_CHECK_INTERVAL = 60
+
+
+def is_queued() -> bool:
+    return RENDER_MODE == "queue"
+
+
+def job_key(kind, params) -> str:
+    encoded = json.dumps([kind, params], sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# ============================
+# PRODUCER SIDE (views)
+# ============================
+def enqueue(kind, params, user=None):
+    """
+    Return a DocumentJob for (kind, params): a finished one whose file is
+    still stored, the identical one in flight, or a new pending one.
+    """
+    from lms.models import DocumentJob
+
+    key = job_key(kind, params)
+    done = DocumentJob.objects.filter(dedupe_key=key, status="done").order_by("-finished_at").first()
+    if done and pdf_storage().exists(done.result_file):
+        return done
+
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                return DocumentJob.objects.create(
+                    kind=kind,
+                    params=params,
+                    dedupe_key=key,
+                    active_key=key,
+                    requested_by=user if getattr(user, "is_authenticated", False) else None,
+                )
+        except IntegrityError:
+            in_flight = DocumentJob.objects.filter(active_key=key).first()
+            if in_flight is not None:
+                return in_flight
+            # It finished between our INSERT and SELECT; try again
+    raise RuntimeError(f"Could not enqueue {kind} job")
+
+
+def can_view_job(job, user) -> bool:
+    """Public jobs (brochures) have no owner; the rest belong to one user."""
+    if job.requested_by_id is None:
+        return True
+    return getattr(user, "is_authenticated", False) and (
+        user.pk == job.requested_by_id or user.is_staff
+    )
+
+
+def open_job_result(job):
+    return pdf_storage().open(job.result_file, "rb")
+
+
+# ============================
+# CONSUMER SIDE (worker)
+# ============================
+def claim_jobs(limit) -> list:
+    """Atomically move up to `limit` pending jobs to running; returns their ids."""
+    from lms.models import DocumentJob
+
+    with transaction.atomic():
+        ids = list(
+            DocumentJob.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            DocumentJob.objects.filter(pk__in=ids).update(
+                status="running",
+                started_at=timezone.now(),
+                attempts=F("attempts") + 1,
+            )
+    return ids
+
+
+def _failure_fields(attempts, error) -> dict:
+    """Retry while attempts remain, then fail for good and free the dedupe key."""
+    if attempts < MAX_ATTEMPTS:
+        return {"status": "pending", "error": error}
+    return {"status": "failed", "error": error, "active_key": None, "finished_at": timezone.now()}
+
+
+def requeue_stale_jobs(exclude=()) -> int:
+    """
+    Jobs left 'running' longer than STALE_AFTER lost their worker: put them
+    back to pending, or fail them once MAX_ATTEMPTS is used up.  `exclude`
+    holds ids the calling worker is still rendering.
+    """
+    from lms.models import DocumentJob
+
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    stale = DocumentJob.objects.filter(status="running", started_at__lt=cutoff).exclude(pk__in=list(exclude))
+    error = "Worker lost while rendering"
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(**_failure_fields(MAX_ATTEMPTS, error))
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status="pending", error=error)
+    return requeued + failed
+
+
+def release_job(job_id, error) -> str:
+    """A job whose render process died: retry or fail it.  Returns the new status."""
+    from lms.models import DocumentJob
+
+    attempts = DocumentJob.objects.filter(pk=job_id, status="running").values_list("attempts", flat=True).first()
+    if attempts is None:
+        return ""
+    fields = _failure_fields(attempts, str(error))
+    DocumentJob.objects.filter(pk=job_id, status="running").update(**fields)
+    return fields["status"]
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer: spawned children need their own Django."""
+    import django
+
+    django.setup()
+
+
+def run_job(job_id) -> str:
+    """Render one claimed job; runs in a worker process.  Returns the new status."""
+    from lms.models import DocumentJob
+
+    close_old_connections()
+    job = DocumentJob.objects.get(pk=job_id)
+    renderer = RENDERERS.get(job.kind)
+    try:
+        if renderer is None:
+            raise ValueError(f"Unknown document kind '{job.kind}'")
+        result_file, filename = renderer(job.params)
+    except Exception as exc:
+        logger.error("Document job #%s (%s) failed: %s", job.pk, job.kind, exc, exc_info=True)
+        fields = _failure_fields(job.attempts, str(exc))
+    else:
+        fields = {"status": "done", "error": "", "active_key": None, "finished_at": timezone.now(),
+                  "result_file": result_file, "filename": filename}
+
+    DocumentJob.objects.filter(pk=job.pk).update(**fields)
+    close_old_connections()
+    return fields["status"]
+
+
+# ============================
+# RENDERERS
+# ============================
+def _store(folder, pdf_bytes) -> str:
+    """Content-addressed save: identical output is stored once."""
+    storage = pdf_storage()
+    name = f"documents/{folder}/{hashlib.sha256(pdf_bytes).hexdigest()}.pdf"
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(pdf_bytes))
+    return name
+
+
+def render_certificate_job(params):
+    from lms.models import Certificate
+    from .certificate_pdf import certificate_filename, ensure_certificate_pdf
+
+    certificate = Certificate.objects.select_related("user", "course").get(
+        certificate_id=params["certificate_id"]
+    )
+    name, _, _ = ensure_certificate_pdf(certificate)
+    return name, certificate_filename(certificate)
+
+
+def render_invoice_job(params):
+    from lms.models import Purchase
+    from .invoice_generator import generate_invoice_pdf, order_data_for_purchase
+
+    purchase = Purchase.objects.select_related("user", "course").get(pk=params["purchase_id"])
+    order_data = order_data_for_purchase(purchase, params.get("my_courses_url", ""))
+    return _store("invoices", generate_invoice_pdf(order_data)), f"Invoice_{purchase.id}.pdf"
+
+
+def render_brochure_job(params):
+    from lms.models import Course
+    from .brochure import open_brochure
+
+    course = Course.objects.get(pk=params["course_id"])
+    # Also warms the on-disk brochure cache that download_brochure reads
+    with open_brochure(course) as handle:
+        pdf_bytes = handle.read()
+    return _store("brochures", pdf_bytes), f"{course.slug}_brochure.pdf"
+
+
+RENDERERS = {
+    "certificate": render_certificate_job,
+    "invoice": render_invoice_job,
+    "brochure": render_brochure_job,
+}
@@ -8,6 +8,9 @@ from django.conf import settings
 from lms.utils.invoice_generator import generate_invoice_pdf
 
 import os, base64
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # ── HTML email template ───────────────────────────────────────────────────────
@@ -226,15 +229,16 @@ def send_purchase_confirmation_email(order_data: dict) -> None:
             file_type=FileType("application/pdf"),
             disposition=Disposition("attachment"),
         ))
-        try:
-            response = sendgrid.SendGridAPIClient(api_key=api_key).send(sg_mail)
-            print(f"Email sent via SendGrid! Status: {response.status_code}")
-        except Exception as e:
-            print(f"SendGrid failed: {e}")
+        # Let failures propagate: the outbox worker retries them with backoff
+        response = sendgrid.SendGridAPIClient(api_key=api_key).send(sg_mail)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+        logger.info("Invoice email #%s sent to %s via SendGrid (status %s)",
+                    order_data["order_id"], student_email, response.status_code)
     else:
         # LOCAL: Gmail SMTP
         msg = EmailMultiAlternatives(subject=subject, body=text_body, from_email=from_email, to=[student_email])
         msg.attach_alternative(html_body, "text/html")
         msg.attach(filename=f"Invoice_{order_data['order_id']}.pdf", content=pdf_bytes, mimetype="application/pdf")
         msg.send(fail_silently=False)
-        print("Email sent via Gmail SMTP!")
+        logger.info("Invoice email #%s sent to %s via SMTP", order_data["order_id"], student_email)
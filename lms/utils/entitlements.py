@@ -0,0 +1,144 @@
+"""
+lms/utils/entitlements.py
+Resolve which courses and videos a user may open, loading their purchases
+and enrollments once per request instead of once per video.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = getattr(settings, "ENTITLEMENT_CACHE_TIMEOUT", 300)
+_REQUEST_ATTR = "_lms_entitlements"
+
+
+def _cache_key(user_id) -> str:
+    return f"lms:entitlements:v2:{user_id}"
+
+
+def _pk(obj):
+    """Accept either a model instance or a raw primary key."""
+    return getattr(obj, "pk", obj)
+
+
+def is_free_video(video) -> bool:
+    """Free video, free day, or Day 1 — open to everyone, logged in or not."""
+    is_open = getattr(video, "is_open", None)
+    if is_open is not None:
+        # Curriculum tree node: flags are precomputed
+        return is_open
+    day = video.curriculum_day
+    return bool(video.is_free or day.is_free or day.day_number == 1)
+
+
+def _course_id_of(video):
+    course_id = getattr(video, "course_id", None)
+    if course_id is not None:
+        return course_id
+    return video.curriculum_day.course_id
+
+
+class Entitlements:
+    """
+    Snapshot of a user's purchases and enrollments.
+
+    Every check is a set lookup, so gating a 100-video curriculum costs
+    nothing beyond the two queries made when the snapshot is built (and none
+    at all on a warm cache).
+    """
+
+    def __init__(self, user_id=None, purchased=(), ordered=(), enrolled=()):
+        self.user_id = user_id
+        # Course ids with a completed Purchase
+        self.purchased = frozenset(purchased)
+        # Course ids with a Purchase in any state
+        self.ordered = frozenset(ordered) | self.purchased
+        # Course ids with a CourseEnrollment of any kind
+        self.enrolled = frozenset(enrolled)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def load(cls, user):
+        """Build a fresh snapshot straight from the database."""
+        from lms.models import Purchase, CourseEnrollment
+
+        purchased, ordered = set(), set()
+        for course_id, status in Purchase.objects.filter(user=user).values_list(
+            "course_id", "payment_status"
+        ):
+            ordered.add(course_id)
+            if status == "completed":
+                purchased.add(course_id)
+
+        enrolled = CourseEnrollment.objects.filter(user=user).values_list("course_id", flat=True)
+        return cls(user.pk, purchased, ordered, enrolled)
+
+    @classmethod
+    def for_user(cls, user):
+        """Cached snapshot for `user`; anonymous users get an empty one."""
+        if not getattr(user, "is_authenticated", False):
+            return cls()
+
+        key = _cache_key(user.pk)
+        cached = cache.get(key)
+        if cached is not None:
+            return cls(user.pk, *cached)
+
+        entitlements = cls.load(user)
+        entitlements._store()
+        return entitlements
+
+    def _store(self):
+        cache.set(_cache_key(self.user_id), (self.purchased, self.ordered, self.enrolled), CACHE_TIMEOUT)
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+    def has_purchased(self, course) -> bool:
+        """Completed Purchase exists for this course."""
+        return _pk(course) in self.purchased
+
+    def can_access_course(self, course) -> bool:
+        """Full (paid) access to every lesson: a completed purchase."""
+        return self.has_purchased(course)
+
+    def is_enrolled(self, course) -> bool:
+        """Any Purchase or CourseEnrollment row for the course (quiz access)."""
+        course_id = _pk(course)
+        return course_id in self.ordered or course_id in self.enrolled
+
+    def can_access_video(self, video) -> bool:
+        """
+        Same rules as Video.is_accessible_by().
+
+        Accepts a curriculum VideoNode, or a Video whose `curriculum_day` is
+        already loaded (select_related / prefetch).
+        """
+        if is_free_video(video):
+            return True
+        if self.user_id is None:
+            return False
+        return self.can_access_course(_course_id_of(video))
+
+
+def get_entitlements(request) -> Entitlements:
+    """Per-request entitlements, resolved at most once per request."""
+    entitlements = getattr(request, _REQUEST_ATTR, None)
+    if entitlements is None:
+        entitlements = Entitlements.for_user(request.user)
+        setattr(request, _REQUEST_ATTR, entitlements)
+    return entitlements
+
+
+def invalidate_entitlements(user_id) -> None:
+    """Drop the cached snapshot; called from Purchase / CourseEnrollment signals."""
+    cache.delete(_cache_key(user_id))
+
+
+def refresh_entitlements(user) -> Entitlements:
+    """Rebuild and re-cache the snapshot now (after a committed purchase)."""
+    entitlements = Entitlements.load(user)
+    entitlements._store()
+    return entitlements
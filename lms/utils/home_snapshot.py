@@ -0,0 +1,104 @@
+"""
+lms/utils/home_snapshot.py
+One cached snapshot of everything the home page renders.
+
+home() used to run ~10 queries per hit for CMS content that changes a few
+times a week.  The snapshot materializes it once — querysets evaluated to
+lists, FeatureSection items and course categories prefetched, Cloudinary
+URLs resolved into `*_url` attributes — and is served from the cache
+until a save / delete on one of HOME_MODELS (see lms/signals.py) drops it.
+The rebuild then happens once, after the writing transaction commits.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+CACHE_KEY = "lms:home:snapshot"
+CACHE_TIMEOUT = getattr(settings, "HOME_SNAPSHOT_CACHE_TIMEOUT", 60 * 60 * 24)
+COURSE_LIMIT = 16
+
+
+def _url(field) -> str:
+    """Resolved URL of a (Cloudinary) file field, or '' when empty."""
+    if not field:
+        return ""
+    try:
+        return field.url or ""
+    except ValueError:
+        return ""
+
+
+def _attach_url(obj, field_name):
+    if obj is not None:
+        setattr(obj, f"{field_name}_url", _url(getattr(obj, field_name)))
+    return obj
+
+
+def build_home_snapshot() -> dict:
+    """Template context for lms/home.html, fully evaluated."""
+    from django.db.models import Prefetch
+    from lms.models import (
+        HeroSection, FeatureSection, FeatureItem, HomeAboutSection, CourseCategory,
+        HomeBanner, Instructor, Testimonial, FAQ, Course,
+    )
+
+    hero = _attach_url(HeroSection.objects.filter(is_active=True).first(), "hero_image")
+    feature_section = (
+        FeatureSection.objects.filter(is_active=True)
+        .prefetch_related(Prefetch("items", queryset=FeatureItem.objects.order_by("id")))
+        .first()
+    )
+    about_section = _attach_url(HomeAboutSection.objects.filter(is_active=True).first(), "image")
+    banner = _attach_url(HomeBanner.objects.filter(is_active=True).first(), "image")
+
+    categories = list(CourseCategory.objects.filter(is_active=True).order_by("order"))
+    instructors = [_attach_url(i, "profile_image") for i in Instructor.objects.all()]
+    testimonials = [_attach_url(t, "profile_image") for t in Testimonial.objects.filter(is_active=True)]
+    faqs = list(FAQ.objects.filter(is_active=True))
+
+    # Featured first, topped up with the newest other active courses
+    active = Course.objects.filter(is_active=True).select_related("category")
+    courses = list(active.filter(is_featured=True).order_by("-created_at")[:COURSE_LIMIT])
+    if len(courses) < COURSE_LIMIT:
+        courses += list(
+            active.exclude(id__in=[c.id for c in courses])
+            .order_by("-created_at")[:COURSE_LIMIT - len(courses)]
+        )
+    for course in courses:
+        _attach_url(course, "thumbnail")
+
+    return {
+        "hero": hero,
+        "feature_section": feature_section,
+        "about_section": about_section,
+        "categories": categories,
+        "courses": courses,
+        "all_courses_count": Course.objects.filter(is_active=True).count(),
+        "banner": banner,
+        "instructors": instructors,
+        "testimonials": testimonials,
+        "faqs": faqs,
+    }
+
+
+def get_home_snapshot() -> dict:
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_home_snapshot()
+        cache.set(CACHE_KEY, snapshot, CACHE_TIMEOUT)
+    return snapshot
+
+
+def _rebuild_if_missing():
+    # Several saves in one transaction (admin inlines) schedule several
+    # callbacks; only the first one does any work
+    if cache.get(CACHE_KEY) is None:
+        cache.set(CACHE_KEY, build_home_snapshot(), CACHE_TIMEOUT)
+
+
+def invalidate_home_snapshot() -> None:
+    """Drop the snapshot now and rebuild it once the write has committed."""
+    cache.delete(CACHE_KEY)
+    transaction.on_commit(_rebuild_if_missing, robust=True)
@@ -254,4 +254,34 @@ def generate_invoice_pdf(order_data: dict) -> bytes:
     ))
 
     doc.build(story)
-    return buffer.getvalue()
\ No newline at end of file
+    return buffer.getvalue()
+
+def order_data_for_purchase(purchase, my_courses_url: str = "") -> dict:
+    """
+    The `order_data` dict for a Purchase (user and course loaded), as used by
+    generate_invoice_pdf() and the confirmation email.  Prices include 18% GST.
+    """
+    import datetime
+
+    student      = purchase.user
+    course_price = float(purchase.amount_paid)
+    tax_amount   = round(course_price * 18 / 118, 2)
+    base_price   = round(course_price - tax_amount, 2)
+
+    return {
+        "order_id":        purchase.id,
+        "order_date":      purchase.purchased_at.strftime("%d %b %Y"),
+        "payment_method":  purchase.transaction_id or "Razorpay",
+        "student_name":    purchase.full_name or student.get_full_name() or student.username,
+        "student_email":   purchase.email or student.email,
+        "course_title":    purchase.course.title,
+        "course_price":    course_price,
+        "is_discounted":   False,
+        "discount_amount": 0,
+        "base_price":      base_price,
+        "tax_amount":      tax_amount,
+        "total_amount":    course_price,
+        "platform_name":   "EduLearn LMS",
+        "my_courses_url":  my_courses_url,
+        "year":            datetime.date.today().year,
+    }
@@ -0,0 +1,145 @@
+"""
+lms/utils/outbox.py
+Transactional email outbox.
+
+Views never talk to SendGrid / SMTP.  They call queue_purchase_confirmation()
+inside the same transaction.atomic() block that completes the Purchase, so
+the email row commits (or rolls back) together with the purchase.
+`manage.py send_outbox_emails` claims due rows, sends them concurrently and
+reschedules failures with exponential backoff.
+
+The idempotency key is unique per purchase, so however many times a
+purchase is completed or the success page is reloaded, at most one
+confirmation is ever queued.
+"""
+
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 6)
+BACKOFF_BASE = getattr(settings, "EMAIL_OUTBOX_BACKOFF_BASE", 30)
+BACKOFF_MAX = getattr(settings, "EMAIL_OUTBOX_BACKOFF_MAX", 60 * 60)
+# A row stuck in 'sending' this long lost its worker
+STALE_AFTER = getattr(settings, "EMAIL_OUTBOX_STALE_AFTER", 15 * 60)
+# How often a running worker sweeps for such rows
+STALE_CHECK_INTERVAL = 60
+
+
+def purchase_key(purchase_id) -> str:
+    return f"purchase_confirmation:{purchase_id}"
+
+
+# ============================
+# PRODUCER SIDE (views)
+# ============================
+def queue_purchase_confirmation(purchase, my_courses_url=""):
+    """
+    Queue the confirmation + invoice email for a completed purchase (user
+    and course loaded).  Call inside the transaction that completes it.
+    Returns (outbox row, created).
+    """
+    from lms.models import EmailOutbox
+    from .invoice_generator import order_data_for_purchase
+
+    order_data = order_data_for_purchase(purchase, my_courses_url)
+    return EmailOutbox.objects.get_or_create(
+        idempotency_key=purchase_key(purchase.pk),
+        defaults={
+            "kind": "purchase_confirmation",
+            "purchase": purchase,
+            "recipient": order_data["student_email"],
+            "payload": order_data,
+        },
+    )
+
+
+# ============================
+# CONSUMER SIDE (worker)
+# ============================
+def backoff_delay(attempts) -> float:
+    """Exponential backoff with jitter: ~30s, 60s, 2m, 4m ... capped."""
+    delay = min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_due(limit) -> list:
+    """Move up to `limit` due pending rows to 'sending'; returns their ids."""
+    from lms.models import EmailOutbox
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            EmailOutbox.objects.filter(pk__in=ids).update(
+                status="sending", claimed_at=now, attempts=F("attempts") + 1
+            )
+    return ids
+
+
+def requeue_stale() -> int:
+    from lms.models import EmailOutbox
+
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    return EmailOutbox.objects.filter(status="sending", claimed_at__lt=cutoff).update(status="pending")
+
+
+def _send_purchase_confirmation(message):
+    from .email_utils import send_purchase_confirmation_email
+
+    send_purchase_confirmation_email(message.payload)
+
+
+SENDERS = {
+    "purchase_confirmation": _send_purchase_confirmation,
+}
+
+
+def deliver(message_id) -> str:
+    """
+    Send one claimed row; runs in a worker thread.  Returns the new status.
+
+    Only a row this worker moved to 'sending' is sent, and it is marked
+    'sent' straight after, so a purchase's email goes out once unless the
+    worker dies between the two (at-least-once, never duplicated by retries
+    of a row already marked sent).
+    """
+    from lms.models import EmailOutbox
+
+    close_old_connections()
+    try:
+        message = EmailOutbox.objects.get(pk=message_id, status="sending")
+    except EmailOutbox.DoesNotExist:
+        return "skipped"
+
+    try:
+        SENDERS[message.kind](message)
+    except Exception as exc:
+        logger.warning("Outbox email #%s failed (attempt %s): %s", message.pk, message.attempts, exc)
+        if message.attempts >= MAX_ATTEMPTS:
+            fields = {"status": "failed", "last_error": str(exc)}
+        else:
+            fields = {
+                "status": "pending",
+                "last_error": str(exc),
+                "next_attempt_at": timezone.now() + timedelta(seconds=backoff_delay(message.attempts)),
+            }
+    else:
+        fields = {"status": "sent", "sent_at": timezone.now(), "last_error": ""}
+        logger.info("Outbox email #%s (%s) sent to %s", message.pk, message.kind, message.recipient)
+
+    EmailOutbox.objects.filter(pk=message.pk, status="sending").update(**fields)
+    close_old_connections()
+    return fields["status"]
@@ -0,0 +1,150 @@
+"""
+lms/utils/page_cache.py
+Full-page HTML cache for logged-out visitors, with tag purging and
+stale-while-revalidate.
+
+Only GET/HEAD requests without a session cookie are cached — those can't
+be authenticated and can't carry flash messages, so every such visitor
+sees the same page.  The cache key is host + path + the query params the
+view declares (UTM / ad-click params don't fragment the cache).
+
+Each entry records the version of every tag it was rendered under
+("course:<slug>", "category:<slug>", ...).  purge_page_tags() bumps a tag's
+version (see lms/signals.py), which turns matching entries stale without
+touching any other page.  A stale entry is still served to everyone except
+the one request that wins the revalidation lock and re-renders it, so a
+traffic spike never piles up on gunicorn behind a purge or an expiry.
+
+CSRF tokens are punched out of the stored HTML and filled in per request.
+That makes every response unique to its visitor (and get_token() sets the
+CSRF cookie), so responses are only ever marked `private`: the browser may
+reuse them, a CDN or proxy must not.
+"""
+
+import hashlib
+import re
+import time
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+
+ENABLED = getattr(settings, "PAGE_CACHE_ENABLED", True)
+FRESH_FOR = getattr(settings, "PAGE_CACHE_TIMEOUT", 300)
+STALE_FOR = getattr(settings, "PAGE_CACHE_STALE_TIMEOUT", 60 * 60)
+LOCK_TIMEOUT = 30
+
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_PLACEHOLDER = b"__lms_page_cache_csrf__"
+
+
+def _page_key(request, params) -> str:
+    query = urlencode(sorted((p, request.GET[p]) for p in params if p in request.GET))
+    raw = f"{request.get_host()}{request.path}?{query}"
+    return f"lms:page:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _tag_key(tag) -> str:
+    return f"lms:page:tag:{tag}"
+
+
+def tag_versions(tags) -> dict:
+    """{tag: current version}, creating a version for tags never seen before."""
+    keys = {tag: _tag_key(tag) for tag in tags}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for tag, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+def purge_page_tags(*tags) -> None:
+    """Mark every cached page carrying one of `tags` as stale."""
+    tags = [tag for tag in tags if tag]
+    if tags:
+        cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def is_cacheable_request(request) -> bool:
+    return (
+        ENABLED
+        and request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def _is_cacheable_response(response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and response.get("Content-Type", "").startswith("text/html")
+    )
+
+
+def _respond(request, entry, state):
+    content = entry["content"]
+    if _CSRF_PLACEHOLDER in content:
+        content = content.replace(_CSRF_PLACEHOLDER, get_token(request).encode("ascii"))
+    response = HttpResponse(content, status=entry["status"], content_type=entry["content_type"])
+    response["X-Page-Cache"] = state
+    response["Cache-Control"] = f"private, max-age={FRESH_FOR}, stale-while-revalidate={STALE_FOR}"
+    return response
+
+
+def anonymous_page_cache(tags=(), params=()):
+    """
+    Cache a view's HTML for logged-out visitors.
+
+    `tags` is a list, or a callable taking the view's (request, *args,
+    **kwargs) and returning one; `params` lists the query parameters that
+    change the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            page_tags = tags(request, *args, **kwargs) if callable(tags) else tags
+            key = _page_key(request, params)
+            lock_key = f"{key}:lock"
+
+            entry = cache.get(key)
+            locked = False
+            if entry is not None:
+                if time.time() < entry["fresh_until"] and entry["tags"] == tag_versions(page_tags):
+                    return _respond(request, entry, "HIT")
+                locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+                if not locked:
+                    # Someone else is re-rendering it
+                    return _respond(request, entry, "STALE")
+
+            # Read versions before rendering so a purge mid-render wins
+            versions = tag_versions(page_tags)
+            try:
+                response = view(request, *args, **kwargs)
+                if _is_cacheable_response(response):
+                    cache.set(key, {
+                        "content": _CSRF_INPUT.sub(rb"\g<1>" + _CSRF_PLACEHOLDER + rb"\g<2>", response.content),
+                        "status": response.status_code,
+                        "content_type": response["Content-Type"],
+                        "tags": versions,
+                        "fresh_until": time.time() + FRESH_FOR,
+                    }, FRESH_FOR + STALE_FOR)
+                response["X-Page-Cache"] = "MISS"
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapped
+    return decorator
@@ -0,0 +1,391 @@
+"""
+lms/utils/payment_gateway.py
+Payment-gateway adapter: Razorpay behind timeouts, retries and a circuit
+breaker, plus an in-process fake for tests and benchmarks.
+
+RazorpayGateway talks to the Orders API over pooled keep-alive HTTP
+clients — one httpx.Client per process for sync callers, one AsyncClient
+per event loop for async views (under ASGI that is the server's loop).
+Every call has a connect / read timeout.  Failures that can't have created
+anything (connection refused, connect timeout, 429 / 502 / 503 / 504) are
+retried a bounded number of times with jittered backoff; a read timeout on
+a POST is not, since Razorpay may already have created the order.
+
+After PAYMENT_GATEWAY_BREAKER_THRESHOLD consecutive failures the breaker
+opens and calls fail fast with GatewayUnavailable for
+PAYMENT_GATEWAY_BREAKER_COOLDOWN seconds, then one trial call decides
+whether it closes again.  So a slow Razorpay costs a worker a few seconds
+at most instead of hanging it.
+
+Each gateway keeps per-process latency / error metrics (`metrics.snapshot()`,
+served to staff at /api/payments/gateway/).  PAYMENT_GATEWAY = "fake"
+swaps in FakeGateway, which never leaves the process.
+"""
+
+import abc
+import asyncio
+import hashlib
+import hmac
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, deque
+
+import httpx
+from django.conf import settings
+
+
+API_BASE = getattr(settings, "RAZORPAY_API_BASE", "https://api.razorpay.com/v1")
+BACKEND = getattr(settings, "PAYMENT_GATEWAY", "razorpay")
+CONNECT_TIMEOUT = getattr(settings, "PAYMENT_GATEWAY_CONNECT_TIMEOUT", 3.0)
+READ_TIMEOUT = getattr(settings, "PAYMENT_GATEWAY_READ_TIMEOUT", 10.0)
+MAX_RETRIES = getattr(settings, "PAYMENT_GATEWAY_MAX_RETRIES", 2)
+BREAKER_THRESHOLD = getattr(settings, "PAYMENT_GATEWAY_BREAKER_THRESHOLD", 5)
+BREAKER_COOLDOWN = getattr(settings, "PAYMENT_GATEWAY_BREAKER_COOLDOWN", 30)
+POOL_SIZE = getattr(settings, "PAYMENT_GATEWAY_POOL_SIZE", 20)
+
+BACKOFF_BASE = 0.2
+RETRY_STATUSES = {429, 502, 503, 504}
+LATENCY_SAMPLES = 1000
+
+
+class GatewayError(Exception):
+    """The gateway refused the call."""
+
+
+class GatewayUnavailable(GatewayError):
+    """The gateway couldn't be reached in time, or the breaker is open."""
+
+
+class _Retryable(GatewayUnavailable):
+    """A failure that can't have created anything, so is safe to repeat."""
+
+
+# ============================
+# CIRCUIT BREAKER / METRICS
+# ============================
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        """
+        None while open (fail fast); otherwise whether this call is the single
+        half-open trial, which the caller must hand back with end_trial().
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return None
+
+    def end_trial(self):
+        """Release the trial slot even if the call never reported (e.g. cancelled)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class GatewayMetrics:
+    """Per-process call counters and a window of recent latencies."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, outcome, seconds=None):
+        with self._lock:
+            self.counts[outcome] += 1
+            if seconds is not None:
+                self.latencies.append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            counts = dict(self.counts)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 1)
+
+        calls = counts.get("success", 0) + counts.get("error", 0)
+        return {
+            "counts": counts,
+            "error_rate": round(counts.get("error", 0) / calls, 4) if calls else 0.0,
+            "latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+        }
+
+
+# ============================
+# GATEWAYS
+# ============================
+def _order_payload(amount, currency, receipt, notes):
+    return {"amount": amount, "currency": currency, "receipt": receipt, "notes": notes or {}}
+
+
+def _backoff(attempt) -> float:
+    return BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class PaymentGateway(abc.ABC):
+    """Retry / breaker / metrics shell; subclasses implement _send and _asend."""
+
+    name = "base"
+
+    def __init__(self, max_retries=MAX_RETRIES, breaker=None):
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = GatewayMetrics()
+
+    def create_order(self, amount, currency, receipt, notes=None) -> dict:
+        """Create an order; `amount` is in the smallest unit (paise)."""
+        payload = _order_payload(amount, currency, receipt, notes)
+        for attempt in range(self.max_retries + 1):
+            trial = self._check_breaker()
+            started = time.perf_counter()
+            try:
+                result = self._send("POST", "/orders", payload)
+            except Exception as e:
+                if not self._failed(e, attempt, started):
+                    raise
+            else:
+                self._succeeded(started)
+                return result
+            finally:
+                # CancelledError / KeyboardInterrupt skip both paths above
+                if trial:
+                    self.breaker.end_trial()
+            time.sleep(_backoff(attempt))
+
+    async def acreate_order(self, amount, currency, receipt, notes=None) -> dict:
+        """Async create_order: waiting on the gateway doesn't hold a worker."""
+        payload = _order_payload(amount, currency, receipt, notes)
+        for attempt in range(self.max_retries + 1):
+            trial = self._check_breaker()
+            started = time.perf_counter()
+            try:
+                result = await self._asend("POST", "/orders", payload)
+            except Exception as e:
+                if not self._failed(e, attempt, started):
+                    raise
+            else:
+                self._succeeded(started)
+                return result
+            finally:
+                # CancelledError / KeyboardInterrupt skip both paths above
+                if trial:
+                    self.breaker.end_trial()
+            await asyncio.sleep(_backoff(attempt))
+
+    def health(self) -> dict:
+        return {"gateway": self.name, "breaker": self.breaker.state, **self.metrics.snapshot()}
+
+    # ------------------------------------------------------------------
+    # Bookkeeping shared by the sync and async paths
+    # ------------------------------------------------------------------
+    def _check_breaker(self) -> bool:
+        """True if this call is the breaker's half-open trial."""
+        trial = self.breaker.allow()
+        if trial is None:
+            self.metrics.record("short_circuited")
+            raise GatewayUnavailable(f"{self.name} circuit open, failing fast")
+        return trial
+
+    def _succeeded(self, started):
+        self.metrics.record("success", time.perf_counter() - started)
+        self.breaker.record_success()
+
+    def _failed(self, error, attempt, started) -> bool:
+        """Record a failed attempt; True if it should be retried."""
+        self.metrics.record("error", time.perf_counter() - started)
+        if isinstance(error, GatewayError) and not isinstance(error, GatewayUnavailable):
+            # Refused (4xx): the gateway itself answered, so it is healthy
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if isinstance(error, _Retryable) and attempt < self.max_retries:
+            self.metrics.record("retry")
+            return True
+        return False
+
+    @abc.abstractmethod
+    def _send(self, method, path, payload) -> dict:
+        """One blocking request; raise _Retryable / GatewayUnavailable / GatewayError."""
+
+    @abc.abstractmethod
+    async def _asend(self, method, path, payload) -> dict:
+        """One request on the running event loop; same errors as _send."""
+
+
+class RazorpayGateway(PaymentGateway):
+    name = "razorpay"
+
+    def __init__(self, key_id=None, key_secret=None, **kwargs):
+        super().__init__(**kwargs)
+        self.auth = (key_id or settings.RAZORPAY_KEY_ID or "", key_secret or settings.RAZORPAY_KEY_SECRET or "")
+        self.timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+        self.limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()   # event loop -> AsyncClient
+        self._lock = threading.Lock()
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=API_BASE, auth=self.auth, timeout=self.timeout, limits=self.limits,
+                )
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                base_url=API_BASE, auth=self.auth, timeout=self.timeout, limits=self.limits,
+            )
+        return client
+
+    def _send(self, method, path, payload) -> dict:
+        try:
+            response = self._sync_client().request(method, path, json=payload)
+        except httpx.HTTPError as e:
+            raise self._transport_error(e) from e
+        return self._result(response)
+
+    async def _asend(self, method, path, payload) -> dict:
+        try:
+            response = await self._async_client().request(method, path, json=payload)
+        except httpx.HTTPError as e:
+            raise self._transport_error(e) from e
+        return self._result(response)
+
+    def _transport_error(self, error):
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return _Retryable(f"Razorpay unreachable: {error!r}")
+        return GatewayUnavailable(f"Razorpay did not answer: {error!r}")
+
+    def _result(self, response) -> dict:
+        if response.status_code in RETRY_STATUSES:
+            raise _Retryable(f"Razorpay returned HTTP {response.status_code}")
+        if response.status_code >= 500:
+            raise GatewayUnavailable(f"Razorpay returned HTTP {response.status_code}")
+        if response.is_error:
+            try:
+                error = response.json().get("error") or {}
+            except ValueError:
+                error = {}
+            raise GatewayError(error.get("description") or f"Razorpay returned HTTP {response.status_code}")
+        return response.json()
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-process stand-in for Razorpay.  Orders live in memory; `latency`
+    (seconds) and `failure_rate` simulate a slow or flaky gateway, and
+    sign_payment() produces what checkout.js would post to verify_payment.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, failure_rate=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.orders = {}
+
+    def _order(self, payload) -> dict:
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise _Retryable("fake gateway failure")
+        order = {
+            "id": f"order_fake{uuid.uuid4().hex[:14]}",
+            "entity": "order",
+            "amount": payload["amount"],
+            "amount_paid": 0,
+            "currency": payload["currency"],
+            "receipt": payload["receipt"],
+            "notes": payload["notes"],
+            "status": "created",
+            "created_at": int(time.time()),
+        }
+        self.orders[order["id"]] = order
+        return order
+
+    def _send(self, method, path, payload) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._order(payload)
+
+    async def _asend(self, method, path, payload) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._order(payload)
+
+    def sign_payment(self, order_id):
+        """(payment_id, signature) for order_id, signed like Razorpay checkout does."""
+        payment_id = f"pay_fake{uuid.uuid4().hex[:14]}"
+        signature = hmac.new(
+            (settings.RAZORPAY_KEY_SECRET or "").encode(),
+            f"{order_id}|{payment_id}".encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return payment_id, signature
+
+
+# ============================
+# PROCESS-WIDE GATEWAY
+# ============================
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> PaymentGateway:
+    """The process's gateway (PAYMENT_GATEWAY picks razorpay or fake)."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = FakeGateway() if BACKEND == "fake" else RazorpayGateway()
+    return _gateway
+
+
+def set_gateway(gateway) -> PaymentGateway:
+    """Swap the process gateway (tests, benchmarks); returns the previous one."""
+    global _gateway
+    with _gateway_lock:
+        previous, _gateway = _gateway, gateway
+    return previous
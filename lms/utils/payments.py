@@ -0,0 +1,153 @@
+"""
+lms/utils/payments.py
+Idempotent finalization of a Razorpay payment.
+
+verify_payment may be called several times for one order: checkout retries,
+double clicks, Razorpay's client retrying.  finalize_payment() does the
+whole write path in one transaction that holds select_for_update on the
+Payment row found by razorpay_order_id:
+
+    Payment marked paid -> Purchase -> paid CourseEnrollment -> email queued
+
+Concurrent calls for the same order therefore run one after another, and
+only the first writes anything.  The outcome is cached per order once it
+commits, so a repeated call is answered without taking the row lock.  The
+user's entitlements snapshot is rebuilt in the same on-commit step, so the
+next page already shows the course as owned.
+"""
+
+import hashlib
+import hmac
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = getattr(settings, "PAYMENT_RESULT_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+class PaymentError(Exception):
+    pass
+
+
+class InvalidSignature(PaymentError):
+    pass
+
+
+class UnknownOrder(PaymentError):
+    pass
+
+
+@dataclass(frozen=True)
+class PaymentResult:
+    order_id: str
+    purchase_id: int
+    course_id: int
+    created: bool    # False when an earlier call had already finalized the order
+
+
+def _cache_key(order_id) -> str:
+    return f"lms:payment:finalized:{order_id}"
+
+
+def signature_is_valid(order_id, payment_id, signature) -> bool:
+    """Razorpay checkout signature: HMAC-SHA256 of "order_id|payment_id"."""
+    expected = hmac.new(
+        settings.RAZORPAY_KEY_SECRET.encode(),
+        f"{order_id}|{payment_id}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+def finalize_payment(user, order_id, payment_id, signature, my_courses_url="") -> PaymentResult:
+    """
+    Record a successful checkout for `user`; safe to call any number of
+    times.  Raises InvalidSignature for a forged callback and UnknownOrder
+    when the order isn't one of the user's payments.
+    """
+    from lms.models import CourseEnrollment, Payment, Purchase
+    from .outbox import queue_purchase_confirmation
+
+    if not (order_id and payment_id and signature_is_valid(order_id, payment_id, signature)):
+        raise InvalidSignature(order_id)
+
+    cached = cache.get(_cache_key(order_id))
+    if cached is not None and cached[0] == user.pk:
+        _, purchase_id, course_id = cached
+        return PaymentResult(order_id, purchase_id, course_id, created=False)
+
+    with transaction.atomic():
+        payment = (
+            Payment.objects.select_for_update()
+            .filter(razorpay_order_id=order_id, user=user)
+            .first()
+        )
+        if payment is None:
+            raise UnknownOrder(order_id)
+
+        purchase = None
+        if payment.status == "success":
+            # Finalized by an earlier call that got the lock first
+            purchase = (
+                Purchase.objects.filter(user=user, course_id=payment.course_id, payment_status="completed")
+                .only("id")
+                .first()
+            )
+            if payment.razorpay_payment_id != payment_id:
+                logger.warning(
+                    "Order %s already paid by %s, also got payment %s",
+                    order_id, payment.razorpay_payment_id, payment_id,
+                )
+
+        created = purchase is None
+        if created:
+            now = timezone.now()
+            payment.razorpay_payment_id = payment_id
+            payment.razorpay_signature = signature
+            payment.status = "success"
+            payment.payment_date = now
+            payment.save(update_fields=[
+                "razorpay_payment_id", "razorpay_signature", "status", "payment_date", "updated_at",
+            ])
+
+            purchase, _ = Purchase.objects.update_or_create(
+                user=user,
+                course_id=payment.course_id,
+                defaults={
+                    "amount_paid": payment.amount,
+                    "payment_status": "completed",
+                    "transaction_id": payment_id,
+                    "full_name": user.get_full_name() or user.username,
+                    "email": user.email,
+                    "purchased_at": now,
+                },
+            )
+            CourseEnrollment.objects.get_or_create(
+                user=user,
+                course_id=payment.course_id,
+                defaults={
+                    "enrollment_type": "paid",
+                    "is_paid": True,
+                    "transaction_id": payment_id,
+                },
+            )
+            purchase.user = user
+            purchase.course = payment.course
+            queue_purchase_confirmation(purchase, my_courses_url)
+
+        result = PaymentResult(order_id, purchase.pk, payment.course_id, created)
+        transaction.on_commit(lambda: _remember(user, result))
+    return result
+
+
+def _remember(user, result):
+    from .entitlements import refresh_entitlements
+
+    cache.set(_cache_key(result.order_id), (user.pk, result.purchase_id, result.course_id), CACHE_TIMEOUT)
+    refresh_entitlements(user)
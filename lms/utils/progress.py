@@ -0,0 +1,145 @@
+"""
+lms/utils/progress.py
+Per-user, per-course video progress map — one query instead of one
+UserVideoProgress lookup per video — plus maintenance helpers for the
+denormalized CourseProgress counters.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Short on purpose: the write endpoints invalidate explicitly, the TTL only
+# bounds staleness for writes that bypass them (admin, shell).  0 disables.
+CACHE_TIMEOUT = getattr(settings, "PROGRESS_CACHE_TIMEOUT", 30)
+
+VideoProgress = namedtuple(
+    "VideoProgress", ["is_completed", "watched_percentage", "watched_duration"]
+)
+NO_PROGRESS = VideoProgress(False, 0, 0)
+
+
+def _cache_key(user_id, course_id) -> str:
+    return f"lms:progress:{user_id}:{course_id}"
+
+
+def load_progress_map(user_id, course_id) -> dict:
+    """{video_id: VideoProgress} for every row the user has in the course."""
+    from lms.models import UserVideoProgress
+
+    rows = UserVideoProgress.objects.filter(
+        user_id=user_id,
+        video__curriculum_day__course_id=course_id,
+    ).values_list("video_id", "is_completed", "watched_percentage", "watched_duration")
+
+    return {video_id: VideoProgress(*values) for video_id, *values in rows}
+
+
+def get_progress_map(user, course) -> dict:
+    """
+    Progress rows for `user` in `course`, keyed by video id.
+
+    Missing videos have no progress yet — use `.get(video_id, NO_PROGRESS)`.
+    Anonymous users always get an empty map.  Heartbeats still waiting in
+    the progress buffer are merged in, but never cached.
+    """
+    from .progress_buffer import pending_progress
+
+    if not getattr(user, "is_authenticated", False):
+        return {}
+
+    course_id = getattr(course, "pk", course)
+    if not CACHE_TIMEOUT:
+        progress_map = load_progress_map(user.pk, course_id)
+    else:
+        key = _cache_key(user.pk, course_id)
+        progress_map = cache.get(key)
+        if progress_map is None:
+            progress_map = load_progress_map(user.pk, course_id)
+            cache.set(key, progress_map, CACHE_TIMEOUT)
+
+    pending = pending_progress(user.pk, course_id)
+    if pending:
+        progress_map = dict(progress_map)
+        for video_id, fields in pending.items():
+            progress_map[video_id] = progress_map.get(video_id, NO_PROGRESS)._replace(**fields)
+    return progress_map
+
+
+def invalidate_progress(user_id, course_id) -> None:
+    """Called by the progress write endpoints after every write."""
+    from .achievements import invalidate_achievements
+
+    cache.delete(_cache_key(user_id, course_id))
+    invalidate_achievements(user_id)
+
+
+# ============================
+# COURSEPROGRESS COUNTERS
+# ============================
+def refresh_course_totals(course_id) -> None:
+    """
+    Re-seed total_count (and the derived percentage) on every CourseProgress
+    of a course after a video is added or removed.  One COUNT + one UPDATE.
+    """
+    from django.db.models import DecimalField, ExpressionWrapper, F, Value
+    from django.db.models.functions import Least
+    from lms.models import CourseProgress, Video
+
+    if course_id is None:
+        return
+    total = Video.objects.filter(curriculum_day__course_id=course_id).count()
+    progresses = CourseProgress.objects.filter(course_id=course_id)
+    if not total:
+        progresses.update(total_count=0, progress_percentage=0)
+        return
+    progresses.update(
+        total_count=total,
+        progress_percentage=ExpressionWrapper(
+            Least(F("completed_count"), Value(total)) * Value(100.0) / Value(total),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        ),
+    )
+
+
+def rebuild_progress_counters(queryset=None, dry_run=False, batch_size=500) -> int:
+    """
+    Recount completed_count / total_count for `queryset` (default: all rows)
+    and fix the ones that drifted.  Returns the number of rows that were off.
+    """
+    from django.db.models import Count
+    from lms.models import CourseProgress, Video
+
+    if queryset is None:
+        queryset = CourseProgress.objects.all()
+
+    totals = dict(
+        Video.objects.order_by()
+        .values_list("curriculum_day__course_id")
+        .annotate(n=Count("id"))
+    )
+
+    drifted = []
+    rows = (
+        queryset.order_by()
+        .annotate(actual_completed=Count("completed_videos"))
+        .only("id", "course", "completed_count", "total_count", "progress_percentage")
+    )
+    for progress in rows.iterator(chunk_size=2000):
+        total = totals.get(progress.course_id, 0)
+        if (progress.completed_count, progress.total_count) == (progress.actual_completed, total):
+            continue
+        progress.completed_count = progress.actual_completed
+        progress.total_count = total
+        progress.progress_percentage = progress._percentage()
+        drifted.append(progress)
+
+    if drifted and not dry_run:
+        CourseProgress.objects.bulk_update(
+            drifted,
+            ["completed_count", "total_count", "progress_percentage"],
+            batch_size=batch_size,
+        )
+    return len(drifted)
@@ -0,0 +1,222 @@
+"""
+lms/utils/progress_buffer.py
+Write-coalescing ingestion for video progress heartbeats.
+
+The player posts progress every few seconds.  In "sync" mode (default)
+every heartbeat is an UPDATE of its (user, video) row, exactly as before.
+In "buffered" mode heartbeats are kept in a per-process buffer, collapsed
+to the latest value per (user, video), and written in batches with a single
+INSERT ... ON DUPLICATE KEY UPDATE — so row locks are held once per batch
+instead of once per heartbeat.  A batch is flushed when it fills up, when
+its oldest heartbeat is PROGRESS_BUFFER_MAX_AGE seconds old (a timer thread
+armed by the first heartbeat), and at process exit.  Reads merge the
+still-pending values in, so the player never resumes from a stale position.
+
+Completion is never buffered: record_completion() writes immediately and
+drops any pending heartbeat for that video.  Heartbeats never touch
+`is_completed`, so a late flush can't un-complete a video.  A crash loses
+at most PROGRESS_BUFFER_MAX_AGE seconds of watch position, never a
+completion.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, router
+
+from .progress import invalidate_progress
+
+logger = logging.getLogger(__name__)
+
+INGEST_MODE = getattr(settings, "PROGRESS_INGEST_MODE", "sync")
+MAX_ITEMS = getattr(settings, "PROGRESS_BUFFER_MAX_ITEMS", 500)
+MAX_AGE = getattr(settings, "PROGRESS_BUFFER_MAX_AGE", 10)
+BATCH_SIZE = 500
+
+
+def _clamp_percentage(value) -> int:
+    return max(0, min(int(value), 100))
+
+
+def _clean_fields(watched_percentage=None, watched_duration=None) -> dict:
+    """Only the fields the client actually sent."""
+    fields = {}
+    if watched_percentage is not None:
+        fields["watched_percentage"] = _clamp_percentage(watched_percentage)
+    if watched_duration is not None:
+        fields["watched_duration"] = max(0, int(watched_duration))
+    return fields
+
+
+def write_progress_batch(batch: dict) -> None:
+    """
+    Upsert {(user_id, video_id): (course_id, fields)} in as few statements
+    as possible — one bulk_create per distinct set of updated columns.
+    """
+    from lms.models import UserVideoProgress
+
+    connection = connections[router.db_for_write(UserVideoProgress)]
+    groups = {}
+    for (user_id, video_id), (course_id, fields) in batch.items():
+        groups.setdefault(tuple(sorted(fields)), []).append(
+            UserVideoProgress(user_id=user_id, video_id=video_id, **fields)
+        )
+
+    for field_names, rows in groups.items():
+        options = {
+            "update_conflicts": True,
+            "update_fields": list(field_names) + ["last_watched"],
+        }
+        # MySQL upserts on any unique key and rejects an explicit target
+        if connection.features.supports_update_conflicts_with_target:
+            options["unique_fields"] = ["user", "video"]
+        UserVideoProgress.objects.bulk_create(rows, batch_size=BATCH_SIZE, **options)
+
+    for user_id, course_id in {(key[0], value[0]) for key, value in batch.items()}:
+        invalidate_progress(user_id, course_id)
+
+
+class ProgressBuffer:
+    """Thread-safe, per-process buffer of the latest heartbeat per (user, video)."""
+
+    def __init__(self, max_items=MAX_ITEMS, max_age=MAX_AGE):
+        self.max_items = max_items
+        self.max_age = max_age
+        self._pending = {}
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, user_id, video_id, course_id, fields) -> None:
+        with self._lock:
+            key = (user_id, video_id)
+            previous = self._pending.get(key)
+            merged = {**previous[1], **fields} if previous else dict(fields)
+            self._pending[key] = (course_id, merged)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._arm_timer()
+            due = (
+                len(self._pending) >= self.max_items
+                or time.monotonic() - self._oldest >= self.max_age
+            )
+        if due:
+            self.flush()
+
+    def discard(self, user_id, video_id) -> None:
+        with self._lock:
+            self._pending.pop((user_id, video_id), None)
+
+    def pending(self, user_id, course_id) -> dict:
+        """{video_id: fields} not yet written for this user and course."""
+        with self._lock:
+            return {
+                video_id: dict(fields)
+                for (pending_user, video_id), (pending_course, fields) in self._pending.items()
+                if pending_user == user_id and pending_course == course_id
+            }
+
+    def _arm_timer(self) -> None:
+        # Called with the lock held, when the first heartbeat of a batch lands
+        if self._timer is not None or not self.max_age:
+            return
+        self._timer = threading.Timer(self.max_age, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self) -> None:
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection; don't leak it
+            connections.close_all()
+
+    def flush(self) -> int:
+        """Write everything pending; returns the number of rows upserted."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._oldest = None
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if not batch:
+            return 0
+        try:
+            write_progress_batch(batch)
+        except Exception as exc:
+            logger.error("Failed to flush %s progress heartbeats: %s", len(batch), exc, exc_info=True)
+            return 0
+        return len(batch)
+
+
+_buffer = ProgressBuffer()
+atexit.register(_buffer.flush)
+
+
+def is_buffered() -> bool:
+    return INGEST_MODE == "buffered"
+
+
+def record_heartbeat(user_id, video, watched_percentage=None, watched_duration=None) -> None:
+    """
+    Accept a progress heartbeat for `video` (curriculum_day must be loaded).
+
+    Writes through immediately in sync mode, otherwise buffers it.
+    """
+    from lms.models import UserVideoProgress
+
+    fields = _clean_fields(watched_percentage, watched_duration)
+    if not fields:
+        return
+    course_id = video.curriculum_day.course_id
+
+    if is_buffered():
+        _buffer.add(user_id, video.id, course_id, fields)
+        return
+
+    UserVideoProgress.objects.update_or_create(user_id=user_id, video=video, defaults=fields)
+    invalidate_progress(user_id, course_id)
+
+
+def record_completion(user_id, video, watched_percentage=100, watched_duration=None):
+    """Completion transition — always written straight away, in either mode."""
+    from lms.models import UserVideoProgress
+
+    discard_pending(user_id, video.id)
+    fields = _clean_fields(watched_percentage, watched_duration)
+    fields["is_completed"] = True
+    progress, _ = UserVideoProgress.objects.update_or_create(
+        user_id=user_id, video=video, defaults=fields
+    )
+    invalidate_progress(user_id, video.curriculum_day.course_id)
+    return progress
+
+
+def discard_pending(user_id, video_id) -> None:
+    """Forget a buffered heartbeat so it can't overwrite a newer direct write."""
+    _buffer.discard(user_id, video_id)
+
+
+def flush_progress_buffer() -> int:
+    return _buffer.flush()
+
+
+def pending_progress(user_id, course_id) -> dict:
+    """Buffered heartbeats for a user's course, {video_id: fields}."""
+    if not is_buffered():
+        return {}
+    return _buffer.pending(user_id, course_id)
+
+
+def apply_pending(progress, course_id):
+    """Overlay a buffered heartbeat on a UserVideoProgress instance (unsaved)."""
+    fields = pending_progress(progress.user_id, course_id).get(progress.video_id)
+    for name, value in (fields or {}).items():
+        setattr(progress, name, value)
+    return progress
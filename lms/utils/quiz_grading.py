@@ -0,0 +1,247 @@
+"""
+lms/utils/quiz_grading.py
+Single-query grading for quiz attempts.
+
+The answer key for a quiz ({question_id: QuestionKey}) is built with one
+query and cached until a Question or Answer of that quiz changes (see
+lms/signals.py).  Grading an attempt is then one query for all of its
+selections plus set comparisons in memory, and the graded result is
+cached per attempt so quiz_result never grades twice.
+
+Both caches are keyed by the quiz's answer-key version, which
+invalidate_answer_key() bumps: an edited answer key re-grades every
+cached attempt of that quiz instead of showing verdicts from the old key.
+"""
+
+import uuid
+from collections import namedtuple
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = getattr(settings, "QUIZ_GRADING_CACHE_TIMEOUT", 60 * 60)
+
+QuestionKey = namedtuple("QuestionKey", ["correct", "points", "question_type", "answers"])
+
+
+def _version_key(quiz_id) -> str:
+    return f"lms:quiz:answer-key:version:{quiz_id}"
+
+
+def _answer_key_key(quiz_id, version) -> str:
+    return f"lms:quiz:answer-key:v3:{quiz_id}:{version}"
+
+
+def _result_key(attempt_id, version) -> str:
+    return f"lms:quiz:graded:v2:{attempt_id}:{version}"
+
+
+def answer_key_version(quiz_id) -> str:
+    """Current answer-key version of a quiz, creating one if none is cached."""
+    key = _version_key(quiz_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+# ============================
+# ANSWER KEY
+# ============================
+def load_answer_key(quiz_id) -> dict:
+    """
+    {question_id: QuestionKey(correct answer ids, points, type, all answer ids)}
+    """
+    from lms.models import Question
+
+    rows = Question.objects.filter(quiz_id=quiz_id).order_by().values_list(
+        "id", "points", "question_type", "answers__id", "answers__is_correct"
+    )
+
+    questions, correct, answers = {}, {}, {}
+    for question_id, points, question_type, answer_id, is_correct in rows:
+        questions[question_id] = (points, question_type)
+        correct.setdefault(question_id, set())
+        answers.setdefault(question_id, set())
+        if answer_id is None:
+            continue
+        answers[question_id].add(answer_id)
+        if is_correct:
+            correct[question_id].add(answer_id)
+
+    return {
+        question_id: QuestionKey(
+            frozenset(correct[question_id]), points, question_type, frozenset(answers[question_id])
+        )
+        for question_id, (points, question_type) in questions.items()
+    }
+
+
+def get_answer_key(quiz) -> dict:
+    quiz_id = getattr(quiz, "pk", quiz)
+    # Version is read before the rows, so a key loaded mid-edit is cached
+    # under the version the edit retires
+    key = _answer_key_key(quiz_id, answer_key_version(quiz_id))
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = load_answer_key(quiz_id)
+        cache.set(key, answer_key, CACHE_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id) -> None:
+    """
+    Retire the cached answer key and every graded result built from it;
+    called from the Question / Answer signals.
+    """
+    cache.set(_version_key(quiz_id), uuid.uuid4().hex, None)
+
+
+def is_correct_selection(question_key: QuestionKey, selected) -> bool:
+    """Same rules as the old QuizResponse.is_correct(), on id sets."""
+    selected = frozenset(selected)
+    if question_key.question_type in ("single", "true_false"):
+        return len(selected) == 1 and selected == question_key.correct
+    if question_key.question_type == "multiple":
+        return selected == question_key.correct
+    return False
+
+
+# ============================
+# GRADING
+# ============================
+@dataclass(frozen=True)
+class GradedAttempt:
+    attempt_id: int
+    earned_points: int
+    total_points: int
+    # question_id -> frozenset of selected answer ids (answered questions only)
+    selections: dict
+    # question_id -> bool
+    verdicts: dict
+
+    @property
+    def percentage(self) -> float:
+        if not self.total_points:
+            return 0
+        return (self.earned_points / self.total_points) * 100
+
+    @property
+    def correct_count(self) -> int:
+        return sum(1 for ok in self.verdicts.values() if ok)
+
+    @property
+    def incorrect_count(self) -> int:
+        return len(self.verdicts) - self.correct_count
+
+
+def load_selections(attempt) -> dict:
+    """{question_id: frozenset(selected answer ids)} for every response, one query."""
+    from lms.models import QuizResponse
+
+    rows = QuizResponse.objects.filter(attempt_id=attempt.pk).order_by().values_list(
+        "question_id", "selected_answers__id"
+    )
+    selections = {}
+    for question_id, answer_id in rows:
+        bucket = selections.setdefault(question_id, set())
+        if answer_id is not None:
+            bucket.add(answer_id)
+    return {question_id: frozenset(ids) for question_id, ids in selections.items()}
+
+
+def validate_selections(answer_key: dict, posted: dict) -> dict:
+    """
+    Keep only answer ids that belong to their question, in memory.
+
+    `posted` is {question_id: iterable of raw ids}; returns
+    {question_id: frozenset(answer ids)} for questions with a valid answer.
+    """
+    selections = {}
+    for question_id, raw_ids in posted.items():
+        question_key = answer_key.get(question_id)
+        if question_key is None:
+            continue
+        ids = set()
+        for raw in raw_ids:
+            try:
+                ids.add(int(raw))
+            except (TypeError, ValueError):
+                continue
+        ids &= question_key.answers
+        if ids:
+            selections[question_id] = frozenset(ids)
+    return selections
+
+
+def save_responses(attempt, selections: dict) -> None:
+    """
+    Persist {question_id: answer ids} as QuizResponse rows and their
+    selected_answers through rows with two bulk INSERTs.  Call inside
+    transaction.atomic().
+    """
+    from lms.models import QuizResponse
+
+    responses = QuizResponse.objects.bulk_create([
+        QuizResponse(attempt=attempt, question_id=question_id)
+        for question_id in selections
+    ])
+
+    # MySQL doesn't return ids from a bulk INSERT; read them back
+    if any(response.pk is None for response in responses):
+        response_ids = dict(
+            QuizResponse.objects.filter(attempt=attempt).values_list("question_id", "id")
+        )
+    else:
+        response_ids = {response.question_id: response.pk for response in responses}
+
+    Through = QuizResponse.selected_answers.through
+    Through.objects.bulk_create([
+        Through(quizresponse_id=response_ids[question_id], answer_id=answer_id)
+        for question_id, answer_ids in selections.items()
+        for answer_id in answer_ids
+    ])
+
+
+def grade_attempt(attempt, answer_key=None, selections=None) -> GradedAttempt:
+    """
+    Grade `attempt` with one query for its selections (none when the caller
+    just saved them and passes `selections`); caches the result.
+    """
+    version = answer_key_version(attempt.quiz_id)
+    if answer_key is None:
+        answer_key = get_answer_key(attempt.quiz_id)
+    if selections is None:
+        selections = load_selections(attempt)
+
+    verdicts, earned = {}, 0
+    for question_id, selected in selections.items():
+        question_key = answer_key.get(question_id)
+        ok = question_key is not None and is_correct_selection(question_key, selected)
+        verdicts[question_id] = ok
+        if ok:
+            earned += question_key.points
+
+    graded = GradedAttempt(
+        attempt_id=attempt.pk,
+        earned_points=earned,
+        total_points=sum(question_key.points for question_key in answer_key.values()),
+        selections=selections,
+        verdicts=verdicts,
+    )
+    cache.set(_result_key(attempt.pk, version), graded, CACHE_TIMEOUT)
+    return graded
+
+
+def get_graded_attempt(attempt) -> GradedAttempt:
+    """
+    The result stored by calculate_score(), or a fresh grade if it expired
+    or the quiz's answer key has changed since.
+    """
+    graded = cache.get(_result_key(attempt.pk, answer_key_version(attempt.quiz_id)))
+    if graded is None:
+        graded = grade_attempt(attempt)
+    return graded
@@ -0,0 +1,358 @@
+"""
+lms/utils/search.py
+In-process inverted index for course search.
+
+Every active course is tokenized once — title, tagline, skills, tools,
+category and descriptions, each with its own weight — and the per-course
+term weights are persisted as JSON at SEARCH_INDEX_PATH.  Each web process
+keeps the postings in memory and answers a query with a few dict lookups:
+
+    * ranking    BM25 over the field-weighted term frequencies
+    * prefix     the last query word also matches every indexed term that
+                 starts with it, so "pyt" finds Python while typing
+    * facets     match counts by category and by level
+
+Course / category / tool saves (lms/signals.py) re-index just the affected
+courses after commit, rewrite the file and bump a version key in the cache;
+other processes reload the file the next time they search.
+`manage.py rebuild_search_index` rebuilds it from scratch.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+import uuid
+from bisect import bisect_left
+from html import unescape
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import locks
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = Path(getattr(
+    settings, "SEARCH_INDEX_PATH", Path(tempfile.gettempdir()) / "lms" / "search_index" / "courses.json"
+))
+VERSION_KEY = "lms:search:version"
+FORMAT_VERSION = 1
+
+FIELD_WEIGHTS = {
+    "title": 6.0,
+    "skills": 4.0,
+    "tagline": 3.0,
+    "tools_learned": 3.0,
+    "tools": 3.0,
+    "category": 2.0,
+    "short_description": 2.0,
+    "description": 1.0,
+}
+MIN_PREFIX = 2
+MAX_PREFIX_EXPANSIONS = 100
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or the this to with "
+    "you your will learn course".split()
+)
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+# ============================
+# TOKENIZING
+# ============================
+def _normalize(text) -> str:
+    text = unescape(strip_tags(text or ""))
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def _stem(token) -> str:
+    # Plural folding only: "courses" -> "course", "apis" -> "api"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text) -> list:
+    return [_stem(t) for t in _TOKEN.findall(_normalize(text)) if t not in STOPWORDS]
+
+
+def parse_query(query):
+    """
+    (terms, prefix): whole words of the query, plus the word still being
+    typed (None once the query ends in a space).
+    """
+    normalized = _normalize(query)
+    words = [w for w in _TOKEN.findall(normalized)]
+    prefix = None
+    if words and not normalized.endswith(" ") and len(words[-1]) >= MIN_PREFIX:
+        prefix = words.pop()
+    return [_stem(w) for w in words if w not in STOPWORDS], prefix
+
+
+def course_document(course) -> dict:
+    """Indexed form of a course: card facts plus {term: weighted frequency}."""
+    texts = {
+        "title": course.title,
+        "tagline": course.tagline,
+        "skills": course.skills.replace(",", " "),
+        "tools_learned": course.tools_learned.replace(",", " "),
+        "tools": " ".join(tool.name for tool in course.tools.all()),
+        "category": course.category.name if course.category else "",
+        "short_description": course.short_description,
+        "description": course.description,
+    }
+    terms = defaultdict(float)
+    for name, text in texts.items():
+        for token in tokenize(text):
+            terms[token] += FIELD_WEIGHTS[name]
+    return {
+        "category": course.category.slug if course.category else "",
+        "category_name": course.category.name if course.category else "",
+        "level": course.level,
+        "terms": dict(terms),
+    }
+
+
+def _documents_for(course_ids=None) -> dict:
+    from lms.models import Course
+
+    courses = (
+        Course.objects.filter(is_active=True)
+        .select_related("category")
+        .prefetch_related("tools")
+        .only("id", "title", "tagline", "skills", "tools_learned", "short_description",
+              "description", "level", "category__name", "category__slug")
+    )
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    return {course.pk: course_document(course) for course in courses.iterator(chunk_size=500)}
+
+
+# ============================
+# THE INDEX
+# ============================
+@dataclass
+class SearchResults:
+    total: int
+    hits: list                      # [(course_id, score)], best first
+    facets: dict = field(default_factory=dict)
+
+
+class CourseIndex:
+    def __init__(self, docs=None):
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self.total_length = 0.0
+        self._terms = None
+        for course_id, doc in (docs or {}).items():
+            self.add(int(course_id), doc)
+
+    def add(self, course_id, doc):
+        self.remove(course_id)
+        self.docs[course_id] = doc
+        for term, weight in doc["terms"].items():
+            self.postings[term][course_id] = weight
+        self.lengths[course_id] = sum(doc["terms"].values())
+        self.total_length += self.lengths[course_id]
+        self._terms = None
+
+    def remove(self, course_id):
+        doc = self.docs.pop(course_id, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(course_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(course_id, 0.0)
+        self._terms = None
+
+    def expand(self, prefix) -> list:
+        """Indexed terms starting with `prefix` (capped)."""
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        start = bisect_left(self._terms, prefix)
+        matches = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _bm25(self, posting, scores, boost=1.0):
+        n = len(self.docs)
+        idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+        avg_length = (self.total_length / n) if n else 1.0
+        for course_id, tf in posting.items():
+            norm = tf + K1 * (1 - B + B * self.lengths[course_id] / avg_length)
+            scores[course_id] += boost * idf * tf * (K1 + 1) / norm
+
+    def search(self, query, category=None, level=None) -> SearchResults:
+        """
+        Courses matching every word of `query` (the last one as a prefix),
+        ranked, with facet counts.  Each facet's counts ignore its own filter
+        so the sidebar still shows the alternatives.
+        """
+        terms, prefix = parse_query(query)
+        if not terms and not prefix:
+            return SearchResults(0, [])
+
+        scores = defaultdict(float)
+        matched = None
+        for term in terms:
+            posting = self.postings.get(term, {})
+            self._bm25(posting, scores)
+            matched = set(posting) if matched is None else matched & set(posting)
+        if prefix:
+            prefix_ids = set()
+            # Index terms are stemmed: "structures" must also expand as "structure"
+            expansions = dict.fromkeys(self.expand(prefix) + self.expand(_stem(prefix)))
+            for term in expansions:
+                posting = self.postings[term]
+                # A completed word outranks words it is merely the start of
+                self._bm25(posting, scores, 1.0 if term == _stem(prefix) else 0.6)
+                prefix_ids.update(posting)
+            matched = prefix_ids if matched is None else matched & prefix_ids
+
+        def keep(course_id, by_category=True, by_level=True):
+            doc = self.docs[course_id]
+            return (
+                (not by_category or not category or doc["category"] == category)
+                and (not by_level or not level or doc["level"] == level)
+            )
+
+        category_counts, level_counts = defaultdict(int), defaultdict(int)
+        category_names = {}
+        for course_id in matched:
+            doc = self.docs[course_id]
+            if doc["category"] and keep(course_id, by_category=False):
+                category_counts[doc["category"]] += 1
+                category_names[doc["category"]] = doc["category_name"]
+            if keep(course_id, by_level=False):
+                level_counts[doc["level"]] += 1
+
+        hits = sorted(
+            ((course_id, scores[course_id]) for course_id in matched if keep(course_id)),
+            key=lambda hit: (-hit[1], -hit[0]),
+        )
+        facets = {
+            "category": sorted(
+                ((slug, category_names[slug], count) for slug, count in category_counts.items()),
+                key=lambda facet: (-facet[2], facet[1]),
+            ),
+            "level": sorted(level_counts.items(), key=lambda facet: -facet[1]),
+        }
+        return SearchResults(len(hits), hits, facets)
+
+
+# ============================
+# PERSISTENCE
+# ============================
+_lock = threading.RLock()
+_index = None
+_loaded_version = None
+
+
+def _read_docs():
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != FORMAT_VERSION:
+        return None
+    return data["docs"]
+
+
+def _write_docs(docs):
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=INDEX_PATH.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump({"format": FORMAT_VERSION, "docs": docs}, fh, separators=(",", ":"))
+    os.replace(tmp, INDEX_PATH)
+
+
+def _publish(docs):
+    """Write `docs`, bump the shared version, and adopt them in this process."""
+    global _index, _loaded_version
+    _write_docs(docs)
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    with _lock:
+        _index, _loaded_version = CourseIndex(docs), version
+
+
+class _FileLock:
+    """Serializes index writers across processes (web workers, commands)."""
+    def __enter__(self):
+        INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(INDEX_PATH.with_suffix(".lock"), "a")
+        locks.lock(self._fh, locks.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        locks.unlock(self._fh)
+        self._fh.close()
+
+
+def rebuild_index() -> int:
+    """Re-tokenize every active course; returns how many were indexed."""
+    with _FileLock():
+        docs = {str(course_id): doc for course_id, doc in _documents_for().items()}
+        _publish(docs)
+    return len(docs)
+
+
+def index_courses(course_ids) -> None:
+    """Re-index (or drop, if gone / inactive) just these courses."""
+    course_ids = {int(course_id) for course_id in course_ids}
+    if not course_ids:
+        return
+    with _FileLock():
+        docs = _read_docs()
+        if docs is None:
+            docs = {str(course_id): doc for course_id, doc in _documents_for().items()}
+        else:
+            fresh = _documents_for(course_ids)
+            for course_id in course_ids:
+                if course_id in fresh:
+                    docs[str(course_id)] = fresh[course_id]
+                else:
+                    docs.pop(str(course_id), None)
+        _publish(docs)
+
+
+def get_index() -> CourseIndex:
+    """This process's index, reloaded if another process has published a newer one."""
+    global _index, _loaded_version
+    version = cache.get(VERSION_KEY)
+    if _index is not None and version == _loaded_version:
+        return _index
+    with _lock:
+        if _index is None or version != _loaded_version:
+            docs = _read_docs()
+            if docs is None:
+                logger.info("Search index missing at %s; building it", INDEX_PATH)
+                rebuild_index()
+                return _index
+            _index, _loaded_version = CourseIndex(docs), version
+    return _index
+
+
+def search_courses(query, category=None, level=None) -> SearchResults:
+    return get_index().search(query, category=category, level=level)
@@ -0,0 +1,111 @@
+"""
+lms/utils/skills.py
+Normalized skills / tools for courses.
+
+Authors keep typing comma-separated `Course.skills` and
+`Course.tools_learned` in the admin; every save syncs them into Skill rows
+(one per distinct name and kind, icon resolved once from
+Course.SKILL_ICON_MAP / TOOL_ICON_MAP) linked through CourseSkill, whose
+(skill, course) index answers "courses teaching Docker" without scanning
+the text columns.
+"""
+
+from functools import lru_cache
+
+
+SKILL = "skill"
+TOOL = "tool"
+DEFAULT_ICONS = {SKILL: "fas fa-code", TOOL: "fas fa-toolbox"}
+
+
+def parse_names(text) -> list:
+    """Distinct, trimmed names from a comma-separated string, in order."""
+    names, seen = [], set()
+    for name in (text or "").split(","):
+        name = name.strip()
+        if name and skill_key(name) not in seen:
+            seen.add(skill_key(name))
+            names.append(name)
+    return names
+
+
+def skill_key(name) -> str:
+    """Case / spacing-insensitive lookup key: 'REST  API' -> 'rest api'."""
+    return " ".join(name.lower().split())[:100]
+
+
+@lru_cache(maxsize=None)
+def _icon_maps() -> dict:
+    """The course icon maps, keyed the same way as skill_key()."""
+    from lms.models import Course
+
+    return {
+        SKILL: {skill_key(name): icon for name, icon in Course.SKILL_ICON_MAP.items()},
+        TOOL: {skill_key(name): icon for name, icon in Course.TOOL_ICON_MAP.items()},
+    }
+
+
+def icon_for(kind, name) -> str:
+    return _icon_maps()[kind].get(skill_key(name), DEFAULT_ICONS[kind])
+
+
+def get_or_create_skills(kind, names) -> dict:
+    """{key: Skill} for `names`, creating the missing ones in one INSERT."""
+    from lms.models import Skill
+
+    wanted = {skill_key(name): name for name in names}
+    rows = {s.key: s for s in Skill.objects.filter(kind=kind, key__in=list(wanted))}
+    missing = [
+        Skill(kind=kind, key=key, name=name[:100], icon=icon_for(kind, name))
+        for key, name in wanted.items() if key not in rows
+    ]
+    if missing:
+        Skill.objects.bulk_create(missing, ignore_conflicts=True)
+        # ignore_conflicts / MySQL don't hand back pks: read them
+        rows.update({s.key: s for s in Skill.objects.filter(kind=kind, key__in=[s.key for s in missing])})
+    return rows
+
+
+def sync_course_skills(course) -> bool:
+    """
+    Make course's CourseSkill rows match its skills / tools_learned text.
+    Returns False (and writes nothing) when they already do.
+    """
+    from lms.models import CourseSkill
+
+    wanted = []
+    for kind, text in ((SKILL, course.skills), (TOOL, course.tools_learned)):
+        names = parse_names(text)
+        rows = get_or_create_skills(kind, names) if names else {}
+        wanted += [(rows[skill_key(name)].pk, position) for position, name in enumerate(names)]
+
+    current = list(
+        CourseSkill.objects.filter(course=course)
+        .order_by("skill__kind", "position")
+        .values_list("skill_id", "position")
+    )
+    if sorted(current) == sorted(wanted):
+        return False
+
+    CourseSkill.objects.filter(course=course).delete()
+    CourseSkill.objects.bulk_create(
+        [CourseSkill(course=course, skill_id=skill_id, position=position) for skill_id, position in wanted]
+    )
+    return True
+
+
+def course_ids_teaching(name, kind=None):
+    """Subquery of ids of courses linked to the skill / tool `name` (any case)."""
+    from lms.models import CourseSkill
+
+    links = CourseSkill.objects.filter(skill__key=skill_key(name))
+    if kind:
+        links = links.filter(skill__kind=kind)
+    return links.values("course_id")
+
+
+def courses_teaching(name, kind=None):
+    """Active courses that teach `name`, e.g. courses_teaching("Docker")."""
+    from lms.models import Course
+
+    return Course.objects.filter(is_active=True, pk__in=course_ids_teaching(name, kind))
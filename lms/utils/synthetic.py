@@ -0,0 +1,487 @@
+"""
+lms/utils/synthetic.py
+Deterministic synthetic data for benchmarks and scale testing.
+
+generate() writes a self-contained dataset: categories, instructors, tools,
+courses x days x videos with normalized skills, a quiz per course with
+questions and answers, users with purchases, payments and free enrolments,
+per-video progress, course progress, quiz attempts with their responses,
+certificates and reviews.  Everything is written with batched bulk_create
+from generators, so a million progress rows stream to the database without
+being held in memory.
+
+Rows get explicit primary keys allocated above the current maximum, so no
+re-reads are needed after MySQL's bulk INSERT, and every slug / email /
+name carries the dataset prefix ("syn<seed>-") so delete_dataset() can
+remove it again.  The same spec and seed always produce the same rows.
+
+Skew: course popularity follows a Zipf curve (`popularity_skew`, 0 for
+uniform), most learners drop off early in a course and only
+`completion_rate` of enrolments are finished.
+
+bulk_create skips save() and signals: generated rows never touch the
+caches, search index or outbox.  Run it against a development or
+benchmark database only.
+"""
+
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+
+
+BATCH_SIZE = 2000
+PASSWORD = "synthetic-pass"
+ANSWERS_PER_QUESTION = 4
+# Fixed clock so the same seed always produces the same rows
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+SKILLS = [
+    "Python", "Django", "Flask", "React", "JavaScript", "HTML", "CSS", "Git", "Docker",
+    "AWS", "SQL", "MongoDB", "REST API", "Testing", "Security", "DevOps", "UI", "UX",
+]
+TOOLS = ["VSCode", "GitHub", "Postman", "Docker", "Jenkins", "Figma", "Notion", "Jira", "Slack"]
+LEVELS = ["beginner", "intermediate", "advanced", "all"]
+REVIEWS = [
+    "Clear explanations and great projects.",
+    "Good pace, the quizzes helped a lot.",
+    "Some videos were long but worth it.",
+    "Exactly what I needed for my job switch.",
+    "Would love more advanced content.",
+]
+
+
+class DatasetExists(Exception):
+    pass
+
+
+@dataclass
+class DatasetSpec:
+    courses: int = 20
+    days: int = 10
+    videos: int = 5
+    users: int = 100
+    courses_per_user: int = 3
+    questions: int = 10
+    attempts_per_completion: int = 1
+    reviews_per_course: int = 5
+    # Zipf exponent for course popularity (0 = every course equally popular)
+    popularity_skew: float = 1.0
+    # Share of enrolments watched to the end; the rest stop part-way
+    completion_rate: float = 0.2
+    # Share of users who also hold one free (legacy) enrolment
+    enrollment_ratio: float = 0.1
+    seed: int = 42
+    batch_size: int = BATCH_SIZE
+
+    @property
+    def prefix(self) -> str:
+        return f"syn{self.seed}-"
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "prefix": self.prefix}
+
+
+def _first_id(model) -> int:
+    return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+
+
+class _Generator:
+    def __init__(self, spec, log):
+        self.spec = spec
+        self.log = log
+        self.prefix = spec.prefix
+        self.rng = random.Random(spec.seed)
+        self.counts = {}
+
+    def bulk(self, label, model, rows) -> int:
+        """bulk_create an iterable in batches without materializing it."""
+        rows = iter(rows)
+        total = 0
+        while True:
+            batch = list(islice(rows, self.spec.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, batch_size=self.spec.batch_size)
+            total += len(batch)
+        self.counts[label] = total
+        return total
+
+    # ---------- catalog ----------
+    def catalog(self):
+        from lms.models import CourseCategory, Course, Instructor, Tool
+
+        spec, rng, prefix = self.spec, self.rng, self.prefix
+
+        first = _first_id(CourseCategory)
+        self.category_ids = [first + i for i in range(max(1, min(8, spec.courses)))]
+        self.bulk("categories", CourseCategory, (
+            CourseCategory(id=pk, name=f"{prefix}Category {i + 1}", slug=f"{prefix}category-{i + 1}", order=i)
+            for i, pk in enumerate(self.category_ids)
+        ))
+
+        first = _first_id(Instructor)
+        instructor_ids = [first + i for i in range(max(1, spec.courses // 4))]
+        self.bulk("instructors", Instructor, (
+            Instructor(id=pk, name=f"{prefix}Instructor {i + 1}", designation="Senior Engineer")
+            for i, pk in enumerate(instructor_ids)
+        ))
+
+        first = _first_id(Tool)
+        tool_ids = [first + i for i in range(len(TOOLS))]
+        self.bulk("tools", Tool, (
+            Tool(id=pk, name=f"{prefix}{name}", order=i, category="development")
+            for i, (pk, name) in enumerate(zip(tool_ids, TOOLS))
+        ))
+
+        first = _first_id(Course)
+        self.course_ids = [first + i for i in range(spec.courses)]
+        self.course_skills = {}
+        self.prices = {}
+        courses = []
+        for i, pk in enumerate(self.course_ids):
+            skills = rng.sample(SKILLS, 4)
+            tools = rng.sample(TOOLS, 3)
+            self.course_skills[pk] = (skills, tools)
+            price = Decimal(rng.choice([999, 1999, 2999, 4999]))
+            self.prices[pk] = price * Decimal("0.6")
+            courses.append(Course(
+                id=pk,
+                title=f"{skills[0]} and {skills[1]} Bootcamp {i + 1}",
+                slug=f"{prefix}course-{i + 1}",
+                short_description=f"Hands-on {skills[0]} course covering {', '.join(skills[1:])}.",
+                description=f"<p>Build real projects with {', '.join(skills)}.</p>",
+                tagline=f"Become job-ready in {skills[0]}",
+                category_id=rng.choice(self.category_ids),
+                original_price=price,
+                discounted_price=self.prices[pk],
+                total_learners=str(rng.randint(100, 20000)),
+                payment_type="one-time",
+                level=rng.choice(LEVELS),
+                skills=", ".join(skills),
+                tools_learned=", ".join(tools),
+                total_videos=spec.days * spec.videos,
+                duration_hours=max(1, spec.days * spec.videos // 4),   # lessons average ~15 min
+                is_featured=i < 4,
+            ))
+        self.bulk("courses", Course, courses)
+        self.bulk("course_instructors", Course.instructors.through, (
+            Course.instructors.through(course_id=course_id, instructor_id=instructor_id)
+            for course_id in self.course_ids
+            for instructor_id in rng.sample(instructor_ids, min(2, len(instructor_ids)))
+        ))
+        self.bulk("course_tools", Course.tools.through, (
+            Course.tools.through(course_id=course_id, tool_id=tool_id)
+            for course_id in self.course_ids
+            for tool_id in rng.sample(tool_ids, 2)
+        ))
+        self.log(f"{self.counts['courses']} courses")
+
+    def skills(self):
+        from lms.models import CourseSkill
+        from .skills import SKILL, TOOL, get_or_create_skills, skill_key
+
+        rows = {SKILL: get_or_create_skills(SKILL, SKILLS), TOOL: get_or_create_skills(TOOL, TOOLS)}
+        self.bulk("course_skills", CourseSkill, (
+            CourseSkill(course_id=course_id, skill_id=rows[kind][skill_key(name)].pk, position=position)
+            for course_id, names_by_kind in self.course_skills.items()
+            for kind, names in zip((SKILL, TOOL), names_by_kind)
+            for position, name in enumerate(names)
+        ))
+
+    # ---------- curriculum ----------
+    def curriculum(self):
+        from lms.models import CurriculumDay, Video
+
+        spec, rng = self.spec, self.rng
+
+        first_day = _first_id(CurriculumDay)
+        days = {course_id: [first_day + c * spec.days + d for d in range(spec.days)]
+                for c, course_id in enumerate(self.course_ids)}
+        self.bulk("curriculum_days", CurriculumDay, (
+            CurriculumDay(id=day_id, course_id=course_id, day_number=d + 1, order=d,
+                          title=f"Day {d + 1}", is_free=(d == 0))
+            for course_id, day_ids in days.items()
+            for d, day_id in enumerate(day_ids)
+        ))
+
+        # course id -> [(video id, duration seconds)] in curriculum order
+        self.videos = {}
+        next_id = _first_id(Video)
+
+        def video_rows():
+            nonlocal next_id
+            for course_id, day_ids in days.items():
+                self.videos[course_id] = []
+                for d, day_id in enumerate(day_ids):
+                    for v in range(spec.videos):
+                        seconds = rng.randint(180, 1800)
+                        self.videos[course_id].append((next_id, seconds))
+                        yield Video(
+                            id=next_id, curriculum_day_id=day_id, title=f"Lesson {d + 1}.{v + 1}",
+                            duration=timedelta(seconds=seconds), order=v, is_free=(d == 0 and v == 0),
+                        )
+                        next_id += 1
+
+        self.bulk("videos", Video, video_rows())
+        self.log(f"{self.counts['videos']} videos")
+
+    # ---------- quizzes ----------
+    def quizzes(self):
+        from lms.models import Answer, Question, Quiz
+
+        spec, rng = self.spec, self.rng
+
+        first_quiz = _first_id(Quiz)
+        self.quiz_ids = {course_id: first_quiz + c for c, course_id in enumerate(self.course_ids)}
+        self.bulk("quizzes", Quiz, (
+            Quiz(id=quiz_id, course_id=course_id, title=f"Final assessment {c + 1}", max_attempts=0)
+            for c, (course_id, quiz_id) in enumerate(self.quiz_ids.items())
+        ))
+
+        first_question = _first_id(Question)
+        first_answer = _first_id(Answer)
+        # quiz id -> [(question id, correct answer id, [answer ids])]
+        self.questions = {}
+        n = 0
+        for quiz_id in self.quiz_ids.values():
+            self.questions[quiz_id] = []
+            for _ in range(spec.questions):
+                answer_ids = [first_answer + n * ANSWERS_PER_QUESTION + a for a in range(ANSWERS_PER_QUESTION)]
+                self.questions[quiz_id].append((first_question + n, rng.choice(answer_ids), answer_ids))
+                n += 1
+
+        self.bulk("questions", Question, (
+            Question(id=question_id, quiz_id=quiz_id, question_text=f"Question {q + 1}?",
+                     question_type="single", points=1, order=q)
+            for quiz_id, questions in self.questions.items()
+            for q, (question_id, _, _) in enumerate(questions)
+        ))
+        self.bulk("answers", Answer, (
+            Answer(id=answer_id, question_id=question_id, answer_text=f"Option {a + 1}",
+                   is_correct=(answer_id == correct), order=a)
+            for questions in self.questions.values()
+            for question_id, correct, answer_ids in questions
+            for a, answer_id in enumerate(answer_ids)
+        ))
+
+    # ---------- learners ----------
+    def learners(self):
+        from lms.models import CourseEnrollment, Payment, Purchase, User
+
+        spec, rng, prefix = self.spec, self.rng, self.prefix
+
+        first_user = _first_id(User)
+        self.user_ids = [first_user + i for i in range(spec.users)]
+        self.emails = {pk: f"{prefix}user{i + 1}@example.com" for i, pk in enumerate(self.user_ids)}
+        password = make_password(PASSWORD, salt=f"{prefix}salt")
+        self.bulk("users", User, (
+            User(id=pk, email=self.emails[pk], username=f"{prefix}user{i + 1}",
+                 first_name="Learner", last_name=str(i + 1), password=password, date_joined=EPOCH)
+            for i, pk in enumerate(self.user_ids)
+        ))
+
+        # Zipf popularity: the course at rank r is bought ∝ 1 / r^skew
+        weights = [1 / (rank ** spec.popularity_skew) for rank in range(1, len(self.course_ids) + 1)]
+        per_user = min(spec.courses_per_user, len(self.course_ids))
+
+        # (user id, course id, videos watched)
+        self.enrolments = []
+        free = []
+        for user_id in self.user_ids:
+            owned = set()
+            target = rng.randint(1, per_user) if per_user else 0
+            while len(owned) < target:
+                owned.add(rng.choices(self.course_ids, weights)[0])
+            for course_id in sorted(owned):
+                total = len(self.videos[course_id])
+                if rng.random() < spec.completion_rate:
+                    watched = total
+                else:
+                    # Drop-off is front-loaded: most stop in the first few days
+                    watched = int(total * rng.random() ** 2)
+                self.enrolments.append((user_id, course_id, watched))
+            others = [c for c in self.course_ids if c not in owned]
+            if others and rng.random() < spec.enrollment_ratio:
+                free.append((user_id, rng.choice(others)))
+
+        self.bulk("purchases", Purchase, (
+            Purchase(user_id=user_id, course_id=course_id, amount_paid=self.prices[course_id],
+                     payment_status="completed", transaction_id=f"{prefix}txn-{n}",
+                     purchased_at=EPOCH + timedelta(minutes=n), full_name="Synthetic Learner",
+                     email=self.emails[user_id])
+            for n, (user_id, course_id, _) in enumerate(self.enrolments)
+        ))
+        self.bulk("payments", Payment, (
+            Payment(user_id=user_id, course_id=course_id, amount=self.prices[course_id], status="success",
+                    razorpay_order_id=f"{prefix}order-{n}", razorpay_payment_id=f"{prefix}pay-{n}",
+                    payment_method="upi", billing_email=self.emails[user_id],
+                    payment_date=EPOCH + timedelta(minutes=n))
+            for n, (user_id, course_id, _) in enumerate(self.enrolments)
+        ))
+        self.bulk("enrollments", CourseEnrollment, (
+            CourseEnrollment(user_id=user_id, course_id=course_id, enrollment_type="free",
+                             transaction_id=f"{prefix}free-{n}")
+            for n, (user_id, course_id) in enumerate(free)
+        ))
+        self.log(f"{self.counts['purchases']} purchases, {self.counts['enrollments']} free enrolments")
+
+    # ---------- progress ----------
+    def progress(self):
+        from lms.models import CourseProgress, UserVideoProgress
+
+        def video_progress():
+            for user_id, course_id, watched in self.enrolments:
+                course_videos = self.videos[course_id]
+                for video_id, seconds in course_videos[:watched]:
+                    yield UserVideoProgress(user_id=user_id, video_id=video_id, watched_duration=seconds,
+                                            watched_percentage=100, is_completed=True)
+                if watched < len(course_videos):
+                    video_id, seconds = course_videos[watched]
+                    yield UserVideoProgress(user_id=user_id, video_id=video_id, watched_duration=seconds // 3,
+                                            watched_percentage=33, is_completed=False)
+
+        self.bulk("video_progress", UserVideoProgress, video_progress())
+        self.log(f"{self.counts['video_progress']} video progress rows")
+
+        # Quiz attempts are decided up front so quiz_passed agrees with them
+        self.plan_attempts()
+
+        self.first_progress = _first_id(CourseProgress)
+        self.bulk("course_progress", CourseProgress, (
+            CourseProgress(
+                id=self.first_progress + n, user_id=user_id, course_id=course_id,
+                completed_count=watched, total_count=len(self.videos[course_id]),
+                progress_percentage=round(Decimal(watched * 100) / max(len(self.videos[course_id]), 1), 2),
+                is_completed=watched == len(self.videos[course_id]),
+                completed_at=EPOCH if watched == len(self.videos[course_id]) else None,
+                quiz_passed=n in self.best_attempts,
+                last_quiz_attempt_id=str(self.best_attempts[n][1]) if n in self.best_attempts else None,
+            )
+            for n, (user_id, course_id, watched) in enumerate(self.enrolments)
+        ))
+        self.bulk("completed_videos", CourseProgress.completed_videos.through, (
+            CourseProgress.completed_videos.through(courseprogress_id=self.first_progress + n, video_id=video_id)
+            for n, (_, course_id, watched) in enumerate(self.enrolments)
+            for video_id, _ in self.videos[course_id][:watched]
+        ))
+
+    # ---------- assessments ----------
+    def _answers(self, quiz_id, seed) -> list:
+        """[(question id, chosen answer id)] for one attempt, reproducible from its seed."""
+        rng = random.Random(seed)
+        accuracy = rng.uniform(0.4, 1.0)
+        return [
+            (question_id, correct if rng.random() < accuracy else rng.choice(answer_ids))
+            for question_id, correct, answer_ids in self.questions[quiz_id]
+        ]
+
+    def plan_attempts(self):
+        """
+        Decide every quiz attempt (learners who finished a course sit its
+        quiz) without holding the answers: each attempt keeps a seed its
+        responses are re-derived from.
+        """
+        from lms.models import QuizAttempt
+
+        attempt_id = _first_id(QuizAttempt)
+        # (attempt id, enrolment index, quiz id, seed, score)
+        self.attempt_plan = []
+        # enrolment index -> (best passing score, attempt id)
+        self.best_attempts = {}
+        for n, (_, course_id, watched) in enumerate(self.enrolments):
+            if watched < len(self.videos[course_id]):
+                continue
+            quiz_id = self.quiz_ids[course_id]
+            correct = {question_id: answer_id for question_id, answer_id, _ in self.questions[quiz_id]}
+            for _ in range(self.spec.attempts_per_completion):
+                seed = self.rng.getrandbits(32)
+                answers = self._answers(quiz_id, seed)
+                right = sum(1 for question_id, answer_id in answers if correct[question_id] == answer_id)
+                score = round(Decimal(right * 100) / max(len(answers), 1), 2)
+                self.attempt_plan.append((attempt_id, n, quiz_id, seed, score))
+                if score >= 70 and score > self.best_attempts.get(n, (Decimal(-1), None))[0]:
+                    self.best_attempts[n] = (score, attempt_id)
+                attempt_id += 1
+
+    def attempts(self):
+        from lms.models import Certificate, QuizAttempt, QuizResponse
+
+        rng, prefix = self.rng, self.prefix
+        self.bulk("quiz_attempts", QuizAttempt, (
+            QuizAttempt(id=attempt_id, user_id=self.enrolments[n][0], quiz_id=quiz_id, completed_at=EPOCH,
+                        score=score, passed=score >= 70, time_taken=rng.randint(120, 1800))
+            for attempt_id, n, quiz_id, _, score in self.attempt_plan
+        ))
+
+        first_response = _first_id(QuizResponse)
+
+        def responses():
+            response_id = first_response
+            for attempt_id, _, quiz_id, seed, _ in self.attempt_plan:
+                for question_id, answer_id in self._answers(quiz_id, seed):
+                    yield response_id, attempt_id, question_id, answer_id
+                    response_id += 1
+
+        self.bulk("quiz_responses", QuizResponse, (
+            QuizResponse(id=response_id, attempt_id=attempt_id, question_id=question_id)
+            for response_id, attempt_id, question_id, _ in responses()
+        ))
+        self.bulk("selected_answers", QuizResponse.selected_answers.through, (
+            QuizResponse.selected_answers.through(quizresponse_id=response_id, answer_id=answer_id)
+            for response_id, _, _, answer_id in responses()
+        ))
+        self.bulk("certificates", Certificate, (
+            Certificate(user_id=self.enrolments[n][0], course_id=self.enrolments[n][1],
+                        certificate_id=f"{prefix}{n}".upper(), quiz_score=score)
+            for n, (score, _) in self.best_attempts.items()
+        ))
+
+    def reviews(self):
+        from lms.models import CourseReview
+
+        spec, rng = self.spec, self.rng
+        buyers = {}
+        for user_id, course_id, _ in self.enrolments:
+            buyers.setdefault(course_id, []).append(user_id)
+        self.bulk("reviews", CourseReview, (
+            CourseReview(course_id=course_id, user_id=user_id, name=f"Learner {user_id}",
+                         rating=rng.choices([5, 4, 3, 2, 1], [50, 30, 12, 5, 3])[0], review=rng.choice(REVIEWS))
+            for course_id, user_ids in buyers.items()
+            for user_id in rng.sample(user_ids, min(spec.reviews_per_course, len(user_ids)))
+        ))
+
+    def run(self) -> dict:
+        from lms.models import Course
+
+        if Course.objects.filter(slug__startswith=self.prefix).exists():
+            raise DatasetExists(f"A dataset with prefix '{self.prefix}' already exists")
+        for stage in (self.catalog, self.skills, self.curriculum, self.quizzes,
+                      self.learners, self.progress, self.attempts, self.reviews):
+            stage()
+        return self.counts
+
+
+def generate(spec, log=lambda message: None) -> dict:
+    """Write the dataset described by `spec`; returns {table: rows created}."""
+    return _Generator(spec, log).run()
+
+
+def delete_dataset(prefix) -> int:
+    """Remove everything generate() created under `prefix`; returns rows deleted."""
+    from lms.models import CourseCategory, Course, Instructor, Tool, User
+
+    deleted = 0
+    for queryset in (
+        Course.objects.filter(slug__startswith=prefix),
+        User.objects.filter(email__startswith=prefix),
+        CourseCategory.objects.filter(slug__startswith=prefix),
+        Instructor.objects.filter(name__startswith=prefix),
+        Tool.objects.filter(name__startswith=prefix),
+    ):
+        deleted += queryset.delete()[0]
+    return deleted
@@ -3,6 +3,7 @@ from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Prefetch
+from django.db import transaction
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
@@ -25,6 +26,19 @@ from .models import (
     Purchase,
     UserVideoProgress
 )
+from .utils.entitlements import get_entitlements
+from .utils.home_snapshot import get_home_snapshot
+from .utils.page_cache import anonymous_page_cache
+from .middleware import query_budget
+from .utils.catalog import InvalidCursor, catalog_queryset, course_card, get_catalog_page
+from .utils.search import search_courses
+from .utils.achievements import get_achievements
+from .utils.curriculum import first_video_ids, get_curriculum
+from .utils.progress import get_progress_map, invalidate_progress, NO_PROGRESS
+from .utils.progress_buffer import record_heartbeat, record_completion, discard_pending, apply_pending
+from .utils.quiz_grading import (
+    get_answer_key, get_graded_attempt, save_responses, validate_selections,
+)
 
 import json
 import uuid
@@ -42,49 +56,8 @@ stripe.api_key = settings.STRIPE_SECRET_KEY
 # ===== AUTHENTICATION VIEWS =====
 def home(request):
     """Home page view with hero section, categories, and featured courses"""
-    hero = HeroSection.objects.filter(is_active=True).first()
-    feature_section = FeatureSection.objects.filter(is_active=True).first()
-    about_section = HomeAboutSection.objects.filter(is_active=True).first()
-    
-    categories = CourseCategory.objects.filter(is_active=True).order_by('order')
-    banner = HomeBanner.objects.filter(is_active=True).first() 
-    instructors = Instructor.objects.all()
-    testimonials = Testimonial.objects.filter(is_active=True)
-    faqs = FAQ.objects.filter(is_active=True)
-    
-    # Try to get featured courses, fall back to regular courses
-    featured_courses = Course.objects.filter(is_active=True)
-    
-    # Check if Course model has is_featured field
-    if hasattr(Course, 'is_featured'):
-        featured_courses = featured_courses.filter(is_featured=True)
-    
-    featured_courses = featured_courses.order_by('-created_at')[:16]
-    
-    if featured_courses.count() < 16:
-        additional_courses = Course.objects.filter(
-            is_active=True
-        ).exclude(
-            id__in=[c.id for c in featured_courses]
-        ).order_by('-created_at')[:16 - featured_courses.count()]
-        courses = list(featured_courses) + list(additional_courses)
-    else:
-        courses = featured_courses
-    
-    all_courses_count = Course.objects.filter(is_active=True).count()
-    
-    context = {
-        'hero': hero,
-        'feature_section': feature_section,
-        'about_section': about_section,
-        'categories': categories,
-        'courses': courses,
-        'all_courses_count': all_courses_count,
-        'banner': banner,
-        'instructors': instructors,
-        'testimonials': testimonials,
-        'faqs': faqs,
-    }
+    # Whole page context comes from one cached snapshot (see utils/home_snapshot.py)
+    context = get_home_snapshot()
     return render(request, 'lms/home.html', context)
 
 
@@ -196,9 +169,16 @@ def logout_view(request):
 
 from django.db.models import Count, Q
 
-def all_courses(request):
-    courses = Course.objects.filter(is_active=True).order_by('-created_at')
 
+def _redirect_without_cursor(request):
+    """Same page and filters, minus a cursor that no longer decodes."""
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    return redirect(f'{request.path}?{query.urlencode()}' if query else request.path)
+
+
+@anonymous_page_cache(tags=['courses:all', 'categories'], params=['category', 'cursor'])
+def all_courses(request):
     categories = CourseCategory.objects.filter(is_active=True).annotate(
         course_count=Count(
             'courses',
@@ -206,14 +186,17 @@ def all_courses(request):
         )
     ).order_by('order')
 
-    all_courses_count = courses.count()
+    all_courses_count = Course.objects.filter(is_active=True).count()
 
     category_slug = request.GET.get('category')
-    if category_slug:
-        courses = courses.filter(category__slug=category_slug)
+    try:
+        courses, next_cursor = get_catalog_page(category_slug, request.GET.get('cursor'))
+    except InvalidCursor:
+        return _redirect_without_cursor(request)
 
     context = {
         'courses': courses,
+        'next_cursor': next_cursor,
         'categories': categories,
         'all_courses_count': all_courses_count,
         'selected_category': category_slug,
@@ -249,20 +232,124 @@ def all_courses(request):
 #     return render(request, 'courses/all.html', context)
 
 
+@anonymous_page_cache(tags=lambda request, category_slug: [f'category:{category_slug}', 'categories'],
+                      params=['cursor'])
 def courses_by_category(request, category_slug):
     """View for courses filtered by category"""
     category = get_object_or_404(CourseCategory, slug=category_slug, is_active=True)
-    courses = Course.objects.filter(category=category, is_active=True).order_by('-created_at')
+    try:
+        courses, next_cursor = get_catalog_page(category_slug, request.GET.get('cursor'))
+    except InvalidCursor:
+        return _redirect_without_cursor(request)
     all_categories = CourseCategory.objects.filter(is_active=True).order_by('order')
     
     context = {
         'category': category,
         'courses': courses,
+        'next_cursor': next_cursor,
         'categories': all_categories,
         'selected_category': category_slug,
     }
     return render(request, 'courses/category.html', context)
 
+
+from django.views.decorators.http import require_GET
+
+@require_GET
+def catalog_api(request):
+    """
+    JSON page of the course catalog for infinite scroll.
+    ?category=<slug>&skill=<skill or tool name>&cursor=<next_cursor from the previous page>&limit=<n>
+    """
+    try:
+        limit = int(request.GET.get('limit', 0)) or settings.CATALOG_PAGE_SIZE
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    try:
+        courses, next_cursor = get_catalog_page(
+            request.GET.get('category'), request.GET.get('cursor'), limit,
+            skill=request.GET.get('skill'),
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    response = JsonResponse({
+        'results': [course_card(course) for course in courses],
+        'next_cursor': next_cursor,
+    })
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+def _search_page(request, page_size):
+    """(query, filters, SearchResults, courses on the requested page, page number)."""
+    query = request.GET.get('q', '').strip()[:200]
+    filters = {
+        'category': request.GET.get('category') or None,
+        'level': request.GET.get('level') or None,
+    }
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    results = search_courses(query, **filters)
+    page_hits = results.hits[(page - 1) * page_size:page * page_size]
+    by_id = catalog_queryset().in_bulk([course_id for course_id, _ in page_hits])
+    courses = [by_id[course_id] for course_id, _ in page_hits if course_id in by_id]
+    return query, filters, results, courses, page
+
+
+def course_search(request):
+    """Ranked course search with category / level facets"""
+    page_size = settings.CATALOG_PAGE_SIZE
+    query, filters, results, courses, page = _search_page(request, page_size)
+
+    level_labels = dict(Course._meta.get_field('level').choices)
+    context = {
+        'query': query,
+        'selected_category': filters['category'],
+        'selected_level': filters['level'],
+        'courses': courses,
+        'total': results.total,
+        'category_facets': results.facets.get('category', []),
+        'level_facets': [
+            (level, level_labels.get(level, level), count)
+            for level, count in results.facets.get('level', [])
+        ],
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if page * page_size < results.total else None,
+    }
+    return render(request, 'courses/search.html', context)
+
+
+@require_GET
+def course_search_api(request):
+    """
+    JSON search for the autocomplete box.
+    ?q=<text so far>&category=<slug>&level=<level>&limit=<n>
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 48)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    query, _, results, courses, _ = _search_page(request, limit)
+    return JsonResponse({
+        'query': query,
+        'total': results.total,
+        'results': [course_card(course) for course in courses],
+        'facets': {
+            'category': [
+                {'slug': slug, 'name': name, 'count': count}
+                for slug, name, count in results.facets.get('category', [])
+            ],
+            'level': [{'level': level, 'count': count} for level, count in results.facets.get('level', [])],
+        },
+    })
+
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
@@ -273,18 +360,14 @@ from .models import (
     CourseReview  # Use your existing CourseReview model
 )
 
+@query_budget(15, duplicates=2)
 @require_http_methods(["GET", "POST"])
+@anonymous_page_cache(tags=lambda request, slug: [f'course:{slug}', 'instructors'])
 def course_detail(request, slug):
     """Display course detail page with curriculum and handle review submissions"""
     
     course = get_object_or_404(
-        Course.objects.prefetch_related(
-            'instructors',
-            Prefetch(
-                'curriculum_days',
-                queryset=CurriculumDay.objects.prefetch_related('videos').order_by('order', 'day_number')
-            )
-        ),
+        Course.objects.prefetch_related('instructors'),
         slug=slug,
         is_active=True
     )
@@ -367,65 +450,60 @@ def course_detail(request, slug):
                 })
 
     # Check if user has purchased the course
-    user_has_paid = False
-    if request.user.is_authenticated:
-        user_has_paid = Purchase.objects.filter(
-            user=request.user,
-            course=course,
-            payment_status='completed'
-        ).exists()
+    entitlements = get_entitlements(request)
+    user_has_paid = entitlements.can_access_course(course)
+
+    curriculum = get_curriculum(course)
+    progress_map = get_progress_map(request.user, course)
 
     # Find first accessible video for "Start Learning" button
-    first_video = None
-    for day in course.curriculum_days.all():
-        for video in day.videos.all().order_by('order', 'id'):
-            if video.is_accessible_by(request.user):
-                first_video = video
-                break
-        if first_video:
-            break
+    first_video = next(
+        (video for video in curriculum.videos if entitlements.can_access_video(video)),
+        None
+    )
 
     # Prepare curriculum with video access info
     curriculum_days = []
-    for day in course.curriculum_days.all():
+    for day in curriculum.days:
         day_data = {
             'day_number': day.day_number,
             'title': day.title,
             'description': day.description,
-            'is_free': day.is_free if hasattr(day, 'is_free') else False,
+            'is_free': day.is_free,
+            'total_videos': day.video_count,
+            'total_duration': day.total_duration,
             'videos': []
         }
 
-        for video in day.videos.all().order_by('order', 'id'):
+        for video in day.videos:
             # Centralized access check
-            is_accessible = video.is_accessible_by(request.user)
+            is_accessible = entitlements.can_access_video(video)
 
             # Check completion status
-            is_completed = False
-            if request.user.is_authenticated:
-                progress = UserVideoProgress.objects.filter(
-                    user=request.user,
-                    video=video
-                ).first()
-                if progress:
-                    is_completed = progress.is_completed
+            is_completed = progress_map.get(video.id, NO_PROGRESS).is_completed
 
             day_data['videos'].append({
                 'id': video.id,
                 'title': video.title,
                 'description': video.description,
                 'duration': video.duration,
+                'duration_display': video.duration_display,
                 'is_accessible': is_accessible,
                 'is_completed': is_completed,
-                'video_url': video.video_file.url if hasattr(video, 'video_file') and video.video_file else ''
+                'video_url': video.video_url
             })
 
         curriculum_days.append(day_data)
 
     # Get reviews - adjust based on your CourseReview model fields
-    reviews = CourseReview.objects.filter(
-        course=course
-    ).select_related('user').order_by('-created_at')[:10]
+    reviews = list(
+        CourseReview.objects.filter(course=course)
+        .select_related('user')
+        .order_by('-created_at')[:10]
+    )
+    for review in reviews:
+        # The template prints review.course; it's this course, don't refetch it
+        review.course = course
 
     context = {
         'course': course,
@@ -447,13 +525,7 @@ def initiate_purchase(request, slug):
     course = get_object_or_404(Course, slug=slug, is_active=True)
     
     # Check if user already purchased
-    existing_purchase = Purchase.objects.filter(
-        user=request.user,
-        course=course,
-        payment_status='completed'
-    ).first()
-    
-    if existing_purchase:
+    if get_entitlements(request).has_purchased(course):
         messages.info(request, 'You have already purchased this course.')
         return redirect('course_detail', slug=slug)
     
@@ -521,13 +593,18 @@ def payment_page(request, purchase_id):
 @require_POST
 def complete_payment(request, purchase_id):
     """Complete the payment process"""
-    purchase = get_object_or_404(Purchase, id=purchase_id, user=request.user)
+    purchase = get_object_or_404(
+        Purchase.objects.select_related('user', 'course'), id=purchase_id, user=request.user
+    )
     
     transaction_id = request.POST.get('transaction_id', f'TXN{purchase.id}')
     
-    purchase.payment_status = 'completed'
-    purchase.transaction_id = transaction_id
-    purchase.save()
+    # Purchase + confirmation email commit together
+    with transaction.atomic():
+        purchase.payment_status = 'completed'
+        purchase.transaction_id = transaction_id
+        purchase.save()
+        queue_purchase_confirmation(purchase, request.build_absolute_uri(reverse('my_courses')))
     
     # ✅ Changed: redirect to success page instead of course_detail
     return redirect('payment_success', order_id=purchase.id)
@@ -565,17 +642,11 @@ def save_video_progress(request, video_id):
         return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
     
     try:
-        video = Video.objects.get(id=video_id)
+        video = Video.objects.select_related('curriculum_day').get(id=video_id)
         data = json.loads(request.body)
         watched_percentage = data.get('watched_percentage', 0)
         
-        progress, created = UserVideoProgress.objects.update_or_create(
-            user=request.user,
-            video=video,
-            defaults={
-                'watched_percentage': watched_percentage
-            }
-        )
+        record_heartbeat(request.user.id, video, watched_percentage=watched_percentage)
         
         return JsonResponse({'success': True})
         
@@ -627,6 +698,7 @@ from django.contrib.auth.decorators import login_required
 from .models import Purchase, CourseEnrollment, CourseProgress, Certificate, Quiz
 
 
+@query_budget(15, duplicates=2)
 @login_required
 def my_courses(request):
     """Display user's purchased and enrolled courses with first video, progress, and certificate"""
@@ -636,20 +708,18 @@ def my_courses(request):
         user=request.user,
         payment_status='completed'
     ).select_related('course__category').prefetch_related(
-        'course__instructors',
-        'course__curriculum_days__videos'
+        'course__instructors'
     ).order_by('-purchased_at')
     
     # Legacy enrollments
     enrollments = CourseEnrollment.objects.filter(
         user=request.user
     ).select_related('course__category').prefetch_related(
-        'course__instructors',
-        'course__curriculum_days__videos'
+        'course__instructors'
     ).order_by('-enrolled_at')
     
     # Filter out enrollments that are already purchased
-    purchased_course_ids = [p.course.id for p in purchases]
+    purchased_course_ids = {p.course.id for p in purchases}
     enrollments = [e for e in enrollments if e.course.id not in purchased_course_ids]
     
     # Collect all course IDs for bulk fetching progress and certificates
@@ -671,16 +741,12 @@ def my_courses(request):
         for quiz in Quiz.objects.filter(course_id__in=course_ids)
     }
     
+    first_video_map = first_video_ids(course_ids)
+
     # Assign first video, progress, certificate, and quiz status
     def enhance_course(obj):
-        first_video = None
-        for day in obj.course.curriculum_days.all().order_by('order', 'day_number'):
-            videos = day.videos.all().order_by('order', 'id')
-            if videos.exists():
-                first_video = videos.first()
-                break
-        
-        obj.first_video = first_video
+        first_video_id = first_video_map.get(obj.course.id)
+        obj.first_video = {'id': first_video_id} if first_video_id else None
         obj.progress = progress_map.get(obj.course.id)
         obj.certificate = certificate_map.get(obj.course.id)
         obj.has_quiz = quiz_map.get(obj.course.id, False)
@@ -711,6 +777,7 @@ from django.http import HttpResponseRedirect
 from .models import Video, Course, Tool
 
 
+@query_budget(20, duplicates=2)
 def video_player(request, video_id):
     """
     Video player view (READ-ONLY for course & quiz state)
@@ -733,7 +800,9 @@ def video_player(request, video_id):
     # -------------------------------------------------
     # Access control
     # -------------------------------------------------
-    if not video.is_accessible_by(request.user):
+    entitlements = get_entitlements(request)
+
+    if not entitlements.can_access_video(video):
         if not request.user.is_authenticated:
             messages.error(request, "Please login to access this video.")
             return HttpResponseRedirect(
@@ -765,6 +834,7 @@ def video_player(request, video_id):
                 "watched_duration": 0,
             },
         )
+        apply_pending(progress, course.id)
 
         is_completed = progress.is_completed
         progress_percentage = progress.progress_percentage
@@ -774,36 +844,22 @@ def video_player(request, video_id):
     # -------------------------------------------------
     # Curriculum + video listing
     # -------------------------------------------------
+    curriculum = get_curriculum(course)
+    progress_map = get_progress_map(request.user, course)
     curriculum_days = []
-    all_videos_list = []
     completed_days = 0
+    completed_videos = 0
 
-    curriculum_days_qs = (
-        CurriculumDay.objects.filter(course=course)
-        .prefetch_related("videos")
-        .order_by("order", "day_number")
-    )
-
-    for day in curriculum_days_qs:
+    for day in curriculum.days:
         day_videos = []
         completed_count = 0
 
-        for vid in day.videos.all().order_by("order", "id"):
-            vid_progress = None
-
-            if request.user.is_authenticated:
-                vid_progress = UserVideoProgress.objects.filter(
-                    user=request.user,
-                    video=vid,
-                ).first()
+        for vid in day.videos:
+            vid_progress = progress_map.get(vid.id, NO_PROGRESS)
 
-            vid_completed = vid_progress.is_completed if vid_progress else False
-            vid_percentage = (
-                vid_progress.progress_percentage if vid_progress else 0
-            )
-            vid_duration = (
-                vid_progress.watched_duration if vid_progress else 0
-            )
+            vid_completed = vid_progress.is_completed
+            vid_percentage = vid_progress.watched_percentage
+            vid_duration = vid_progress.watched_duration
 
             if vid_completed:
                 completed_count += 1
@@ -813,17 +869,15 @@ def video_player(request, video_id):
                     "id": vid.id,
                     "title": vid.title,
                     "duration": vid.duration or 0,
-                    "is_accessible": vid.is_accessible_by(request.user),
+                    "is_accessible": entitlements.can_access_video(vid),
                     "is_completed": vid_completed,
                     "progress_percentage": vid_percentage,
                     "watched_percentage": vid_percentage,
                     "watched_duration": vid_duration,
-                    "order": vid.order or 0,
+                    "order": vid.order,
                 }
             )
 
-            all_videos_list.append(vid)
-
         total_videos_in_day = len(day_videos)
         day_progress_percentage = (
             int((completed_count / total_videos_in_day) * 100)
@@ -833,6 +887,7 @@ def video_player(request, video_id):
 
         if day_progress_percentage == 100:
             completed_days += 1
+        completed_videos += completed_count
 
         curriculum_days.append(
             {
@@ -846,46 +901,26 @@ def video_player(request, video_id):
         )
 
     # -------------------------------------------------
-    # Previous / Next video
+    # Previous / Next video (precomputed ordinals, no queries)
     # -------------------------------------------------
     previous_video = None
     next_video = None
 
-    try:
-        idx = all_videos_list.index(video)
-
-        if idx > 0:
-            prev = all_videos_list[idx - 1]
-            if prev.is_accessible_by(request.user):
-                previous_video = prev
-
-        if idx < len(all_videos_list) - 1:
-            nxt = all_videos_list[idx + 1]
-            if nxt.is_accessible_by(request.user):
-                next_video = nxt
-
-    except ValueError:
-        pass
+    prev, nxt = curriculum.neighbours(video.id)
+    if prev and entitlements.can_access_video(prev):
+        previous_video = prev
+    if nxt and entitlements.can_access_video(nxt):
+        next_video = nxt
 
     # -------------------------------------------------
     # Course progress (READ ONLY)
     # -------------------------------------------------
-    total_videos = len(all_videos_list)
-    completed_videos = 0
-    course_progress = 0
-
-    if request.user.is_authenticated:
-        completed_videos = UserVideoProgress.objects.filter(
-            user=request.user,
-            video__in=all_videos_list,
-            is_completed=True,
-        ).count()
-
-        course_progress = (
-            int((completed_videos / total_videos) * 100)
-            if total_videos
-            else 0
-        )
+    total_videos = curriculum.video_count
+    course_progress = (
+        int((completed_videos / total_videos) * 100)
+        if total_videos
+        else 0
+    )
 
     # -------------------------------------------------
     # Quiz & certificate status (NO VALIDATION)
@@ -945,21 +980,27 @@ def video_player(request, video_id):
 
 @login_required
 def update_video_progress(request, video_id):
-    video = get_object_or_404(Video, id=video_id)
+    video = get_object_or_404(Video.objects.select_related('curriculum_day'), id=video_id)
 
     progress_percentage = int(request.POST.get('progress', 0))
     is_completed = request.POST.get('completed') == 'true'
     watched_seconds = int(request.POST.get('watched_seconds', 0))
 
-    UserVideoProgress.objects.update_or_create(
-        user=request.user,
-        video=video,
-        defaults={
-            'progress_percentage': progress_percentage,
-            'is_completed': is_completed,
-            'watched_duration': watched_seconds
-        }
-    )
+    if is_completed:
+        # Completion transitions skip the heartbeat buffer
+        record_completion(
+            request.user.id,
+            video,
+            watched_percentage=progress_percentage,
+            watched_duration=watched_seconds
+        )
+    else:
+        record_heartbeat(
+            request.user.id,
+            video,
+            watched_percentage=progress_percentage,
+            watched_duration=watched_seconds
+        )
 
     return JsonResponse({'success': True})
 
@@ -990,10 +1031,8 @@ def enroll_course(request, slug):
     return render(request, 'courses/enroll.html', context)
 
 # ========== RAZORPAY PAYMENT VIEWS ==========
-import razorpay
-import hmac
-import hashlib
 import json
+import logging
 import uuid
 from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
@@ -1004,11 +1043,12 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
 from .models import Course, Payment, Purchase, CourseEnrollment
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+from .utils.payment_gateway import GatewayUnavailable, get_gateway
+from .utils.payments import InvalidSignature, UnknownOrder, finalize_payment
 
-# Initialize Razorpay client ONCE
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
+logger = logging.getLogger(__name__)
 
 
 # ========== CHECKOUT PAGE ==========
@@ -1048,16 +1088,14 @@ def checkout(request, slug):
 
 # ========== CREATE RAZORPAY ORDER ==========
 @login_required
-def create_razorpay_order(request, slug):
-    """Create Razorpay order and return order details"""
-    course = get_object_or_404(Course, slug=slug)
+async def create_razorpay_order(request, slug):
+    """Create Razorpay order and return order details (async: waiting on Razorpay doesn't hold a worker)"""
+    user = await request.auser()
+    course = await aget_object_or_404(Course, slug=slug)
 
     # Check if already purchased
-    if Purchase.objects.filter(
-        user=request.user,
-        course=course,
-        payment_status='completed'
-    ).exists():
+    entitlements = await sync_to_async(get_entitlements)(request)
+    if entitlements.has_purchased(course):
         return JsonResponse({'success': False, 'error': 'Already purchased this course'})
 
     original_price = float(course.original_price)
@@ -1072,30 +1110,27 @@ def create_razorpay_order(request, slug):
     # Razorpay needs amount in paise (smallest unit)
     amount_paise = int(round(total_amount * 100))
 
-    print(f"=== RAZORPAY ORDER DEBUG ===")
-    print(f"Course: {course.title}")
-    print(f"Base Price: ₹{base_price}")
-    print(f"Tax (18%): ₹{tax_amount}")
-    print(f"Total: ₹{total_amount}")
-    print(f"Amount in Paise: {amount_paise}")
-    print(f"===========================")
+    logger.debug(
+        "Razorpay order for course %s: base ₹%s + tax ₹%s = ₹%s (%s paise)",
+        course.id, base_price, tax_amount, total_amount, amount_paise,
+    )
 
     try:
         # Create Razorpay order
-        razorpay_order = razorpay_client.order.create({
-            'amount': amount_paise,
-            'currency': 'INR',
-            'receipt': f'receipt_{uuid.uuid4().hex[:10]}',
-            'notes': {
+        razorpay_order = await get_gateway().acreate_order(
+            amount=amount_paise,
+            currency='INR',
+            receipt=f'receipt_{uuid.uuid4().hex[:10]}',
+            notes={
                 'course_id': str(course.id),
-                'user_id': str(request.user.id),
+                'user_id': str(user.id),
                 'course_title': course.title,
-            }
-        })
+            },
+        )
 
         # Save pending Payment record
-        Payment.objects.update_or_create(
-            user=request.user,
+        await Payment.objects.aupdate_or_create(
+            user=user,
             course=course,
             defaults={
                 'razorpay_order_id': razorpay_order['id'],
@@ -1111,16 +1146,32 @@ def create_razorpay_order(request, slug):
             'amount': amount_paise,
             'currency': 'INR',
             'course_name': course.title,
-            'user_name': request.user.get_full_name() or request.user.username,
-            'user_email': request.user.email,
+            'user_name': user.get_full_name() or user.username,
+            'user_email': user.email,
         })
 
+    except GatewayUnavailable as e:
+        # Timed out, retries used up or circuit open: fail fast, let the user retry
+        logger.warning("Razorpay order for course %s failed: %s", course.id, e)
+        return JsonResponse(
+            {'success': False, 'error': 'Payments are temporarily unavailable. Please try again in a minute.'},
+            status=503,
+        )
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Creating Razorpay order for course %s failed", course.id)
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+# ========== PAYMENT GATEWAY HEALTH ==========
+from django.contrib.admin.views.decorators import staff_member_required
+
+
+@staff_member_required
+def payment_gateway_health(request):
+    """Breaker state and latency / error metrics of this process's payment gateway (staff only)"""
+    return JsonResponse(get_gateway().health())
+
+
 # ========== VERIFY PAYMENT ==========
 @csrf_exempt
 @login_required
@@ -1132,82 +1183,34 @@ def verify_payment(request):
     try:
         data = json.loads(request.body)
 
-        razorpay_order_id = data.get('razorpay_order_id')
-        razorpay_payment_id = data.get('razorpay_payment_id')
-        razorpay_signature = data.get('razorpay_signature')
-        course_id = data.get('course_id')
-
-        # Verify signature
-        msg = f"{razorpay_order_id}|{razorpay_payment_id}"
-        generated_signature = hmac.new(
-            settings.RAZORPAY_KEY_SECRET.encode(),
-            msg.encode(),
-            hashlib.sha256
-        ).hexdigest()
-
-        if generated_signature != razorpay_signature:
-            return JsonResponse({'success': False, 'error': 'Invalid payment signature'}, status=400)
-
-        course = Course.objects.get(id=course_id)
-
-        # Update Payment record
-        Payment.objects.filter(
-            user=request.user,
-            razorpay_order_id=razorpay_order_id
-        ).update(
-            razorpay_payment_id=razorpay_payment_id,
-            razorpay_signature=razorpay_signature,
-            status='success',
-            payment_date=timezone.now(),
+        # Payment, purchase, enrollment and confirmation email in one locked
+        # transaction; a repeated callback for the same order is a no-op
+        result = finalize_payment(
+            request.user,
+            order_id=data.get('razorpay_order_id'),
+            payment_id=data.get('razorpay_payment_id'),
+            signature=data.get('razorpay_signature'),
+            my_courses_url=request.build_absolute_uri(reverse('my_courses')),
         )
 
-        # Get payment amount
-        payment = Payment.objects.get(
-            user=request.user,
-            razorpay_order_id=razorpay_order_id
-        )
-
-        # ✅ Capture purchase with purchase, _
-        purchase, _ = Purchase.objects.update_or_create(
-            user=request.user,
-            course=course,
-            defaults={
-                'amount_paid': payment.amount,
-                'payment_status': 'completed',
-                'transaction_id': razorpay_payment_id,
-                'full_name': request.user.get_full_name() or request.user.username,
-                'email': request.user.email,
-                'purchased_at': timezone.now(),
-            }
-        )
-
-        # Create Enrollment
-        CourseEnrollment.objects.get_or_create(
-            user=request.user,
-            course=course,
-            defaults={
-                'enrollment_type': 'paid',
-                'is_paid': True,
-                'transaction_id': razorpay_payment_id,
-            }
-        )
-
-        # ✅ Now purchase.id works
         return JsonResponse({
             'success': True,
-            'redirect_url': reverse('payment_success', kwargs={'order_id': purchase.id})
+            'redirect_url': reverse('payment_success', kwargs={'order_id': result.purchase_id})
         })
 
+    except InvalidSignature:
+        return JsonResponse({'success': False, 'error': 'Invalid payment signature'}, status=400)
+    except UnknownOrder:
+        return JsonResponse({'success': False, 'error': 'Unknown order'}, status=404)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Verifying Razorpay payment failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
 # ========== PAYMENT SUCCESS PAGE ==========
 """
 lms/views/payment_success.py
-Payment-success view — generates invoice PDF and sends confirmation email.
+Payment-success view — the confirmation email is queued in the outbox.
 """
 
 import logging
@@ -1218,48 +1221,33 @@ from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 
 from .models import Payment, Course, CourseEnrollment  # adjust to your actual model paths
-from .utils.email_utils import send_purchase_confirmation_email
+from .utils.invoice_generator import order_data_for_purchase
+from .utils.outbox import queue_purchase_confirmation
 
 logger = logging.getLogger(__name__)
 
 @login_required
 def payment_success(request, order_id):
-    purchase = get_object_or_404(Purchase, pk=order_id, user=request.user)
-
-    email_sent_key = f"invoice_sent_{purchase.id}"
-    already_sent   = request.session.get(email_sent_key, False)
+    purchase = get_object_or_404(
+        Purchase.objects.select_related('user', 'course'), pk=order_id, user=request.user
+    )
 
     student      = request.user
     course       = purchase.course
-    course_price = float(purchase.amount_paid)
-    tax_amount   = round(course_price * 18 / 118, 2)
-    base_price   = round(course_price - tax_amount, 2)
-
-    order_data = {
-        "order_id":        purchase.id,
-        "order_date":      purchase.purchased_at.strftime("%d %b %Y"),
-        "payment_method":  purchase.transaction_id or "Razorpay",
-        "student_name":    purchase.full_name or student.get_full_name() or student.username,
-        "student_email":   purchase.email or student.email,
-        "course_title":    course.title,
-        "course_price":    course_price,
-        "is_discounted":   False,
-        "discount_amount": 0,
-        "base_price":      base_price,
-        "tax_amount":      tax_amount,
-        "total_amount":    course_price,
-        "platform_name":   "EduLearn LMS",
-        "my_courses_url":  request.build_absolute_uri(reverse("my_courses")),
-        "year":            datetime.date.today().year,
-    }
-
-    if not already_sent:
-        try:
-            send_purchase_confirmation_email(order_data)
-            request.session[email_sent_key] = True
-            logger.info("Invoice email sent for purchase #%s to %s", purchase.id, student.email)
-        except Exception as exc:
-            logger.error("Failed to send invoice email for purchase #%s: %s", purchase.id, exc, exc_info=True)
+    my_courses_url = request.build_absolute_uri(reverse("my_courses"))
+    order_data   = order_data_for_purchase(purchase, my_courses_url=my_courses_url)
+    course_price = order_data["course_price"]
+    tax_amount   = order_data["tax_amount"]
+    base_price   = order_data["base_price"]
+
+    # The email was queued with the purchase; this only backfills purchases
+    # completed elsewhere (admin, older code paths).  The outbox worker sends it.
+    email_queued = False
+    if purchase.payment_status == 'completed':
+        outbox, queued_now = queue_purchase_confirmation(purchase, my_courses_url)
+        email_queued = outbox.status != 'failed'
+        if queued_now:
+            logger.info("Queued invoice email for purchase #%s to %s", purchase.id, student.email)
 
     context = {
         "order_id":        purchase.id,
@@ -1272,7 +1260,7 @@ def payment_success(request, order_id):
         "base_price":      base_price,
         "tax_amount":      tax_amount,
         "total_amount":    course_price,
-        "email_sent":      not already_sent,
+        "email_sent":      email_queued,
     }
     return render(request, "lms/payment_success.html", context)
 
@@ -1528,11 +1516,7 @@ def create_test_payment(request, slug):
     try:
         course = get_object_or_404(Course, slug=slug, is_active=True)
 
-        if Purchase.objects.filter(
-            user=request.user,
-            course=course,
-            payment_status='completed'
-        ).exists():
+        if get_entitlements(request).has_purchased(course):
             return JsonResponse({'success': False, 'error': 'Already purchased this course'})
 
         test_order_id = f'test_order_{uuid.uuid4().hex[:10]}'
@@ -1551,27 +1535,31 @@ def create_test_payment(request, slug):
             payment_date=timezone.now(),
         )
 
-        Purchase.objects.get_or_create(
-            user=request.user,
-            course=course,
-            defaults={
-                'amount_paid': amount,
-                'payment_status': 'completed',
-                'transaction_id': test_payment_id,
-                'full_name': request.user.get_full_name() or request.user.username,
-                'email': request.user.email,
-            }
-        )
+        with transaction.atomic():
+            purchase, _ = Purchase.objects.get_or_create(
+                user=request.user,
+                course=course,
+                defaults={
+                    'amount_paid': amount,
+                    'payment_status': 'completed',
+                    'transaction_id': test_payment_id,
+                    'full_name': request.user.get_full_name() or request.user.username,
+                    'email': request.user.email,
+                }
+            )
 
-        CourseEnrollment.objects.get_or_create(
-            user=request.user,
-            course=course,
-            defaults={
-                'enrollment_type': 'paid',
-                'is_paid': True,
-                'transaction_id': test_payment_id,
-            }
-        )
+            CourseEnrollment.objects.get_or_create(
+                user=request.user,
+                course=course,
+                defaults={
+                    'enrollment_type': 'paid',
+                    'is_paid': True,
+                    'transaction_id': test_payment_id,
+                }
+            )
+
+            if purchase.payment_status == 'completed':
+                queue_purchase_confirmation(purchase, request.build_absolute_uri(reverse('my_courses')))
 
         return JsonResponse({'success': True, 'redirect_url': f'/courses/{course.slug}/'})
 
@@ -1580,6 +1568,7 @@ def create_test_payment(request, slug):
 
 
 
+@anonymous_page_cache(tags=['static'])
 def about_us(request):
     """About Us page"""
     return render(request, 'lms/about.html', {
@@ -1621,11 +1610,13 @@ def contact_view(request):
 
 
 
+@anonymous_page_cache(tags=['static'])
 def privacy_policy(request):
     """Privacy Policy page"""
     return render(request, "privacy_policy.html")
 
 
+@anonymous_page_cache(tags=['static'])
 def terms_of_use(request):
     """Terms of Use page"""
     return render(request, "terms_of_use.html")
@@ -1657,10 +1648,7 @@ def quiz_start(request, course_slug):
     # -----------------------
     # Check if user has access
     # -----------------------
-    has_access = (
-        request.user.purchases.filter(course=course).exists() or
-        request.user.enrollments.filter(course=course).exists()
-    )
+    has_access = get_entitlements(request).is_enrolled(course)
     
     if not has_access:
         messages.error(request, "You need to enroll in this course first.")
@@ -1745,32 +1733,30 @@ def quiz_submit(request, attempt_id):
         messages.error(request, "This quiz attempt is already submitted.")
         return redirect("quiz_result", attempt.id)
 
-    for question in attempt.quiz.questions.all():
-        key = f"question_{question.id}"
-        selected_ids = request.POST.getlist(key)
-
-        if not selected_ids:
-            continue  # unanswered question
-
-        # Validate answers belong to this question
-        answers = Answer.objects.filter(
-            id__in=selected_ids,
-            question=question
-        )
-
-        if not answers.exists():
-            continue
+    # Validate every posted answer id against the cached answer key, in memory
+    answer_key = get_answer_key(attempt.quiz_id)
+    posted = {
+        question_id: request.POST.getlist(f"question_{question_id}")
+        for question_id in answer_key
+    }
+    selections = validate_selections(answer_key, posted)
 
-        response = QuizResponse.objects.create(
-            attempt=attempt,
-            question=question
-        )
+    # Responses, completion and score in one transaction, so an attempt is
+    # never left completed but ungraded; the row lock on the attempt stops a
+    # double submit from writing responses twice
+    with transaction.atomic():
+        locked = QuizAttempt.objects.select_for_update().only('completed_at').get(pk=attempt.pk)
+        if locked.completed_at:
+            messages.error(request, "This quiz attempt is already submitted.")
+            return redirect("quiz_result", attempt.id)
+        save_responses(attempt, selections)
 
-        response.selected_answers.set(answers)
+        # Mark attempt completed
+        attempt.completed_at = timezone.now()
+        attempt.save(update_fields=['completed_at'])
 
-    # Mark attempt completed
-    attempt.completed_at = timezone.now()
-    attempt.calculate_score()
+        # Grading is in memory (no re-read of the responses just saved)
+        attempt.calculate_score(selections=selections)
 
     messages.success(request, "Quiz submitted successfully.")
     return redirect("quiz_result", attempt.id)
@@ -1780,36 +1766,29 @@ def quiz_submit(request, attempt_id):
 @login_required
 def quiz_result(request, attempt_id):
     """Display quiz results"""
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz__course'), id=attempt_id, user=request.user
+    )
     
-    responses = attempt.responses.prefetch_related(
-        'question__answers',
-        'selected_answers'
-    ).all()
+    # Reuse the result graded at submit time; questions + answers for display
+    graded = get_graded_attempt(attempt)
+    questions = attempt.quiz.questions.prefetch_related('answers')
     
     # Prepare detailed results and count correct/incorrect
     results = []
-    correct_count = 0
-    incorrect_count = 0
-    
-    for response in responses:
-        question = response.question
-        correct_answers = question.answers.filter(is_correct=True)
-        selected_answers = response.selected_answers.all()
-        is_correct = response.is_correct()
-        
-        # Count correct/incorrect answers
-        if is_correct:
-            correct_count += 1
-        else:
-            incorrect_count += 1
-        
+    for question in questions:
+        if question.id not in graded.selections:
+            continue
+        selected_ids = graded.selections[question.id]
+        answers = list(question.answers.all())
         results.append({
             'question': question,
-            'selected_answers': selected_answers,
-            'correct_answers': correct_answers,
-            'is_correct': is_correct,
+            'selected_answers': [a for a in answers if a.id in selected_ids],
+            'correct_answers': [a for a in answers if a.is_correct],
+            'is_correct': graded.verdicts[question.id],
         })
+    correct_count = graded.correct_count
+    incorrect_count = graded.incorrect_count
     
     # Calculate total questions
     total_questions = len(results)
@@ -1863,7 +1842,7 @@ from .models import Video, CourseProgress, Certificate
 def mark_video_complete(request, video_id):
     """Mark a video as completed and update progress"""
     try:
-        video = get_object_or_404(Video, id=video_id)
+        video = get_object_or_404(Video.objects.select_related('curriculum_day__course'), id=video_id)
         course = video.curriculum_day.course
         
         # Get or create UserVideoProgress
@@ -1884,10 +1863,13 @@ def mark_video_complete(request, video_id):
         except:
             watched_percentage = 100
         
-        # Update video progress
+        # Update video progress (drop any buffered heartbeat first so a
+        # later flush can't overwrite this write)
+        discard_pending(request.user.id, video.id)
         progress.is_completed = True
         progress.watched_percentage = watched_percentage
         progress.save()
+        invalidate_progress(request.user.id, course.id)
         
         # Get or create CourseProgress (for quiz tracking)
         course_progress, created = CourseProgress.objects.get_or_create(
@@ -1895,23 +1877,14 @@ def mark_video_complete(request, video_id):
             course=course
         )
         
-        # Add video to completed videos
-        if video not in course_progress.completed_videos.all():
-            course_progress.completed_videos.add(video)
-        
-        # Update course progress
-        course_progress.update_progress()
+        # Add video to completed videos (bumps the counters once per video)
+        course_progress.mark_video_completed(video)
         
         # Check if all videos are completed
-        all_videos = Video.objects.filter(curriculum_day__course=course)
-        total_videos = all_videos.count()
-        completed_videos = UserVideoProgress.objects.filter(
-            user=request.user,
-            video__in=all_videos,
-            is_completed=True
-        ).count()
-        
-        all_videos_completed = (completed_videos == total_videos)
+        all_videos_completed = (
+            course_progress.total_count > 0
+            and course_progress.completed_count >= course_progress.total_count
+        )
         
         # Check if course is fully completed (videos + quiz)
         course_completed = course_progress.check_completion()
@@ -1955,114 +1928,21 @@ def mark_video_complete(request, video_id):
             'message': f'Error marking video complete: {str(e)}'
         }, status=400)
     
+@query_budget(10)
 @login_required
 def my_achievements(request):
-    """Optimized version for better performance with large datasets"""
-    from django.db.models import Prefetch, Count
-    
-    user = request.user
-    
-    # 1. Get certificates with optimized query
-    certificates = Certificate.objects.filter(
-        user=user
-    ).select_related('course').order_by('-issue_date')
-    
-    # Debug: Print certificate count
-    print(f"DEBUG: Total certificates for user {user.username}: {certificates.count()}")
-    
-    # 2. Get all courses the user has purchased
-    purchased_course_ids = Purchase.objects.filter(
-        user=user,
-        payment_status='completed'
-    ).values_list('course_id', flat=True)
-    
-    print(f"DEBUG: Purchased course IDs: {list(purchased_course_ids)}")
-    
-    purchased_courses = Course.objects.filter(
-        id__in=purchased_course_ids
-    ).prefetch_related(
-        Prefetch(
-            'curriculum_days__videos',
-            queryset=Video.objects.only('id')
-        )
-    )
-    
-    # 3. Get course progress efficiently
-    progress_queryset = CourseProgress.objects.filter(
-        user=user,
-        course__in=purchased_courses
-    ).select_related('course').annotate(
-        completed_videos_count=Count('completed_videos')
-    )
-    
-    print(f"DEBUG: Progress queryset count: {progress_queryset.count()}")
-    print(f"DEBUG: Quiz passed count: {progress_queryset.filter(quiz_passed=True).count()}")
-    
-    # 4. Calculate statistics
-    total_courses = purchased_courses.count()
-    total_certificates = certificates.count()
-    
-    # Count courses with certificates
-    completed_courses = certificates.values('course').distinct().count()
-    
-    # Alternative: Count from progress
-    completed_from_progress = progress_queryset.filter(is_completed=True).count()
-    completed_courses = max(completed_courses, completed_from_progress)
-    
-    # Count total quizzes passed
-    total_quiz_passed = progress_queryset.filter(quiz_passed=True).count()
-    
-    in_progress_courses = total_courses - completed_courses
-    
-    # 5. Build detailed progress list efficiently
-    detailed_progress = []
-    
-    # Create a dictionary for quick lookup
-    progress_dict = {p.course_id: p for p in progress_queryset}
-    
-    for course in purchased_courses:
-        progress = progress_dict.get(course.id)
-        
-        if progress:
-            # Get total videos count from prefetched data
-            total_videos = sum(day.videos.count() for day in course.curriculum_days.all())
-            
-            # Calculate actual percentage
-            if total_videos > 0:
-                completed_videos = progress.completed_videos_count
-                actual_percentage = (completed_videos / total_videos) * 100
-            else:
-                actual_percentage = progress.progress_percentage
-            
-            detailed_progress.append({
-                'course': course,
-                'progress_percentage': round(actual_percentage, 1),
-                'is_completed': progress.is_completed,
-                'quiz_passed': progress.quiz_passed,
-                'completed_videos_count': progress.completed_videos_count,
-                'total_videos': total_videos,
-                'has_certificate': certificates.filter(course=course).exists(),
-            })
-    
-    # 6. Sort progress
-    detailed_progress.sort(
-        key=lambda x: (
-            not x['is_completed'],  # Completed first
-            -x['progress_percentage']  # Higher percentage first
-        )
-    )
-    
-    print(f"DEBUG: Final counts - Certificates: {total_certificates}, Quizzes Passed: {total_quiz_passed}")
-    
+    """Certificates and per-course progress, from the cached achievements snapshot"""
+    achievements = get_achievements(request.user)
+
     context = {
-        'certificates': certificates,
-        'progress_data': detailed_progress,
-        'completed_courses': completed_courses,
-        'in_progress_courses': max(0, in_progress_courses),
-        'total_courses': total_courses,
-        'total_certificates': total_certificates,
-        'total_quiz_passed': total_quiz_passed,
-        'user': user,
+        'certificates': achievements.certificates,
+        'progress_data': achievements.progress_data,
+        'completed_courses': achievements.completed_courses,
+        'in_progress_courses': achievements.in_progress_courses,
+        'total_courses': achievements.total_courses,
+        'total_certificates': achievements.total_certificates,
+        'total_quiz_passed': achievements.total_quiz_passed,
+        'user': request.user,
     }
     
     return render(request, 'lms/achievements.html', context)
@@ -2089,38 +1969,48 @@ from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
-from weasyprint import HTML  # ← ADD THIS
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response
 from .models import Certificate
+from .utils.certificate_pdf import (
+    certificate_digest, certificate_filename, ensure_certificate_pdf, open_certificate_pdf,
+    pdf_name, pdf_storage,
+)
+from .utils.document_jobs import can_view_job, enqueue, is_queued, open_job_result
 
 
 @login_required
 def download_certificate(request, certificate_id):
     certificate = get_object_or_404(
-        Certificate,
+        Certificate.objects.select_related('user', 'course'),
         certificate_id=certificate_id,
         user=request.user
     )
 
-    html_string = render_to_string('lms/certificate_pdf.html', {
-        'certificate': certificate,
-        'request': request,
-    })
+    # The content hash is the ETag: a repeat download is a 304 with no I/O
+    digest = certificate_digest(certificate)
+    etag = f'"{digest}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Not rendered yet: hand it to the document worker in queue mode
+    if is_queued() and not pdf_storage().exists(pdf_name(digest)):
+        job = enqueue('certificate', {'certificate_id': certificate.certificate_id, 'digest': digest}, request.user)
+        return redirect('document_job_status', job_id=job.id)
 
     try:
-        pdf_bytes = HTML(
-            string=html_string,
-            base_url=request.build_absolute_uri('/')
-        ).write_pdf()
-
-        # ✅ Fix
-        student_name = certificate.user.get_full_name() or certificate.user.username
-        safe_name = "".join(
-            c if c.isalnum() or c == '_' else '_'
-            for c in student_name.replace(' ', '_')
+        name, digest, _ = ensure_certificate_pdf(
+            certificate, base_url=request.build_absolute_uri('/')
         )
 
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="{safe_name}_Certificate.pdf"'
+        response = FileResponse(
+            open_certificate_pdf(name),
+            content_type='application/pdf',
+            filename=certificate_filename(certificate),
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=86400'
         return response
 
     except Exception as e:
@@ -2134,136 +2024,105 @@ from django.db.models import Count, Q, Avg, Sum  # ← ADD THIS LINE
 from django.contrib.auth.decorators import login_required
 
 # For PDF generation
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from io import BytesIO
-import re
+from .utils.brochure import brochure_key, open_brochure, open_cached_brochure
+from .utils.invoice_generator import generate_invoice_pdf, order_data_for_purchase
 
 # Your models
-from .models import Course, Video, CurriculumDay, Instructor, Tool
+from .models import Course, Video, CurriculumDay, Instructor, Tool, Purchase, DocumentJob
 
 # ... rest of your imports ...
 
 
 # Then add this function:
 def download_brochure(request, slug):
-    """Generate PDF brochure using ReportLab"""
+    """Serve the course brochure PDF from the on-disk cache (rendered on a miss)"""
     course = get_object_or_404(Course, slug=slug)
     
-    # Create BytesIO buffer
-    buffer = BytesIO()
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=26,
-        textColor=colors.HexColor('#10b981'),
-        spaceAfter=20,
-        alignment=1,  # Center
-        fontName='Helvetica-Bold'
+    # Conditional GET: unchanged brochure -> 304 without touching the file.
+    # ETag only: the key covers curriculum and instructor changes that
+    # course.updated_at (the only date to hand) doesn't move with
+    key = brochure_key(course)
+    etag = f'"{key}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
+    # A handle, not a path: eviction can't pull the file out from under us
+    brochure = open_cached_brochure(key)
+    if brochure is None:
+        if is_queued():
+            job = enqueue('brochure', {'course_id': course.id, 'key': key})
+            return redirect('document_job_status', job_id=job.id)
+        brochure = open_brochure(course, key)
+    
+    response = FileResponse(
+        brochure,
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f"{course.slug}_brochure.pdf",
     )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#065f46'),
-        spaceAfter=12,
-        spaceBefore=20,
-        fontName='Helvetica-Bold'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+@login_required
+def download_invoice(request, order_id):
+    """Invoice PDF for one of the user's purchases"""
+    purchase = get_object_or_404(
+        Purchase.objects.select_related('user', 'course'),
+        pk=order_id, user=request.user, payment_status='completed'
     )
+    my_courses_url = request.build_absolute_uri(reverse('my_courses'))
     
-    # Title
-    elements.append(Paragraph(course.title, title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Description
-    if course.description:
-        elements.append(Paragraph("Course Description", heading_style))
-        # Remove HTML tags from description
-        clean_desc = re.sub('<[^<]+?>', '', course.description)
-        elements.append(Paragraph(clean_desc[:500], styles['BodyText']))
-        elements.append(Spacer(1, 0.2*inch))
-    
-    # Course Details Table
-    elements.append(Paragraph("Course Details", heading_style))
-    details_data = [
-        ['Duration', f"{course.duration_hours} Hours"],
-        ['Original Price', f"₹{course.original_price}"],
-        ['Discounted Price', f"₹{course.discounted_price}"],
-        ['Language', course.languages or 'English'],
-        ['Access Level', course.access_level or 'All Levels'],
-        ['Total Learners', str(course.total_learners)],
-    ]
+    if is_queued():
+        job = enqueue('invoice', {'purchase_id': purchase.id, 'my_courses_url': my_courses_url}, request.user)
+        return redirect('document_job_status', job_id=job.id)
     
-    details_table = Table(details_data, colWidths=[2*inch, 4*inch])
-    details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#d1fae5')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(details_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Instructors
-    instructors = course.instructors.all()
-    if instructors:
-        elements.append(Paragraph("Instructors", heading_style))
-        instructor_names = ", ".join([inst.name for inst in instructors])
-        elements.append(Paragraph(instructor_names, styles['BodyText']))
-        elements.append(Spacer(1, 0.2*inch))
-    
-    # Curriculum
-    elements.append(Paragraph("Course Curriculum", heading_style))
-    
-    curriculum_days = course.curriculum_days.all().prefetch_related('videos')
-    for day in curriculum_days:
-        # Day title
-        day_title = f"<b>Day {day.day_number}: {day.title}</b>"
-        elements.append(Paragraph(day_title, styles['Normal']))
-        elements.append(Spacer(1, 0.05*inch))
-        
-        # Videos
-        videos = day.videos.all()
-        for video in videos:
-            video_text = f"&nbsp;&nbsp;&nbsp;&nbsp;• {video.title} ({video.duration} min)"
-            elements.append(Paragraph(video_text, styles['Normal']))
-        
-        elements.append(Spacer(1, 0.15*inch))
-    
-    # Footer
-    elements.append(Spacer(1, 0.3*inch))
-    footer_text = f"<i>For more information, visit our website or contact us.</i>"
-    elements.append(Paragraph(footer_text, styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
+    pdf = generate_invoice_pdf(order_data_for_purchase(purchase, my_courses_url))
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="Invoice_{purchase.id}.pdf"'
+    return response
+
+
+def document_job_status(request, job_id):
+    """
+    Poll endpoint for a queued PDF.  Browsers get a self-refreshing page and
+    are redirected to the file when it is ready; ?format=json returns status.
+    """
+    job = get_object_or_404(DocumentJob, pk=job_id)
+    if not can_view_job(job, request.user):
+        raise Http404("Job not found")
     
-    # Get PDF data
-    pdf = buffer.getvalue()
-    buffer.close()
+    download_url = reverse('document_job_download', args=[job.id]) if job.status == 'done' else None
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'download_url': download_url,
+            'error': job.error if job.status == 'failed' else '',
+        })
     
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{course.slug}_brochure.pdf"'
-    response.write(pdf)
+    if download_url:
+        return redirect(download_url)
+    return render(request, 'lms/document_job_status.html', {'job': job})
+
+
+def document_job_download(request, job_id):
+    """Serve a finished job's PDF from storage"""
+    job = get_object_or_404(DocumentJob, pk=job_id)
+    if not can_view_job(job, request.user):
+        raise Http404("Job not found")
+    if job.status != 'done':
+        return redirect('document_job_status', job_id=job.id)
     
-    return response
+    return FileResponse(
+        open_job_result(job),
+        content_type='application/pdf',
+        as_attachment=job.kind != 'certificate',
+        filename=job.filename,
+    )
 
 
 from django.http import HttpResponse
@@ -5,6 +5,7 @@ pymysql.VERSION = (2, 2, 1)
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 import cloudinary
 import cloudinary.uploader
@@ -86,7 +87,8 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'lms.middleware.StaticFilesMiddleware',
+    'lms.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -118,6 +120,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'lms_project.wsgi.application'
+# Production serves ASGI (gunicorn + uvicorn workers, see procfile) so async
+# views such as create_razorpay_order don't hold a worker while they wait
+ASGI_APPLICATION = 'lms_project.asgi.application'
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
@@ -127,7 +132,9 @@ if DATABASE_URL:
     DATABASES = {
         "default": dj_database_url.config(
             default=clean_url,
-            conn_max_age=600,
+            # Persistent connections leak under ASGI (each request's sync
+            # thread opens its own), so they are off unless asked for
+            conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', 0)),
         )
     }
     # Add SSL separately
@@ -331,6 +338,114 @@ else:
     SESSION_COOKIE_SECURE = False
     CSRF_COOKIE_SECURE = False
 
+# ===== CACHING =====
+# Entitlements, curriculum versions, page-cache tags, the home snapshot and
+# the search index version are all invalidated through this cache, so every
+# web worker and management command must share it.  REDIS_URL selects Redis;
+# otherwise CACHE_BACKEND / CACHE_LOCATION (LocMem by default, which is only
+# acceptable for a single development process; `check --deploy` flags it).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+            'LOCATION': os.getenv('CACHE_LOCATION', 'lms-default'),
+        }
+    }
+
+# Seconds a user's purchases / enrollments snapshot stays cached
+ENTITLEMENT_CACHE_TIMEOUT = int(os.getenv('ENTITLEMENT_CACHE_TIMEOUT', 300))
+
+# Seconds a built curriculum tree stays cached (versioned, so safe to keep long)
+CURRICULUM_CACHE_TIMEOUT = int(os.getenv('CURRICULUM_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Seconds a user's per-course video progress map stays cached (0 disables)
+PROGRESS_CACHE_TIMEOUT = int(os.getenv('PROGRESS_CACHE_TIMEOUT', 30))
+
+# Seconds a user's achievements dashboard stays cached (progress / certificate writes drop it)
+ACHIEVEMENTS_CACHE_TIMEOUT = int(os.getenv('ACHIEVEMENTS_CACHE_TIMEOUT', 300))
+
+# Seconds the home page snapshot stays cached (CMS edits rebuild it immediately)
+HOME_SNAPSHOT_CACHE_TIMEOUT = int(os.getenv('HOME_SNAPSHOT_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Full-page cache for logged-out visitors: pages are fresh for PAGE_CACHE_TIMEOUT
+# seconds, then served stale for up to PAGE_CACHE_STALE_TIMEOUT while one request
+# re-renders them
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True') == 'True'
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 300))
+PAGE_CACHE_STALE_TIMEOUT = int(os.getenv('PAGE_CACHE_STALE_TIMEOUT', 60 * 60))
+
+# Course cards per catalog page / infinite-scroll batch
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', 12))
+
+# Course search index (JSON, rebuilt with `manage.py rebuild_search_index`, or
+# on first search when missing).  Runtime data: keep it out of the source tree
+SEARCH_INDEX_PATH = os.getenv(
+    'SEARCH_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'lms', 'search_index', 'courses.json')
+)
+
+# Video progress heartbeats: 'sync' writes each one, 'buffered' coalesces them
+# per (user, video) and upserts in batches (completions are always immediate)
+PROGRESS_INGEST_MODE = os.getenv('PROGRESS_INGEST_MODE', 'sync')
+PROGRESS_BUFFER_MAX_ITEMS = int(os.getenv('PROGRESS_BUFFER_MAX_ITEMS', 500))
+PROGRESS_BUFFER_MAX_AGE = int(os.getenv('PROGRESS_BUFFER_MAX_AGE', 10))
+
+# Seconds a quiz answer key / graded attempt stays cached (keys are invalidated on edit)
+QUIZ_GRADING_CACHE_TIMEOUT = int(os.getenv('QUIZ_GRADING_CACHE_TIMEOUT', 60 * 60))
+
+# Rendered PDFs (certificates, queued invoices / brochures): 'local' (MEDIA_ROOT)
+# or 'default' storage.  Bump the version to re-render every certificate after
+# a font / WeasyPrint change.
+CERTIFICATE_PDF_STORAGE = os.getenv('CERTIFICATE_PDF_STORAGE', 'local')
+CERTIFICATE_TEMPLATE_VERSION = os.getenv('CERTIFICATE_TEMPLATE_VERSION', '1')
+
+# PDF rendering: 'inline' renders in the request, 'queue' hands certificates,
+# invoices and brochures to `manage.py run_document_worker`
+DOCUMENT_RENDER_MODE = os.getenv('DOCUMENT_RENDER_MODE', 'inline')
+DOCUMENT_WORKER_PROCESSES = int(os.getenv('DOCUMENT_WORKER_PROCESSES', 2))
+DOCUMENT_JOB_MAX_ATTEMPTS = int(os.getenv('DOCUMENT_JOB_MAX_ATTEMPTS', 3))
+DOCUMENT_JOB_STALE_AFTER = int(os.getenv('DOCUMENT_JOB_STALE_AFTER', 600))
+
+# On-disk LRU cache of rendered course brochures
+BROCHURE_CACHE_DIR = os.getenv('BROCHURE_CACHE_DIR', os.path.join(MEDIA_ROOT, 'brochure_cache'))
+BROCHURE_CACHE_MAX_FILES = int(os.getenv('BROCHURE_CACHE_MAX_FILES', 200))
+
+# Email outbox (`manage.py send_outbox_emails`): retries back off exponentially
+# from EMAIL_OUTBOX_BACKOFF_BASE seconds up to EMAIL_OUTBOX_BACKOFF_MAX
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+EMAIL_OUTBOX_BACKOFF_BASE = int(os.getenv('EMAIL_OUTBOX_BACKOFF_BASE', 30))
+EMAIL_OUTBOX_BACKOFF_MAX = int(os.getenv('EMAIL_OUTBOX_BACKOFF_MAX', 60 * 60))
+
+# SQL instrumentation (lms/middleware.py).  Views over their @query_budget are
+# logged, or fail with QUERY_BUDGET_STRICT (the budget tests in lms/tests.py
+# switch it on); QUERY_BUDGETS overrides a view's budget by URL name, e.g.
+# {'video_player': 25} or {'my_courses': (15, 2)}
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+QUERY_BUDGET_SLOW_SQL_MS = int(os.getenv('QUERY_BUDGET_SLOW_SQL_MS', 200))
+QUERY_BUDGETS = {}
+
+# Payment gateway adapter (lms/utils/payment_gateway.py): 'razorpay', or 'fake'
+# for an in-process stand-in.  Every call is bounded by the timeouts (seconds);
+# unsent / throttled calls are retried up to MAX_RETRIES times, and after
+# BREAKER_THRESHOLD consecutive failures calls fail fast for BREAKER_COOLDOWN s
+PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'razorpay')
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = float(os.getenv('PAYMENT_GATEWAY_CONNECT_TIMEOUT', 3))
+PAYMENT_GATEWAY_READ_TIMEOUT = float(os.getenv('PAYMENT_GATEWAY_READ_TIMEOUT', 10))
+PAYMENT_GATEWAY_MAX_RETRIES = int(os.getenv('PAYMENT_GATEWAY_MAX_RETRIES', 2))
+PAYMENT_GATEWAY_BREAKER_THRESHOLD = int(os.getenv('PAYMENT_GATEWAY_BREAKER_THRESHOLD', 5))
+PAYMENT_GATEWAY_BREAKER_COOLDOWN = int(os.getenv('PAYMENT_GATEWAY_BREAKER_COOLDOWN', 30))
+
+# Seconds a finalized payment's outcome is remembered, so repeated
+# verify_payment calls for the order skip the row lock
+PAYMENT_RESULT_CACHE_TIMEOUT = int(os.getenv('PAYMENT_RESULT_CACHE_TIMEOUT', 60 * 60 * 24))
+
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
 